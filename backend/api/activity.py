@@ -0,0 +1,267 @@
+"""
+Append-only activity log, rolled up into ``DailyActivity`` for analytics.
+
+Events (chapter views, enrollments, logins) are buffered in memory and
+appended as compact JSON lines to a segment file owned by this process.
+A segment is sealed (renamed from ``.open`` to ``.log``) once it reaches
+``MAX_SEGMENT_BYTES`` or ``MAX_SEGMENT_SECONDS``; ``rollup()`` (run by the
+``rollup_activity`` command) folds sealed segments into per-day counts and
+records each one in ``ActivitySegment`` so it is never counted twice.
+Analytics endpoints read the rollups only, never the log or the OLTP
+tables.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ActivitySegment, Chapter, Course, DailyActivity
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".log"
+
+
+def get_activity_setting(name, default):
+    return getattr(settings, "ACTIVITY_LOG", {}).get(name, default)
+
+
+def get_log_directory():
+    return Path(get_activity_setting("DIRECTORY", settings.BASE_DIR / "activity_log"))
+
+
+class ActivityLog:
+    """
+    Buffered writer for this process's current segment.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buffer = []
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._pid = None
+        self._sequence = 0
+        self._thread = None
+
+    def append(self, kind, user_id=None, course_id=None, chapter_id=None):
+        if not get_activity_setting("ENABLED", True):
+            return
+        record = [int(time.time()), kind, user_id, course_id, chapter_id]
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            buffered = len(self._buffer)
+
+        if buffered >= get_activity_setting("BUFFER_SIZE", 256):
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def flush(self):
+        """
+        Write buffered records to the current segment, sealing it if it is
+        full or old enough.
+        """
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+
+            if self._pid != os.getpid():
+                # Forked worker: the inherited segment belongs to the parent.
+                self._file = None
+                self._pid = os.getpid()
+
+            if lines:
+                data = "".join(lines).encode()
+                segment = self._file or self._open_segment()
+                segment.write(data)
+                segment.flush()
+                self._size += len(data)
+
+            if self._file is not None and (
+                self._size >= get_activity_setting("MAX_SEGMENT_BYTES", 8 * 1024 * 1024)
+                or time.monotonic() - self._opened_at
+                >= get_activity_setting("MAX_SEGMENT_SECONDS", 300)
+            ):
+                self._seal()
+
+    def close(self):
+        self.flush()
+        with self._write_lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._seal()
+
+    def _open_segment(self):
+        directory = get_log_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._sequence += 1
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        name = f"{stamp}-{os.getpid()}-{self._sequence}{OPEN_SUFFIX}"
+        self._path = directory / name
+        self._file = open(self._path, "ab")
+        self._opened_at = time.monotonic()
+        self._size = 0
+        return self._file
+
+    def _seal(self):
+        self._file.close()
+        self._file = None
+        self._path.rename(self._path.with_suffix(SEALED_SUFFIX))
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-log-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(get_activity_setting("FLUSH_INTERVAL", 1))
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write the activity log")
+
+
+activity_log = ActivityLog()
+atexit.register(activity_log.close)
+
+
+def log_event(kind, user=None, course_id=None, chapter_id=None):
+    """
+    Append one activity record. Never raises into the request.
+    """
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    try:
+        activity_log.append(kind, user_id, course_id, chapter_id)
+    except Exception:
+        logger.exception("Failed to record %s activity", kind)
+
+
+def ready_segments(directory=None, stale_after=None):
+    """
+    Sealed segments, plus open segments untouched for ``stale_after``
+    seconds (left behind by a worker that died before sealing them).
+    """
+    directory = Path(directory or get_log_directory())
+    if not directory.is_dir():
+        return []
+    if stale_after is None:
+        stale_after = 2 * get_activity_setting("MAX_SEGMENT_SECONDS", 300)
+
+    now = time.time()
+    segments = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix == SEALED_SUFFIX:
+            segments.append(path)
+        elif path.suffix == OPEN_SUFFIX and now - path.stat().st_mtime >= stale_after:
+            segments.append(path)
+    return segments
+
+
+def _read_segment(path, counts):
+    tz = timezone.get_current_timezone()
+    records = 0
+    with open(path, "rb") as segment:
+        for line in segment:
+            try:
+                stamp, kind, _user_id, course_id, chapter_id = json.loads(line)
+            except ValueError:
+                # A torn final line from a crashed writer.
+                continue
+            day = datetime.fromtimestamp(stamp, tz).date()
+            counts[(day, kind, course_id, chapter_id)] += 1
+            records += 1
+    return records
+
+
+def rollup(directory=None, stale_after=None):
+    """
+    Fold ready segments into ``DailyActivity`` and delete them. Returns
+    ``(segments, records)`` processed. Run one rollup at a time.
+    """
+    paths = ready_segments(directory, stale_after)
+    done = set(
+        ActivitySegment.objects.filter(
+            name__in=[path.stem for path in paths]
+        ).values_list("name", flat=True)
+    )
+
+    counts = Counter()
+    markers = []
+    for path in paths:
+        if path.stem in done:
+            continue
+        records = _read_segment(path, counts)
+        markers.append(ActivitySegment(name=path.stem, records=records))
+
+    # Events may refer to courses/chapters deleted since; drop those.
+    course_ids = {key[2] for key in counts if key[2] is not None}
+    chapter_ids = {key[3] for key in counts if key[3] is not None}
+    courses = set(Course.objects.filter(pk__in=course_ids).values_list("pk", flat=True))
+    chapters = set(
+        Chapter.objects.filter(pk__in=chapter_ids).values_list("pk", flat=True)
+    )
+    counts = {
+        key: count
+        for key, count in counts.items()
+        if (key[2] is None or key[2] in courses)
+        and (key[3] is None or key[3] in chapters)
+    }
+
+    with transaction.atomic():
+        existing = {}
+        if counts:
+            rows = DailyActivity.objects.filter(
+                Q(chapter_id__in=chapters) | Q(chapter__isnull=True),
+                date__in={key[0] for key in counts},
+            )
+            existing = {
+                (row.date, row.kind, row.course_id, row.chapter_id): row for row in rows
+            }
+
+        updated, created = [], []
+        for (day, kind, course_id, chapter_id), count in counts.items():
+            row = existing.get((day, kind, course_id, chapter_id))
+            if row is None:
+                created.append(
+                    DailyActivity(
+                        date=day,
+                        kind=kind,
+                        course_id=course_id,
+                        chapter_id=chapter_id,
+                        count=count,
+                    )
+                )
+            else:
+                row.count += count
+                updated.append(row)
+
+        DailyActivity.objects.bulk_create(created, batch_size=500)
+        DailyActivity.objects.bulk_update(updated, ["count"], batch_size=500)
+        ActivitySegment.objects.bulk_create(markers)
+
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+    return len(markers), sum(marker.records for marker in markers)
@@ -1,37 +1,195 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-from .models import Chapter, Course, Enrollment, Profile
+from .deletion import delete_course, delete_user
+from .models import (
+    Chapter,
+    Course,
+    DeletionJob,
+    Enrollment,
+    Notification,
+    Profile,
+    WaitlistEntry,
+)
+from .row_serializers import count_of
+
+
+def estimated_row_count(model, using):
+    """
+    Planner/storage estimate of the table's row count, or None if the
+    backend has no cheap one. Never scans the table.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            # Read from the end of the rowid b-tree; overestimates after deletes.
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded ``COUNT(*)``.
+
+    Unfiltered changelists use the table estimate; filtered or searched
+    ones count at most ``count_limit`` matching rows.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None:
+                return estimate
+        return queryset.order_by().values("pk")[: self.count_limit].count()
+
+
+class ScalableAdminMixin:
+    """
+    Changelist defaults whose cost does not grow with the table: estimated
+    counts, no full result count, and a joined (not per-row) load of the
+    related objects shown in ``list_display``.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class BackgroundDeletionAdminMixin:
+    """
+    Delete through a background job (``api/deletion.py``) instead of
+    Django's collector, which loads every dependent row, first to list them
+    on the confirmation page and then to delete them.
+    """
+
+    # delete_course or delete_user, as a staticmethod.
+    delete_in_background = None
+
+    def get_deleted_objects(self, objs, request):
+        # (objects, counts, permissions needed, protected); dependents are
+        # not listed because they are not loaded.
+        names = [str(obj) for obj in objs]
+        return names, {self.model._meta.verbose_name_plural: len(names)}, set(), []
+
+    def delete_model(self, request, obj):
+        self.delete_in_background(obj, requested_by=request.user)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_in_background(obj, requested_by=request.user)
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class ScalableUserAdmin(BackgroundDeletionAdminMixin, ScalableAdminMixin, UserAdmin):
+    delete_in_background = staticmethod(delete_user)
+    # Exact username / prefix email lookups can use the column indexes.
+    search_fields = ["username__exact", "email__startswith"]
 
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ["user", "role", "bio"]
     list_filter = ["role"]
-    search_fields = ["user__username", "user__email"]
+    list_select_related = ["user"]
+    search_fields = ["user__username__exact", "user__email__startswith"]
+    raw_id_fields = ["user"]
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ["title", "created_by", "created_at", "student_count"]
-    list_filter = ["created_by", "created_at"]
-    search_fields = ["title", "description"]
+class CourseAdmin(BackgroundDeletionAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    delete_in_background = staticmethod(delete_course)
 
-    def student_count(self, obj):
-        return obj.enrollments.count()
+    list_display = [
+        "title",
+        "created_by",
+        "created_at",
+        "student_count",
+        "capacity",
+        "seats_taken",
+    ]
+    list_filter = ["created_at"]
+    list_select_related = ["created_by"]
+    search_fields = ["title__startswith", "created_by__username__exact"]
+    autocomplete_fields = ["created_by"]
+    readonly_fields = ["seats_taken"]
+
+    def get_queryset(self, request):
+        # Correlated subquery: evaluated for the page's rows only.
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(student_count=count_of(Enrollment, "course"))
+        )
 
-    student_count.short_description = "Students Enrolled"
+    @admin.display(description="Students Enrolled", ordering="student_count")
+    def student_count(self, obj):
+        return obj.student_count
 
 
 @admin.register(Chapter)
-class ChapterAdmin(admin.ModelAdmin):
+class ChapterAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ["title", "course", "order", "is_public", "created_at"]
-    list_filter = ["course", "is_public", "created_at"]
-    search_fields = ["title", "course__title"]
+    list_filter = ["is_public", "created_at"]
+    list_select_related = ["course"]
+    search_fields = ["title__startswith", "course__title__startswith"]
     ordering = ["course", "order"]
+    autocomplete_fields = ["course"]
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ["student", "course", "enrolled_at"]
-    list_filter = ["course", "enrolled_at"]
-    search_fields = ["student__username", "course__title"]
+    list_filter = ["enrolled_at"]
+    list_select_related = ["student", "course"]
+    search_fields = ["student__username__exact", "course__title__startswith"]
+    ordering = ["-id"]
+    autocomplete_fields = ["student", "course"]
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ["student", "course", "created_at"]
+    list_select_related = ["student", "course"]
+    search_fields = ["student__username__exact", "course__title__startswith"]
+    ordering = ["course", "id"]
+    autocomplete_fields = ["student", "course"]
+
+
+@admin.register(Notification)
+class NotificationAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ["recipient", "kind", "chapter", "created_at", "read_at"]
+    list_filter = ["kind"]
+    list_select_related = ["recipient", "chapter"]
+    search_fields = ["recipient__username__exact", "chapter__title__startswith"]
+    ordering = ["-id"]
+    autocomplete_fields = ["recipient", "course", "chapter"]
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ["kind", "object_id", "status", "deleted_rows", "created_at"]
+    list_filter = ["kind", "status"]
+    ordering = ["-id"]
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
@@ -0,0 +1,244 @@
+"""
+Content-addressed storage for chapter media (images).
+
+Uploads are streamed to disk in ``CHUNK_SIZE`` pieces while being hashed,
+then renamed into place under their SHA-256 digest
+(``<DIRECTORY>/ab/cd/abcd...``), so identical files are stored once and a
+stored file never changes. Chapter documents reference assets by digest
+instead of embedding base64 data URLs:
+
+    {"type": "img", "asset": "<sha256>", "url": "/api/assets/<sha256>/", ...}
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import Asset
+
+# Leading bytes of the accepted formats. SVG is deliberately absent: it can
+# carry scripts and assets are served from the API's origin.
+SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+SNIFF_BYTES = 12
+
+DATA_URL = re.compile(r"data:(image/[\w.+-]+);base64,", re.IGNORECASE)
+
+
+class AssetError(ValueError):
+    """
+    Raised when an upload is rejected; ``status`` is the HTTP status to
+    answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_asset_setting(name, default):
+    return getattr(settings, "ASSET_STORAGE", {}).get(name, default)
+
+
+def get_asset_directory():
+    return Path(get_asset_setting("DIRECTORY", settings.BASE_DIR / "assets"))
+
+
+def asset_path(sha256):
+    return get_asset_directory() / sha256[:2] / sha256[2:4] / sha256
+
+
+def asset_url(sha256):
+    return reverse("asset-detail", args=[sha256])
+
+
+def sniff_content_type(head):
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def store_stream(stream, user=None, content_length=None):
+    """
+    Store the bytes read from ``stream`` and return ``(asset, created)``.
+
+    Nothing larger than one chunk is held in memory. Raises ``AssetError``
+    for empty, oversized or unsupported uploads.
+    """
+    max_size = get_asset_setting("MAX_SIZE", 10 * 1024 * 1024)
+    chunk_size = get_asset_setting("CHUNK_SIZE", 64 * 1024)
+    if content_length is not None and content_length > max_size:
+        raise AssetError(f"Assets may be at most {max_size} bytes.", status=413)
+
+    tmp_dir = get_asset_directory() / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        content_type = None
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise AssetError(
+                        f"Assets may be at most {max_size} bytes.", status=413
+                    )
+                if content_type is None:
+                    # Reject unsupported files before reading all of them.
+                    head += chunk[: SNIFF_BYTES - len(head)]
+                    if len(head) >= SNIFF_BYTES:
+                        content_type = _require_type(head)
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        if size == 0:
+            raise AssetError("The upload is empty.")
+        content_type = content_type or _require_type(head)
+
+        sha256 = digest.hexdigest()
+        path = asset_path(sha256)
+        if path.exists():
+            os.unlink(tmp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return Asset.objects.get_or_create(
+        sha256=sha256,
+        defaults={"content_type": content_type, "size": size, "created_by": user},
+    )
+
+
+def _require_type(head):
+    content_type = sniff_content_type(head)
+    if content_type is None:
+        raise AssetError(
+            "Only PNG, JPEG, GIF and WebP images are accepted.", status=415
+        )
+    return content_type
+
+
+def extract_inline_assets(document, user=None):
+    """
+    Move base64 ``data:image/...`` URLs in a chapter document into the asset
+    store. Returns ``(document, assets)``: a rewritten copy in which each
+    such node references its asset by digest, and the assets stored.
+    Images that cannot be stored are left inline.
+    """
+    assets = []
+
+    def visit(node):
+        if isinstance(node, list):
+            return [visit(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        result = {}
+        for key, value in node.items():
+            match = DATA_URL.match(value) if isinstance(value, str) else None
+            if match is None:
+                result[key] = visit(value)
+                continue
+            try:
+                data = base64.b64decode(value[match.end() :])
+                asset, _ = store_stream(io.BytesIO(data), user=user)
+            except (binascii.Error, AssetError):
+                result[key] = value
+                continue
+            assets.append(asset)
+            result[key] = asset_url(asset.sha256)
+            result["asset"] = asset.sha256
+        return result
+
+    return visit(document), assets
+
+
+def has_inline_assets(document):
+    """
+    Cheap check for data URLs anywhere in a decoded document.
+    """
+    if isinstance(document, str):
+        return DATA_URL.match(document) is not None
+    if isinstance(document, list):
+        return any(has_inline_assets(item) for item in document)
+    if isinstance(document, dict):
+        return any(has_inline_assets(value) for value in document.values())
+    return False
+
+
+class FileRange:
+    """
+    The next ``length`` bytes of an open file, for ``FileResponse``.
+
+    Keeps ``fileno()`` so WSGI servers with sendfile support (gunicorn)
+    still send the range zero-copy from the current offset, bounded by the
+    Content-Length header.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range: bytes=...`` header against a file of
+    ``size`` bytes. Returns ``(start, end)`` (inclusive), ``None`` to serve
+    the whole file (absent, multi-range or malformed headers), or raises
+    ``AssetError`` with status 416 when the range is unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise AssetError("Range not satisfiable.", status=416)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise AssetError("Range not satisfiable.", status=416)
+    return start, end
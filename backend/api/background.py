@@ -0,0 +1,60 @@
+"""
+Shared thread pool for best-effort work done after a response, such as
+warming caches.
+
+Tasks must not be needed for correctness: they run outside the request's
+transaction, their exceptions are only logged, and pending tasks are lost if
+the process exits.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_background_setting(name, default):
+    return getattr(settings, "BACKGROUND_TASKS", {}).get(name, default)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_background_setting("MAX_WORKERS", 4),
+                thread_name_prefix="background",
+            )
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", fn.__qualname__)
+
+
+def _run_in_pool(fn, args, kwargs):
+    try:
+        return _run(fn, args, kwargs)
+    finally:
+        # Pool threads are long-lived; drop connections past CONN_MAX_AGE.
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run ``fn(*args, **kwargs)`` on the shared pool, or inline when
+    ``BACKGROUND_TASKS["ENABLED"]`` is off (tests, management commands).
+    """
+    if not get_background_setting("ENABLED", True):
+        return _run(fn, args, kwargs)
+    return get_executor().submit(_run_in_pool, fn, args, kwargs)
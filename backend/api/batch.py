@@ -0,0 +1,205 @@
+"""
+Execution of ``POST /api/batch/`` entries.
+
+Each entry is dispatched straight to its view through the URLconf, so the
+middleware stack runs once, for the batch request: the whole batch takes a
+single ``AdmissionControlMiddleware`` slot, and the session, CSRF, auth and
+security-header middleware don't run per entry. That's harmless for the API
+views (JWT-authenticated, JSON only, with DRF throttles and permissions
+applied per entry). Async views (the event stream) and streaming responses
+(asset downloads) can't be returned in a JSON result and get a 400.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+
+from .compression import decompress
+from .loaders import get_loaders
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Request metadata copied from the outer request into each entry: the
+# client's identity and content negotiation. Anything else (conditional
+# headers, Accept-Encoding, Idempotency-Key) applies to the batch request
+# itself, not to the entries.
+INHERITED = (
+    "REMOTE_ADDR",
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "SERVER_PROTOCOL",
+    "HTTP_HOST",
+    "HTTP_X_FORWARDED_FOR",
+    "HTTP_X_FORWARDED_PROTO",
+    "HTTP_AUTHORIZATION",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT",
+    "HTTP_ACCEPT_LANGUAGE",
+    "HTTP_PURPOSE",
+    "HTTP_SEC_PURPOSE",
+)
+
+# Response headers that describe the entry's HTTP framing rather than its
+# result; the body in the result is already decoded.
+NOT_FORWARDED = ("Content-Type", "Content-Length", "Content-Encoding", "Vary", "Allow")
+
+
+def get_batch_setting(name, default):
+    return getattr(settings, "BATCH_REQUESTS", {}).get(name, default)
+
+
+def build_subrequest(request, method, path, body):
+    """
+    Build a Django request for one batch entry, inheriting the client
+    metadata in ``INHERITED`` (host, remote address, credentials, content
+    negotiation) from the outer request.
+    """
+    url = urlsplit(path)
+    payload = b"" if body is None else json.dumps(body).encode()
+
+    environ = {key: request.META[key] for key in INHERITED if key in request.META}
+    environ.update(
+        {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(payload)),
+            "wsgi.input": BytesIO(payload),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+    return WSGIRequest(environ)
+
+
+def _error(status, detail):
+    return {"status": status, "headers": {}, "body": {"detail": detail}}
+
+
+def run_subrequest(request, entry, share_loaders=True):
+    """
+    Execute one batch entry through the URLconf and return its result.
+
+    The outer request's authenticated user is handed to the sub-request via
+    DRF's forced authentication, so the JWT is decoded and the user loaded
+    once for the whole batch. With ``share_loaders``, sub-requests also
+    share the outer request's loaders (``api/loaders.py``), so a course or
+    membership looked up by one entry is not queried again by the next.
+    Loaders are not thread-safe: entries run concurrently get their own.
+    """
+    method = entry["method"]
+    path = entry["path"]
+
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return _error(404, "Not found.")
+    if iscoroutinefunction(match.func):
+        return _error(400, "Streaming endpoints cannot be batched.")
+
+    subrequest = build_subrequest(request, method, path, entry.get("body"))
+    subrequest.resolver_match = match
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    if share_loaders:
+        subrequest._loaders = get_loaders(request)
+
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+    except Http404:
+        # Raised by plain Django views; DRF views turn it into a response.
+        return _error(404, "Not found.")
+    except Exception:
+        # One failing entry must not discard the results of the others.
+        logger.exception("Batch entry %s %s failed", method, path)
+        return _error(500, "Internal server error.")
+
+    if getattr(response, "streaming", False):
+        # Closes the file behind a FileResponse.
+        response.close()
+        return _error(400, "Streaming endpoints cannot be batched.")
+    try:
+        return _result(response)
+    except Exception:
+        logger.exception("Batch entry %s %s failed", method, path)
+        return _error(500, "Internal server error.")
+
+
+def _result(response):
+    """
+    The ``{"status", "headers", "body"}`` result for an entry's response.
+    """
+    if getattr(response, "data", None) is not None:
+        body = response.data
+    else:
+        if hasattr(response, "render"):
+            response.render()
+        # Entries are not offered compression, but undo any encoding a
+        # view applied anyway before reading the body.
+        content = decompress(
+            getattr(response, "content", b""), response.get("Content-Encoding")
+        )
+        if content and response.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(content)
+        else:
+            body = content.decode() or None
+
+    headers = {
+        name: value for name, value in response.items() if name not in NOT_FORWARDED
+    }
+    return {"status": response.status_code, "headers": headers, "body": body}
+
+
+def _run_in_thread(request, entry):
+    try:
+        return run_subrequest(request, entry, share_loaders=False)
+    finally:
+        # Worker threads open their own connections; don't leak them.
+        connections.close_all()
+
+
+def run_batch(request, entries, parallel=False):
+    """
+    Execute ``entries`` in order and return their results in order.
+
+    With ``parallel``, each run of consecutive safe (read-only) entries is
+    executed concurrently; writes act as barriers so that a read listed
+    after a write always observes it.
+    """
+    results = []
+    group = []
+    max_workers = get_batch_setting("MAX_WORKERS", 4)
+
+    def flush_group():
+        if len(group) == 1:
+            results.append(run_subrequest(request, group[0]))
+        elif group:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(group))) as pool:
+                results.extend(pool.map(lambda e: _run_in_thread(request, e), group))
+        group.clear()
+
+    for entry in entries:
+        if parallel and entry["method"] in SAFE_METHODS:
+            group.append(entry)
+            continue
+        flush_group()
+        results.append(run_subrequest(request, entry))
+        if entry["method"] not in SAFE_METHODS:
+            # Later entries must not see rows loaded before this write.
+            get_loaders(request).clear()
+
+    flush_group()
+    return results
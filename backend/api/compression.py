@@ -0,0 +1,128 @@
+"""
+Content-encoding negotiation with cached, precompressed response bodies.
+
+Large, slowly changing responses (chapter details) are compressed once per
+version: the compressed body is cached under the response's ETag and the
+negotiated encoding, so repeat requests cost a cache read instead of a
+render plus compression. gzip is always available; brotli (``br``) and
+zstd are offered when the ``brotli`` / ``zstandard`` packages are installed.
+"""
+
+import gzip
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised when brotli is missing
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised when zstandard is missing
+    zstandard = None
+
+
+def get_compression_setting(name, default):
+    return getattr(settings, "RESPONSE_COMPRESSION", {}).get(name, default)
+
+
+def _gzip(data):
+    # mtime=0 keeps the output identical for identical input.
+    return gzip.compress(data, get_compression_setting("GZIP_LEVEL", 6), mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=get_compression_setting("BROTLI_QUALITY", 5))
+
+
+def _zstd(data):
+    level = get_compression_setting("ZSTD_LEVEL", 10)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# Server preference among encodings the client accepts with equal q.
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS["br"] = _brotli
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _zstd
+COMPRESSORS["gzip"] = _gzip
+
+DECOMPRESSORS = {"gzip": gzip.decompress}
+if brotli is not None:
+    DECOMPRESSORS["br"] = brotli.decompress
+if zstandard is not None:
+    # Frames written by ZstdCompressor.compress() record their size.
+    DECOMPRESSORS["zstd"] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+
+
+def decompress(data, encoding):
+    """
+    Undo ``Content-Encoding: encoding`` on ``data`` (identity when empty).
+    """
+    if not encoding or encoding == "identity":
+        return data
+    return DECOMPRESSORS[encoding](data)
+
+
+def negotiate_encoding(request):
+    """
+    Pick the best supported encoding from ``Accept-Encoding``, or ``None``
+    for an uncompressed response.
+    """
+    accepted = {}
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        match = re.fullmatch(r"\s*([\w*-]+)\s*(?:;\s*q=([\d.]+))?\s*", part)
+        if match is None:
+            continue
+        try:
+            accepted[match.group(1).lower()] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+
+    best, best_q = None, 0
+    for encoding in COMPRESSORS:
+        q = accepted.get(encoding, accepted.get("*", 0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+def compressed_response(request, etag, content_type, render):
+    """
+    Return the body produced by ``render()`` as a compressed ``HttpResponse``
+    reused for as long as ``etag`` is, or ``None`` when the client accepts
+    no supported encoding. Bodies under ``MIN_SIZE`` are sent as rendered.
+
+    ``etag`` must change whenever the rendered body would.
+    """
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return None
+
+    key = f"compressed:{encoding}:{etag}"
+    body = cache.get(key)
+    if body is None:
+        data = render()
+        if len(data) < get_compression_setting("MIN_SIZE", 1024):
+            encoding, body = None, data
+        else:
+            body = COMPRESSORS[encoding](data)
+            cache.set(key, body, get_compression_setting("CACHE_TIMEOUT", 3600))
+
+    response = HttpResponse(body, content_type=content_type)
+    if encoding is not None:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
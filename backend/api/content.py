@@ -0,0 +1,67 @@
+"""
+Chapter bodies, stored apart from chapter metadata.
+
+``ChapterContent`` rows live in the ``content`` database (a second SQLite
+file, see ``ContentRouter``), so listing, permission checks and dashboards
+only touch the small metadata tables. ``Chapter.content`` loads the body
+lazily; views that need the bodies of several chapters load them in one
+query with ``load_content``.
+"""
+
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+from .models import ChapterContent
+from .routers import content_database
+
+
+@contextmanager
+def atomic_with_content():
+    """
+    Transaction over both the default and the content database.
+
+    An exception inside the block rolls back both. The content database
+    commits first, so a crash between the two commits can only leave a
+    body newer than its metadata, never metadata pointing at a lost body.
+    """
+    with transaction.atomic(), transaction.atomic(using=content_database()):
+        yield
+
+
+def load_content(chapters, raw=False):
+    """
+    Fetch the bodies of ``chapters`` in one query and cache them on each
+    instance. With ``raw`` the JSON text is attached as ``content_json``
+    (embedded as-is by ``RawJSONField``) instead of being decoded.
+
+    Chapters whose body has not been moved yet keep reading
+    ``legacy_content`` on access.
+    """
+    by_id = {chapter.pk: chapter for chapter in chapters if chapter.pk is not None}
+    if not by_id:
+        return chapters
+
+    queryset = ChapterContent.objects.filter(chapter_id__in=by_id)
+    if raw:
+        rows = queryset.values_list("chapter_id", Cast("data", TextField()))
+    else:
+        rows = queryset.values_list("chapter_id", "data")
+    for chapter_id, data in rows:
+        if raw:
+            by_id[chapter_id].content_json = data
+        else:
+            by_id[chapter_id]._content = data
+    return chapters
+
+
+def delete_content(chapter_ids):
+    """
+    Delete the bodies of deleted chapters once the deletion commits.
+    """
+    chapter_ids = list(chapter_ids)
+    transaction.on_commit(
+        lambda: ChapterContent.objects.filter(chapter_id__in=chapter_ids).delete()
+    )
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# writer (e.g. an enrollment INSERT) holds the write lock, NORMAL
+# synchronous is durable across application crashes in WAL mode, mmap
+# serves reads straight from the page cache, and busy_timeout makes
+# contending writers wait for the lock instead of failing immediately.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 128 * 1024 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+
+def get_sqlite_pragmas():
+    return {**SQLITE_PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+
+
+def apply_sqlite_pragmas(cursor, pragmas=None):
+    for name, value in (pragmas or get_sqlite_pragmas()).items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Tune each new SQLite connection as soon as Django opens it.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor)
+
+
+connection_created.connect(configure_sqlite_connection)
@@ -0,0 +1,201 @@
+"""
+Deleting courses and users with large dependent sets.
+
+``Model.delete()`` loads every related row into memory and removes them in
+one transaction, which for a course with hundreds of thousands of
+enrollments means a long-held write lock and a memory spike. Instead the
+object is hidden at once (``Course.deleted_at``, or an inactive user) and a
+``DeletionJob`` removes its rows on the background pool.
+
+``delete_rows`` walks the cascade depth first and deletes ``CHUNK_SIZE``
+primary keys at a time with raw DELETEs, children before parents. Each
+statement commits on its own, so memory and lock time are bounded by the
+chunk size, and the job's ``deleted_rows`` is advanced after every chunk.
+
+Raw deletes skip model signals. Their effects are applied up front
+(instructor stats are rebuilt when a course is hidden) or through
+``CLEANUP`` (chapter bodies in the content database). A deleted user's
+enrollments in other courses go through the ORM so that their seats are
+released and waitlists promoted. Jobs interrupted by a restart are finished
+by ``python manage.py run_deletion_jobs``.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import CASCADE, DO_NOTHING, SET_NULL, F
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.utils import timezone
+
+from .background import submit
+from .content import delete_content
+from .models import Chapter, Course, DeletionJob, Enrollment
+from .snapshot import export_on_commit
+from .stats import refresh_instructor_stats
+
+# Work done by post_delete handlers that raw deletes must still do, given
+# the primary keys of each deleted chunk.
+CLEANUP = {Chapter: delete_content}
+
+
+class DeletionError(ValueError):
+    """
+    Raised when rows cannot be deleted without Django's collector (for
+    example a PROTECT relation).
+    """
+
+
+def get_deletion_setting(name, default):
+    return getattr(settings, "DELETION", {}).get(name, default)
+
+
+def _chunks(queryset, chunk_size):
+    """
+    Yield lists of up to ``chunk_size`` primary keys from ``queryset`` until
+    it is empty. The caller must remove (or change) each chunk's rows.
+    """
+    pks = queryset.order_by().values_list("pk", flat=True)
+    while True:
+        chunk = list(pks[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+
+
+def delete_rows(queryset, chunk_size=None, progress=None):
+    """
+    Delete the rows of ``queryset`` and every row that cascades from them,
+    ``chunk_size`` at a time, without model signals. ``progress`` is called
+    with the number of rows removed by each statement. Returns the total.
+    """
+    chunk_size = chunk_size or get_deletion_setting("CHUNK_SIZE", 1000)
+    model = queryset.model
+    using = router.db_for_write(model)
+    relations = sorted(
+        (
+            relation
+            for relation in get_candidate_relations_to_delete(model._meta)
+            if relation.on_delete is not DO_NOTHING
+        ),
+        # Cascade first: there is no point in nulling rows about to go.
+        key=lambda relation: relation.on_delete is not CASCADE,
+    )
+    for relation in relations:
+        if relation.on_delete not in (CASCADE, SET_NULL):
+            raise DeletionError(
+                f"{relation.related_model.__name__}.{relation.field.name} "
+                f"uses {relation.on_delete.__name__}."
+            )
+
+    total = 0
+    for chunk in _chunks(queryset.using(using), chunk_size):
+        for relation in relations:
+            field = relation.field.name
+            related = relation.related_model._base_manager.db_manager(
+                router.db_for_write(relation.related_model)
+            ).filter(**{f"{field}__in": chunk})
+            if relation.on_delete is CASCADE:
+                total += delete_rows(related, chunk_size, progress)
+                continue
+            for related_chunk in _chunks(related, chunk_size):
+                related.model._base_manager.db_manager(related.db).filter(
+                    pk__in=related_chunk
+                ).update(**{field: None})
+
+        deleted = model._base_manager.db_manager(using).filter(pk__in=chunk)
+        count = deleted._raw_delete(using)
+        if model in CLEANUP:
+            CLEANUP[model](chunk)
+        total += count
+        if progress is not None:
+            progress(count)
+    return total
+
+
+def _start_job(kind, object_id, requested_by):
+    job = DeletionJob.objects.create(
+        kind=kind, object_id=object_id, requested_by=requested_by
+    )
+    transaction.on_commit(partial(submit, run_job, job.pk))
+    export_on_commit()
+    return job
+
+
+def delete_course(course, requested_by=None):
+    """
+    Hide ``course`` now and delete it with its chapters, enrollments and
+    other dependents in the background. Returns the ``DeletionJob``.
+    """
+    with transaction.atomic():
+        Course.objects.filter(pk=course.pk).update(deleted_at=timezone.now())
+        refresh_instructor_stats(course.created_by_id)
+        return _start_job(DeletionJob.COURSE, course.pk, requested_by)
+
+
+def delete_user(user, requested_by=None):
+    """
+    Deactivate ``user`` and hide their courses now, and delete them with
+    everything they own in the background. Returns the ``DeletionJob``.
+    """
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        Course.objects.filter(created_by=user).update(deleted_at=timezone.now())
+        return _start_job(DeletionJob.USER, user.pk, requested_by)
+
+
+def _delete_user_rows(user_id, chunk_size, progress):
+    # Enrollments in courses that stay: release their seats, promote the
+    # waitlists and update the instructors' stats through the signals.
+    enrollments = Enrollment.objects.filter(
+        student_id=user_id, course__deleted_at__isnull=True
+    )
+    for chunk in _chunks(enrollments, chunk_size):
+        with transaction.atomic():
+            count, _ = Enrollment.objects.filter(pk__in=chunk).delete()
+        progress(count)
+    delete_rows(User._base_manager.filter(pk=user_id), chunk_size, progress)
+
+
+def run_job(job_id, resume=False):
+    """
+    Run a pending or failed job (or, with ``resume``, one left running by a
+    worker that stopped). Returns ``False`` if it was not in such a state.
+    """
+    statuses = [DeletionJob.PENDING, DeletionJob.FAILED]
+    if resume:
+        statuses.append(DeletionJob.RUNNING)
+    claimed = DeletionJob.objects.filter(pk=job_id, status__in=statuses).update(
+        status=DeletionJob.RUNNING, error="", updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = DeletionJob.objects.get(pk=job_id)
+    chunk_size = get_deletion_setting("CHUNK_SIZE", 1000)
+
+    def progress(count):
+        DeletionJob.objects.filter(pk=job_id).update(
+            deleted_rows=F("deleted_rows") + count, updated_at=timezone.now()
+        )
+
+    try:
+        if job.kind == DeletionJob.COURSE:
+            delete_rows(
+                Course.all_objects.filter(pk=job.object_id), chunk_size, progress
+            )
+        else:
+            _delete_user_rows(job.object_id, chunk_size, progress)
+    except Exception as exc:
+        DeletionJob.objects.filter(pk=job_id).update(
+            status=DeletionJob.FAILED, error=str(exc), updated_at=timezone.now()
+        )
+        raise
+
+    DeletionJob.objects.filter(pk=job_id).update(
+        status=DeletionJob.DONE,
+        updated_at=timezone.now(),
+        finished_at=timezone.now(),
+    )
+    return True
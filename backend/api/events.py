@@ -0,0 +1,251 @@
+"""
+In-process pub/sub for course change events, fanned out to SSE streams.
+
+``publish()`` hands an event to the configured backend. ``LocalBackend``
+delivers it to this process's ``EventBroker`` directly; ``RedisBackend``
+publishes it on a Redis channel and every worker's listener thread delivers
+it locally, so a save in one process reaches streams held by all of them.
+
+Each subscriber owns a bounded ``asyncio.Queue``. When a slow client lets
+its queue fill up the oldest events are dropped and the subscriber is told
+to resynchronise, so memory per connection stays constant.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def get_events_setting(name, default):
+    return getattr(settings, "EVENTS", {}).get(name, default)
+
+
+def course_channel(course_id):
+    return f"course:{course_id}"
+
+
+class Subscription:
+    """
+    One stream's view of a channel. Consumed from its event loop with
+    ``await subscription.get()``.
+    """
+
+    __slots__ = ("channel", "loop", "queue", "overflowed")
+
+    def __init__(self, channel, loop, maxsize):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on self.loop.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.overflowed = True
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventBroker:
+    """
+    Fan events out to the subscriptions of this process.
+
+    ``dispatch`` may be called from any thread; delivery is scheduled once
+    per event loop rather than once per subscriber.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def subscribe(self, channel, maxsize=None):
+        maxsize = maxsize or get_events_setting("QUEUE_SIZE", 100)
+        subscription = Subscription(channel, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+
+        for loop, targets in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, targets, event)
+            except RuntimeError:
+                # The loop was closed under a stale subscription.
+                for subscription in targets:
+                    self.unsubscribe(subscription)
+
+
+def _deliver_all(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.deliver(event)
+
+
+broker = EventBroker()
+
+
+class LocalBackend:
+    """
+    Deliver events to subscribers in this process only. Suitable for a
+    single worker and for tests.
+    """
+
+    def __init__(self, broker, **options):
+        self.broker = broker
+
+    def publish(self, channel, event):
+        self.broker.dispatch(channel, event)
+
+
+class RedisBackend:
+    """
+    Deliver events to subscribers in every process through Redis pub/sub.
+
+    Requires the ``redis`` package. Options: ``URL`` (defaults to
+    ``REDIS_URL``) and ``PREFIX`` for the Redis channel names.
+    """
+
+    def __init__(self, broker, URL=None, PREFIX="lms:events:"):
+        import redis
+
+        self.broker = broker
+        self.prefix = PREFIX
+        self.client = redis.Redis.from_url(URL or settings.REDIS_URL)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, channel, event):
+        self.ensure_listener()
+        self.client.publish(self.prefix + channel, json.dumps(event))
+
+    def ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="events-redis-listener", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + "*")
+                for message in pubsub.listen():
+                    channel = message["channel"].decode()[len(self.prefix) :]
+                    self.broker.dispatch(channel, json.loads(message["data"]))
+            except Exception:
+                logger.exception("Event listener lost its Redis connection")
+                time.sleep(1)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_class = import_string(
+                get_events_setting("BACKEND", "api.events.LocalBackend")
+            )
+            _backend = backend_class(broker, **get_events_setting("OPTIONS", {}))
+        return _backend
+
+
+def reset_backend():
+    """
+    Drop the configured backend so the next call re-reads ``EVENTS``.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def publish(channel, event):
+    try:
+        get_backend().publish(channel, event)
+    except Exception:
+        # Notifications are best-effort; never fail the write that caused them.
+        logger.exception("Failed to publish event on %s", channel)
+
+
+def subscribe(channel):
+    """
+    Subscribe the running event loop to ``channel``.
+    """
+    backend = get_backend()
+    if hasattr(backend, "ensure_listener"):
+        backend.ensure_listener()
+    return broker.subscribe(channel)
+
+
+def format_sse(data=None, event=None, comment=None, retry=None):
+    lines = []
+    if comment is not None:
+        lines.append(f": {comment}")
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    if data is not None:
+        lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def chapter_event(kind, chapter):
+    """
+    Compact ``chapter.<kind>`` event; clients refetch the chapter for more.
+    """
+    return {
+        "type": f"chapter.{kind}",
+        "course": chapter.course_id,
+        "chapter": {
+            "id": chapter.pk,
+            "title": chapter.title,
+            "order": chapter.order,
+            "is_public": chapter.is_public,
+            "revision": chapter.revision,
+        },
+    }
+
+
+def publish_on_commit(channel, event):
+    """
+    Publish once the current transaction commits, so subscribers never
+    refetch data that was rolled back or is not visible yet.
+    """
+    transaction.on_commit(lambda: publish(channel, event))
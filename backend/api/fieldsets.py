@@ -0,0 +1,49 @@
+"""
+``?fields=`` and ``?expand=`` query parameters for read endpoints.
+
+``?fields=id,title,created_by.username`` limits a response to the named
+fields; dotted names select inside nested objects. ``?expand=created_by``
+replaces the compact form of a relation with the full nested object, for
+the fields a serializer declares expandable. Both are parsed into nested
+dicts (``{"id": {}, "created_by": {"username": {}}}``) where an empty dict
+means "everything below here".
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_fieldset(value):
+    """
+    Parse a comma-separated list of (dotted) field names, or return
+    ``None`` when the parameter is absent or empty.
+    """
+    fieldset = {}
+    for name in (value or "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        node = fieldset
+        for part in name.split("."):
+            node = node.setdefault(part, {})
+    return fieldset or None
+
+
+def requested_fieldsets(request):
+    """
+    Return ``(fields, expand)`` from the request's query parameters. Only
+    read requests are shaped: on writes the serializer's fields are also
+    its inputs.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    params = request.query_params
+    return parse_fieldset(params.get("fields")), parse_fieldset(params.get("expand"))
+
+
+def subset(fieldset, name):
+    """
+    The part of ``fieldset`` below ``name``; ``None`` selects everything.
+    """
+    if fieldset is None:
+        return None
+    return fieldset.get(name) or None
@@ -0,0 +1,184 @@
+"""
+``Idempotency-Key`` support for non-idempotent POST endpoints.
+
+A client that retries a request with the same ``Idempotency-Key`` header
+gets the first response replayed (marked ``Idempotent-Replayed: true``)
+instead of the work being done again: no second password hash on register,
+no ``IntegrityError`` round trip on enroll or chapter create.
+
+Responses are stored in the Django cache for ``TTL`` seconds, keyed by the
+caller (user, or client IP when anonymous), method, path and key. While the
+first request is in flight it holds a ``cache.add`` lock; duplicates poll for
+its result for up to ``WAIT_TIMEOUT`` seconds and replay it. Server errors
+and throttled responses are not stored, so those can be retried. Use a
+shared cache (``REDIS_URL``) so retries reaching another worker are seen.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Response headers worth replaying; the rest are recomputed on render.
+REPLAYED_HEADERS = ("Location",)
+
+
+def get_idempotency_setting(name, default):
+    return getattr(settings, "IDEMPOTENCY", {}).get(name, default)
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def idempotency_cache_key(request, key):
+    if request.user.is_authenticated:
+        caller = f"user:{request.user.pk}"
+    else:
+        caller = f"ip:{BaseThrottle().get_ident(request)}"
+    scope = f"{caller}:{request.method}:{request.path}:{key}"
+    return f"idempotency:{_digest(scope)}"
+
+
+def request_fingerprint(request):
+    """
+    Digest of the request body, so a key reused for a different payload is
+    rejected instead of replaying an unrelated response. Keyed with
+    ``SECRET_KEY``: bodies may hold passwords, and the digest is stored.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hmac.new(
+        settings.SECRET_KEY.encode(), body.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def _replay(stored, replay_data):
+    data = stored["data"]
+    if replay_data is not None:
+        data = replay_data(data)
+    response = Response(data, status=stored["status"])
+    for name, value in stored["headers"].items():
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _stored_response(cache_key, fingerprint, replay_data):
+    """
+    Replay the stored response for ``cache_key``, ``None`` if there is none.
+    """
+    stored = cache.get(cache_key)
+    if stored is None:
+        return None
+    if stored["fingerprint"] != fingerprint:
+        return Response(
+            {"error": f"{HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return _replay(stored, replay_data)
+
+
+def _storable(response):
+    return (
+        isinstance(response, Response)
+        and response.status_code < 500
+        and response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
+
+def _wait_for_result(cache_key, lock_key, fingerprint, replay_data):
+    """
+    Poll for the result of the in-flight request holding ``lock_key``.
+    Returns ``None`` if its lock is gone without a result (it failed), so
+    the caller can try to run the request itself.
+    """
+    deadline = time.monotonic() + get_idempotency_setting("WAIT_TIMEOUT", 10)
+    interval = get_idempotency_setting("POLL_INTERVAL", 0.05)
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        response = _stored_response(cache_key, fingerprint, replay_data)
+        if response is not None:
+            return response
+        if cache.get(lock_key) is None:
+            return None
+    response = Response(
+        {"error": "A request with this Idempotency-Key is still in progress."},
+        status=status.HTTP_409_CONFLICT,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def idempotent(view_method=None, *, store_data=None, replay_data=None):
+    """
+    Make a DRF view method (``post``, ``create`` or an ``@action``) honour
+    the ``Idempotency-Key`` header. It runs after authentication,
+    permissions and throttling, so rejected requests are never stored.
+
+    ``store_data(response)`` picks what is cached instead of
+    ``response.data`` and ``replay_data(stored)`` rebuilds the replayed
+    body from it, for responses carrying secrets (tokens) that must not
+    sit in the cache.
+    """
+    if view_method is None:
+        return partial(idempotent, store_data=store_data, replay_data=replay_data)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = idempotency_cache_key(request, key)
+        lock_key = f"{cache_key}:lock"
+        fingerprint = request_fingerprint(request)
+
+        while True:
+            response = _stored_response(cache_key, fingerprint, replay_data)
+            if response is not None:
+                return response
+            # The lock expires on its own if this worker dies mid-request.
+            if cache.add(lock_key, True, get_idempotency_setting("LOCK_TIMEOUT", 30)):
+                break
+            response = _wait_for_result(
+                cache_key, lock_key, fingerprint, replay_data
+            )
+            if response is not None:
+                return response
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            if _storable(response):
+                stored = {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": (
+                        response.data if store_data is None else store_data(response)
+                    ),
+                    "headers": {
+                        name: response[name]
+                        for name in REPLAYED_HEADERS
+                        if response.has_header(name)
+                    },
+                }
+                cache.set(cache_key, stored, get_idempotency_setting("TTL", 86400))
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
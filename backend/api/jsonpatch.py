@@ -0,0 +1,205 @@
+"""
+Minimal JSON Patch (RFC 6902) and JSON Pointer (RFC 6901) implementation
+used for delta updates of chapter content.
+"""
+
+import copy
+
+
+class JsonPatchError(ValueError):
+    """
+    Raised when a patch is malformed or cannot be applied to the document.
+    """
+
+
+def parse_pointer(pointer):
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer {pointer!r}.")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")
+    ]
+
+
+def _list_index(container, token, allow_end=False):
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index {token!r}.")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"Array index {index} out of range.")
+    return index
+
+
+def _resolve(document, tokens):
+    """
+    Return the container addressed by all but the last token.
+    """
+    node = document
+    for token in tokens[:-1]:
+        if isinstance(node, list):
+            node = node[_list_index(node, token)]
+        elif isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"Path segment {token!r} does not exist.")
+            node = node[token]
+        else:
+            raise JsonPatchError(f"Cannot traverse into a scalar at {token!r}.")
+    return node
+
+
+def get_value(document, pointer):
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        return document
+    parent = _resolve(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise JsonPatchError(f"Path {pointer!r} does not exist.")
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise JsonPatchError(f"Cannot add to a scalar at {token!r}.")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root.")
+    parent = _resolve(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token))
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    raise JsonPatchError(f"Path segment {token!r} does not exist.")
+
+
+def _json_equal(a, b):
+    # Python treats True == 1, JSON does not.
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(_json_equal, a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    return a == b
+
+
+def apply_patch(document, operations):
+    """
+    Apply ``operations`` to ``document`` and return the patched document.
+
+    The document is modified in place (the root is returned because ``add``
+    or ``replace`` at ``""`` swap it out). Callers must not reuse it if a
+    ``JsonPatchError`` is raised.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON Patch must be an array of operations.")
+
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation:
+            raise JsonPatchError("Each operation must be an object with an 'op'.")
+        op = operation["op"]
+        try:
+            tokens = parse_pointer(operation["path"])
+            if op == "add":
+                document = _add(document, tokens, copy.deepcopy(operation["value"]))
+            elif op == "remove":
+                _remove(document, tokens)
+            elif op == "replace":
+                if not tokens:
+                    document = copy.deepcopy(operation["value"])
+                else:
+                    _remove(document, tokens)
+                    document = _add(document, tokens, copy.deepcopy(operation["value"]))
+            elif op == "move":
+                source = parse_pointer(operation["from"])
+                if tokens[: len(source)] == source and tokens != source:
+                    raise JsonPatchError("Cannot move a value into one of its children.")
+                if tokens != source:
+                    document = _add(document, tokens, _remove(document, source))
+            elif op == "copy":
+                value = get_value(document, operation["from"])
+                document = _add(document, tokens, copy.deepcopy(value))
+            elif op == "test":
+                if not _json_equal(get_value(document, operation["path"]), operation["value"]):
+                    raise JsonPatchError(f"Test failed at {operation['path']!r}.")
+            else:
+                raise JsonPatchError(f"Unknown operation {op!r}.")
+        except KeyError as exc:
+            raise JsonPatchError(f"Operation {op!r} is missing {exc.args[0]!r}.")
+
+    return document
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _diff(old, new, path, operations):
+    if _json_equal(old, new):
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key in old:
+                _diff(old[key], value, child, operations)
+            else:
+                operations.append({"op": "add", "path": child, "value": value})
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        # Trim the common prefix and suffix; for a document edit this narrows
+        # the change down to the few blocks that were actually touched.
+        start = 0
+        limit = min(len(old), len(new))
+        while start < limit and _json_equal(old[start], new[start]):
+            start += 1
+        end = 0
+        while end < limit - start and _json_equal(old[-1 - end], new[-1 - end]):
+            end += 1
+        old_middle = old[start : len(old) - end]
+        new_middle = new[start : len(new) - end]
+
+        common = min(len(old_middle), len(new_middle))
+        for offset in range(common):
+            child = f"{path}/{start + offset}"
+            _diff(old_middle[offset], new_middle[offset], child, operations)
+        # Remove from the back so earlier indices stay valid.
+        for offset in reversed(range(common, len(old_middle))):
+            operations.append({"op": "remove", "path": f"{path}/{start + offset}"})
+        for offset in range(common, len(new_middle)):
+            child = f"{path}/{start + offset}"
+            operations.append({"op": "add", "path": child, "value": new_middle[offset]})
+        return
+    operations.append({"op": "replace", "path": path, "value": new})
+
+
+def make_patch(old, new):
+    """
+    Return a JSON Patch that turns ``old`` into ``new``.
+
+    The patch is not guaranteed to be minimal, but unchanged subtrees are
+    never included, so small edits to a large document give small patches.
+    """
+    operations = []
+    _diff(old, new, "", operations)
+    return copy.deepcopy(operations)
@@ -0,0 +1,189 @@
+"""
+Request-scoped identity maps for the rows a request reaches repeatedly.
+
+Within one request the same course and user are looked up from several
+places: the view, object permissions walking ``chapter.course.created_by``
+and serializers. ``get_loaders(request)`` returns one ``Loaders`` per
+request with a ``Loader`` per kind of row, so each row is fetched at most
+once and every caller gets the same instance. The requesting user is in it
+from the start, so ``course.created_by`` for one's own course is free.
+
+``attach`` fills a relation on many instances at once, with a single
+``in_bulk`` for the targets not loaded yet; afterwards plain attribute
+access (``chapter.course``) costs nothing either.
+
+A batch (``api/batch.py``) shares its loaders with the sub-requests it runs
+in order and clears them after each write, so later entries see the write;
+entries run in parallel get their own, as loaders are not thread-safe. Rows are not
+refreshed after the request's own ``update()`` calls; don't read a row back
+through a loader after changing it that way.
+"""
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+from .models import Course, Enrollment
+
+
+class Loader:
+    """
+    Identity map over ``fetch``, which takes a set of keys and returns a
+    dict of the ones that exist. Misses are remembered too.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self._found = {}
+
+    def key(self, key):
+        return key
+
+    def prime(self, key, value):
+        """
+        Remember ``value`` for ``key`` unless one is known already, and
+        return the value callers must share.
+        """
+        return self._found.setdefault(key, value)
+
+    def cached(self, key):
+        """
+        The value for ``key`` if it was loaded already, else ``None``.
+        """
+        keys = self._keys([key])
+        return self._found.get(keys[0]) if keys else None
+
+    def load_many(self, keys):
+        """
+        Map each existing key in ``keys`` to its value, querying once for
+        all the keys not loaded yet.
+        """
+        keys = self._keys(keys)
+        missing = {key for key in keys if key not in self._found}
+        if missing:
+            found = self.fetch(missing)
+            for key in missing:
+                self._found.setdefault(key, found.get(key))
+        return {
+            key: self._found[key] for key in keys if self._found[key] is not None
+        }
+
+    def load(self, key):
+        """
+        The value for ``key``, or ``None`` if there is none.
+        """
+        keys = self._keys([key])
+        return self.load_many(keys).get(keys[0]) if keys else None
+
+    def clear(self):
+        self._found.clear()
+
+    def _keys(self, keys):
+        # Keys that can't be primary keys (``?course_id=abc``) are misses.
+        normalized = []
+        for key in keys:
+            try:
+                normalized.append(self.key(key))
+            except (TypeError, ValueError, ValidationError):
+                continue
+        return normalized
+
+
+class ModelLoader(Loader):
+    """
+    Identity map of model instances by primary key, fetched with
+    ``queryset.in_bulk``.
+    """
+
+    def __init__(self, queryset):
+        super().__init__(queryset.in_bulk)
+        self.model = queryset.model
+
+    def key(self, key):
+        return self.model._meta.pk.to_python(key)
+
+    def prime(self, instance):
+        return super().prime(instance.pk, instance)
+
+
+class Loaders:
+    """
+    The loaders of one request, for ``user``.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.users = ModelLoader(User.objects.all())
+        self.courses = ModelLoader(Course.objects.all())
+        # Course IDs the user is enrolled in.
+        self.enrollments = Loader(self._fetch_enrollments)
+        self.loaders = {User: self.users, Course: self.courses}
+
+    def _fetch_enrollments(self, course_ids):
+        if not self.user.is_authenticated:
+            return {}
+        enrolled = Enrollment.objects.filter(
+            student_id=self.user.pk, course_id__in=course_ids
+        ).values_list("course_id", flat=True)
+        return dict.fromkeys(enrolled, True)
+
+    def is_enrolled(self, course_id):
+        return bool(self.enrollments.load(course_id))
+
+    def attach(self, instances, field, fetch=True):
+        """
+        Set the ``field`` relation on each of ``instances`` from the
+        identity map, loading the missing targets in one query (or, without
+        ``fetch``, leaving them unset). Relations already loaded are added
+        to the map. Returns the related objects in order (``None`` where
+        unset).
+        """
+        descriptor = getattr(type(instances[0]), field) if instances else None
+        missing = []
+        for instance in instances:
+            if descriptor.is_cached(instance):
+                related = getattr(instance, field)
+                if related is not None:
+                    loader = self.loaders[type(related)]
+                    descriptor.field.set_cached_value(instance, loader.prime(related))
+            else:
+                missing.append(instance)
+
+        if missing:
+            loader = self.loaders[descriptor.field.related_model]
+            attname = descriptor.field.attname
+            if fetch:
+                loader.load_many(getattr(instance, attname) for instance in missing)
+            for instance in missing:
+                related = loader.cached(getattr(instance, attname))
+                if related is not None:
+                    descriptor.field.set_cached_value(instance, related)
+
+        return [
+            getattr(instance, field) if descriptor.is_cached(instance) else None
+            for instance in instances
+        ]
+
+    def related(self, instance, field):
+        """
+        ``getattr(instance, field)`` for a foreign key, through the map.
+        """
+        return self.attach([instance], field)[0]
+
+    def clear(self):
+        for loader in (self.users, self.courses, self.enrollments):
+            loader.clear()
+
+
+def get_loaders(request):
+    """
+    The ``Loaders`` of ``request`` (a Django or DRF request), created on
+    first use with the authenticated user already in it.
+    """
+    user = request.user
+    request = getattr(request, "_request", request)
+    loaders = getattr(request, "_loaders", None)
+    if loaders is None:
+        loaders = request._loaders = Loaders(user)
+    if user.is_authenticated:
+        loaders.users.prime(user)
+    return loaders
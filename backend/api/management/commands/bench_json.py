@@ -0,0 +1,95 @@
+import io
+import json
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, RawJSON, orjson
+
+SIZES = {
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "5MB": 5 * 1024 * 1024,
+}
+
+
+def make_document(target_size):
+    """
+    Build a Slate-style chapter document of roughly ``target_size`` bytes.
+    """
+    words = ["".join(random.choices(string.ascii_lowercase, k=6)) for _ in range(500)]
+    document = []
+    size = 2
+    while size < target_size:
+        node = {
+            "type": random.choice(["p", "h2", "blockquote", "li"]),
+            "children": [
+                {"text": " ".join(random.choices(words, k=20))},
+                {"text": " ".join(random.choices(words, k=5)), "bold": True},
+            ],
+        }
+        document.append(node)
+        size += len(json.dumps(node)) + 1
+    return document
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON render/parse throughput on chapter-sized documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(
+                self.style.WARNING("orjson is not installed; fast paths fall back.")
+            )
+
+        drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        drf_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        for label, target in SIZES.items():
+            document = make_document(target)
+            payload = {"id": 1, "title": "Chapter", "content": document}
+            # Chapter.content as stored in the database column.
+            raw = json.dumps(document)
+            raw_payload = {"id": 1, "title": "Chapter", "content": RawJSON(raw)}
+            body = drf_renderer.render(payload)
+            size_mb = len(body) / (1024 * 1024)
+
+            results = [
+                ("render drf", lambda: drf_renderer.render(payload)),
+                ("render fast", lambda: fast_renderer.render(payload)),
+                (
+                    "decode+fast",
+                    lambda: fast_renderer.render({**payload, "content": json.loads(raw)}),
+                ),
+                ("render raw", lambda: fast_renderer.render(raw_payload)),
+                ("parse drf", lambda: drf_parser.parse(io.BytesIO(body))),
+                ("parse fast", lambda: fast_parser.parse(io.BytesIO(body))),
+            ]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label} ({len(body)} bytes):"))
+            for name, func in results:
+                per_call = self.measure(func, options["seconds"])
+                self.stdout.write(
+                    f"  {name:12} {per_call * 1000:9.3f} ms/op"
+                    f"  {size_mb / per_call:9.1f} MB/s"
+                )
+
+    def measure(self, func, seconds):
+        func()
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds:
+                return elapsed / runs
@@ -0,0 +1,133 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Chapter, Course, Enrollment, Profile
+from api.row_serializers import (
+    ChapterListRowSerializer,
+    CourseListRowSerializer,
+    EnrollmentRowSerializer,
+)
+from api.serializers import (
+    ChapterListSerializer,
+    CourseListSerializer,
+    EnrollmentSerializer,
+)
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the compiled list serializers match the DRF serializers and "
+        "compare their throughput. Demo rows are created and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(max(PAGE_SIZES))
+                self.run(options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        instructor = User.objects.create_user(username="bench-instructor")
+        students = User.objects.bulk_create(
+            User(username=f"bench-student-{i}", email=f"s{i}@example.com")
+            for i in range(count)
+        )
+        # bulk_create skips the post_save signal, so only half the students
+        # get a profile (the other half exercise the null profile case).
+        Profile.objects.bulk_create(
+            Profile(user=student, role="student", bio="bench")
+            for student in students[: count // 2]
+        )
+
+        courses = Course.objects.bulk_create(
+            Course(title=f"Course {i}", description="Benchmark course", created_by=instructor)
+            for i in range(count)
+        )
+        Chapter.objects.bulk_create(
+            Chapter(course=courses[0], title=f"Chapter {i}", order=i + 1, is_public=i % 2 == 0)
+            for i in range(count)
+        )
+        Enrollment.objects.bulk_create(
+            Enrollment(student=student, course=courses[i % 10])
+            for i, student in enumerate(students)
+        )
+
+    def run(self, repeat):
+        cases = [
+            (
+                "courses",
+                CourseListSerializer,
+                CourseListRowSerializer,
+                lambda: Course.objects.filter(title__startswith="Course ")
+                .select_related("created_by")
+                .prefetch_related("enrollments", "chapters")
+                .order_by("id"),
+            ),
+            (
+                "chapters",
+                ChapterListSerializer,
+                ChapterListRowSerializer,
+                lambda: Chapter.objects.filter(title__startswith="Chapter ").order_by(
+                    "order"
+                ),
+            ),
+            (
+                "enrollments",
+                EnrollmentSerializer,
+                EnrollmentRowSerializer,
+                lambda: Enrollment.objects.filter(
+                    student__username__startswith="bench-student-"
+                )
+                .select_related("student__profile", "course__created_by")
+                .prefetch_related("course__enrollments", "course__chapters")
+                .order_by("id"),
+            ),
+        ]
+
+        for name, drf_class, row_class, queryset in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}:"))
+            row_serializer = row_class()
+            for size in PAGE_SIZES:
+                objects = list(queryset()[:size])
+                rows = list(row_serializer.values(queryset())[:size])
+
+                expected = drf_class(objects, many=True).data
+                actual = row_serializer.serialize(rows)
+                if json.loads(json.dumps(expected)) != json.loads(json.dumps(actual)):
+                    raise CommandError(f"{name}: output differs at page size {size}")
+
+                drf_rate = self.rows_per_second(
+                    lambda: drf_class(objects, many=True).data, size, repeat
+                )
+                row_rate = self.rows_per_second(
+                    lambda: row_serializer.serialize(rows), size, repeat
+                )
+                self.stdout.write(
+                    f"  page {size:5}  drf {drf_rate:12,.0f} rows/s"
+                    f"  compiled {row_rate:12,.0f} rows/s"
+                    f"  ({row_rate / drf_rate:5.1f}x, output identical)"
+                )
+
+    def rows_per_second(self, func, size, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return size / best
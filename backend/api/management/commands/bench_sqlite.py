@@ -0,0 +1,157 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.db import apply_sqlite_pragmas, get_sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent enrollment writes and course reads against SQLite, "
+        "comparing Django's default setup with the tuned connection settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--enrollments", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        configs = [
+            # Rollback journal and a fresh connection per request, which is
+            # what CONN_MAX_AGE=0 with no pragmas amounts to.
+            ("default", {}, False),
+            ("tuned", get_sqlite_pragmas(), True),
+        ]
+
+        for name, pragmas, persistent in configs:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.sqlite3")
+                self.seed(path, options)
+                results = self.run(path, pragmas, persistent, options)
+            self.report(name, results, options["seconds"])
+
+    def seed(self, path, options):
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            """
+            CREATE TABLE course (id INTEGER PRIMARY KEY, title TEXT NOT NULL);
+            CREATE TABLE enrollment (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL REFERENCES course (id),
+                enrolled_at REAL NOT NULL,
+                UNIQUE (student_id, course_id)
+            );
+            CREATE INDEX enrollment_course ON enrollment (course_id);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO course (id, title) VALUES (?, ?)",
+            ((i, f"Course {i}") for i in range(1, options["courses"] + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO enrollment (student_id, course_id, enrolled_at) VALUES (?, ?, ?)",
+            (
+                (i, random.randint(1, options["courses"]), time.time())
+                for i in range(options["enrollments"])
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    def run(self, path, pragmas, persistent, options):
+        deadline = time.perf_counter() + options["seconds"]
+        results = {"read": [], "write": [], "errors": 0}
+        lock = threading.Lock()
+        next_student = iter(range(10**6, 10**9))
+
+        def connect():
+            conn = sqlite3.connect(path, isolation_level=None)
+            if pragmas:
+                apply_sqlite_pragmas(conn.cursor(), pragmas)
+            return conn
+
+        def read(conn):
+            course_id = random.randint(1, options["courses"])
+            conn.execute(
+                "SELECT COUNT(*) FROM enrollment WHERE course_id = ?", (course_id,)
+            ).fetchone()
+            conn.execute(
+                "SELECT id, student_id FROM enrollment WHERE course_id = ? "
+                "ORDER BY enrolled_at DESC LIMIT 10",
+                (course_id,),
+            ).fetchall()
+
+        def write(conn):
+            with lock:
+                student_id = next(next_student)
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO enrollment (student_id, course_id, enrolled_at) VALUES (?, ?, ?)",
+                (student_id, random.randint(1, options["courses"]), time.time()),
+            )
+            conn.execute("COMMIT")
+
+        def worker(kind, op):
+            latencies = []
+            errors = 0
+            conn = connect() if persistent else None
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if persistent:
+                        op(conn)
+                    else:
+                        fresh = connect()
+                        try:
+                            op(fresh)
+                        finally:
+                            fresh.close()
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if persistent and conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    continue
+                latencies.append(time.perf_counter() - start)
+            if conn is not None:
+                conn.close()
+            with lock:
+                results[kind].extend(latencies)
+                results["errors"] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=("read", read))
+            for _ in range(options["readers"])
+        ] + [
+            threading.Thread(target=worker, args=("write", write))
+            for _ in range(options["writers"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, name, results, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name}:"))
+        for kind in ("read", "write"):
+            latencies = sorted(results[kind])
+            if not latencies:
+                self.stdout.write(f"  {kind:5}  no operations completed")
+                continue
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"  {kind:5}  {len(latencies) / seconds:10.0f} ops/s"
+                f"  p50 {statistics.median(latencies) * 1000:7.2f} ms"
+                f"  p99 {p99 * 1000:7.2f} ms"
+            )
+        self.stdout.write(f"  errors {results['errors']}")
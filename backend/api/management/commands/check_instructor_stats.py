@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from api.models import InstructorStats
+from api.stats import COUNTERS, compute_instructor_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute instructor dashboard statistics from scratch and report rows "
+        "that drifted from the incrementally maintained values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix", action="store_true", help="Overwrite drifted rows."
+        )
+
+    def handle(self, *args, **options):
+        instructors = (
+            User.objects.filter(
+                Q(created_courses__isnull=False) | Q(stats__isnull=False)
+            )
+            .distinct()
+            .values_list("id", "username")
+            .order_by("id")
+        )
+
+        checked = drifted = 0
+        for instructor_id, username in instructors.iterator():
+            checked += 1
+            expected = compute_instructor_stats(instructor_id)
+            stats = InstructorStats.objects.filter(instructor_id=instructor_id).first()
+            if stats is None:
+                # Rows are created lazily; a missing one is not drift.
+                continue
+
+            differences = [
+                f"{name} {getattr(stats, name)} != {expected[name]}"
+                for name in COUNTERS
+                if getattr(stats, name) != expected[name]
+            ]
+            expected_recent = [entry["id"] for entry in expected["recent_enrollments"]]
+            if [entry["id"] for entry in stats.recent_enrollments] != expected_recent:
+                differences.append("recent_enrollments")
+            if not differences:
+                continue
+
+            drifted += 1
+            self.stdout.write(
+                self.style.WARNING(f"{username} (id {instructor_id}): ")
+                + ", ".join(differences)
+            )
+            if options["fix"]:
+                with transaction.atomic():
+                    InstructorStats.objects.filter(instructor_id=instructor_id).update(
+                        **expected
+                    )
+
+        summary = f"Checked {checked} instructors, {drifted} drifted."
+        if drifted and options["fix"]:
+            summary += " Fixed."
+        self.stdout.write(self.style.SUCCESS(summary) if not drifted else summary)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.snapshot import SnapshotError, export_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the public catalog (course list, course details and public "
+        "chapters) to a static snapshot and atomically make it current. Only "
+        "courses changed since the current snapshot are rendered again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            default=None,
+            help="Output directory (default: CATALOG_EXPORT['DIRECTORY']).",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Render every course instead of reusing unchanged files.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            manifest = export_catalog(options["directory"], full=options["full"])
+        except SnapshotError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {len(manifest['courses'])} courses "
+                f"({manifest['rendered']} rendered, {manifest['reused']} reused) "
+                f"and {manifest['pages']} catalog pages."
+            )
+        )
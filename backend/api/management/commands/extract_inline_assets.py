@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+from api.assets import extract_inline_assets, has_inline_assets
+from api.content import atomic_with_content
+from api.models import Chapter, ChapterContent
+from api.revisions import record_revision
+
+
+class Command(BaseCommand):
+    help = (
+        "Move base64 images embedded in chapter content into the asset store "
+        "and reference them by digest. Each changed chapter gets a new revision."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the chapters that embed images.",
+        )
+
+    def handle(self, *args, **options):
+        marker = ";base64,"
+        candidates = set(
+            ChapterContent.objects.annotate(text=Cast("data", TextField()))
+            .filter(text__contains=marker)
+            .values_list("chapter_id", flat=True)
+        ) | set(
+            Chapter.objects.annotate(text=Cast("legacy_content", TextField()))
+            .filter(text__contains=marker)
+            .values_list("pk", flat=True)
+        )
+
+        chapters = images = saved = 0
+        for chapter in Chapter.objects.filter(pk__in=candidates).order_by("pk"):
+            content = chapter.content
+            if not has_inline_assets(content):
+                continue
+            if options["dry_run"]:
+                self.stdout.write(f"Chapter {chapter.pk} embeds images.")
+                chapters += 1
+                continue
+
+            document, assets = extract_inline_assets(content)
+            if not assets:
+                self.stdout.write(
+                    self.style.WARNING(f"Chapter {chapter.pk}: no storable images.")
+                )
+                continue
+
+            with atomic_with_content():
+                chapter.content = document
+                chapter.revision += 1
+                chapter.save(update_fields=["revision", "updated_at"])
+                record_revision(chapter, previous_content=content)
+
+            chapters += 1
+            images += len(assets)
+            saved += len(json.dumps(content)) - len(json.dumps(document))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{chapters} chapters embed images.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Extracted {images} images from {chapters} chapters "
+                f"({saved} bytes removed from chapter content)."
+            )
+        )
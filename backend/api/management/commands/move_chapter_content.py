@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.content import atomic_with_content
+from api.models import Chapter, ChapterContent
+
+
+class Command(BaseCommand):
+    help = (
+        "Move chapter bodies still held in the legacy column of the default "
+        "database into the content database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Chapters moved per transaction (default: 200).",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Also delete bodies whose chapter no longer exists.",
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="VACUUM the default database afterwards to release the space.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        moved = 0
+        pending = Chapter.objects.filter(legacy_content__isnull=False).order_by("pk")
+        while True:
+            rows = list(pending.values_list("pk", "legacy_content")[:batch_size])
+            if not rows:
+                break
+            with atomic_with_content():
+                # A body saved since the upgrade is newer than the legacy one.
+                ChapterContent.objects.bulk_create(
+                    [ChapterContent(chapter_id=pk, data=data) for pk, data in rows],
+                    ignore_conflicts=True,
+                )
+                Chapter.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                    legacy_content=None
+                )
+            moved += len(rows)
+        self.stdout.write(f"Moved {moved} chapter bodies.")
+
+        if options["prune"]:
+            pruned = last = 0
+            content_ids = ChapterContent.objects.order_by("pk").values_list(
+                "pk", flat=True
+            )
+            while True:
+                ids = list(content_ids.filter(pk__gt=last)[:batch_size])
+                if not ids:
+                    break
+                last = ids[-1]
+                live = set(
+                    Chapter.objects.filter(pk__in=ids).values_list("pk", flat=True)
+                )
+                orphans = [pk for pk in ids if pk not in live]
+                pruned += ChapterContent.objects.filter(pk__in=orphans).delete()[0]
+            self.stdout.write(f"Deleted {pruned} orphaned chapter bodies.")
+
+        if options["vacuum"]:
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute("VACUUM")
+            self.stdout.write("Vacuumed the default database.")
+
+        self.stdout.write(self.style.SUCCESS("Chapter content is up to date."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from api.models import Chapter
+from api.revisions import get_revision_setting, prune_revisions
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the chapter revision retention policy: keep the newest revisions "
+        "of every chapter and squash the oldest kept delta into a snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=None,
+            help="Revisions to keep per chapter (default: CHAPTER_REVISIONS['KEEP']).",
+        )
+
+    def handle(self, *args, **options):
+        keep = options["keep"] or get_revision_setting("KEEP", 50)
+        if keep < 1:
+            raise CommandError("--keep must be at least 1.")
+
+        chapters = (
+            Chapter.objects.annotate(revision_count=Count("revisions"))
+            .filter(revision_count__gt=keep)
+            .only("id")
+        )
+        total = 0
+        for chapter in chapters.iterator():
+            with transaction.atomic():
+                total += prune_revisions(chapter, keep=keep)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} chapter revisions."))
@@ -0,0 +1,43 @@
+import math
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Course, Enrollment
+from api.ranking import trending_score
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every course's trending score from its enrollments. Needed "
+        "after changing TRENDING_HALF_LIFE_DAYS or writing enrollments without "
+        "model signals (bulk_create, raw SQL)."
+    )
+
+    def handle(self, *args, **options):
+        checked = changed = 0
+        for course_id in Course.objects.values_list("id", flat=True).iterator():
+            with transaction.atomic():
+                # Hold the row so a concurrent enrollment lands after the
+                # recomputed score instead of being overwritten by it.
+                course = (
+                    Course.objects.select_for_update()
+                    .only("trending_score")
+                    .filter(pk=course_id)
+                    .first()
+                )
+                if course is None:
+                    continue
+                times = Enrollment.objects.filter(course_id=course_id).values_list(
+                    "enrolled_at", flat=True
+                )
+                score = trending_score(times.iterator())
+                checked += 1
+                if math.isclose(course.trending_score, score, abs_tol=1e-6):
+                    continue
+                changed += 1
+                Course.objects.filter(pk=course_id).update(trending_score=score)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} courses, updated {changed}.")
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from api.activity import activity_log, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregate sealed activity log segments into the DailyActivity table "
+        "and delete them. Schedule it (e.g. every few minutes); run one at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            default=None,
+            help="Segment directory (default: ACTIVITY_LOG['DIRECTORY']).",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=None,
+            help=(
+                "Also roll up open segments not written for this many seconds "
+                "(default: twice ACTIVITY_LOG['MAX_SEGMENT_SECONDS'])."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        # Seal anything this process logged itself.
+        activity_log.close()
+        segments, records = rollup(options["directory"], options["stale_after"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rolled up {records} events from {segments} segments.")
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from api.deletion import run_job
+from api.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending and failed course/user deletion jobs, and finish the ones "
+        "left running by a worker that stopped. Progress is kept per chunk, so "
+        "an interrupted job continues where it left off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-resume",
+            action="store_true",
+            help="Skip jobs marked running (e.g. while workers are up).",
+        )
+
+    def handle(self, *args, **options):
+        statuses = [DeletionJob.PENDING, DeletionJob.FAILED]
+        if not options["no_resume"]:
+            statuses.append(DeletionJob.RUNNING)
+        job_ids = list(
+            DeletionJob.objects.filter(status__in=statuses)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        failed = 0
+        for job_id in job_ids:
+            try:
+                if not run_job(job_id, resume=not options["no_resume"]):
+                    continue
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Deletion job {job_id} failed: {exc}")
+                continue
+            job = DeletionJob.objects.get(pk=job_id)
+            self.stdout.write(
+                f"{job.get_kind_display()} {job.object_id}: "
+                f"{job.deleted_rows} rows deleted."
+            )
+
+        summary = f"Ran {len(job_ids)} deletion jobs, {failed} failed."
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else summary)
@@ -1,7 +1,8 @@
+from api.content import atomic_with_content
+from api.deletion import delete_rows
 from api.models import Chapter, Course, Enrollment, Profile
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
 
 class Command(BaseCommand):
@@ -14,13 +15,11 @@ class Command(BaseCommand):
             )
         )
 
-        with transaction.atomic():
-            # Delete dependent models first
-            Enrollment.objects.all().delete()
-            Chapter.objects.all().delete()
-            Course.objects.all().delete()
-            Profile.objects.all().delete()
-            User.objects.all().delete()
+        with atomic_with_content():
+            # Delete dependent models first, in chunks: .delete() on a whole
+            # table would load every row and its relations into memory.
+            for model in (Enrollment, Chapter, Course, Profile, User):
+                delete_rows(model._base_manager.all())
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -0,0 +1,219 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Course, Enrollment, Profile, WaitlistEntry
+from api.views import CourseViewSet
+
+
+class UnthrottledCourseViewSet(CourseViewSet):
+    # The per-course enroll throttle would turn most of the rush into 429s
+    # before it reaches seat allocation, which is what is being tested.
+    def get_throttles(self):
+        return []
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent enroll requests at one course with a capacity, then "
+        "unenroll some students, and check that no seat is oversold and that "
+        "the waitlist is promoted in arrival order. Creates its own course and "
+        "users in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=2000)
+        parser.add_argument("--capacity", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument(
+            "--unenroll",
+            type=int,
+            default=50,
+            help="Enrolled students who leave afterwards, freeing their seats.",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated data."
+        )
+
+    def handle(self, *args, **options):
+        if options["unenroll"] > min(options["capacity"], options["students"]):
+            raise CommandError("--unenroll cannot exceed the seats filled.")
+
+        course, students = self.seed(options)
+        try:
+            failures = self.run_checks(course, students, options)
+        finally:
+            if not options["keep"]:
+                self.cleanup(course, students)
+
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No overselling; waitlist order kept."))
+
+    def seed(self, options):
+        tag = uuid.uuid4().hex[:8]
+        instructor = User.objects.create_user(f"stress-{tag}-instructor")
+        instructor.profile.role = "instructor"
+        instructor.profile.save()
+        course = Course.objects.create(
+            title=f"Stress test {tag}",
+            description="Generated by stress_enroll.",
+            created_by=instructor,
+            capacity=options["capacity"],
+        )
+        students = User.objects.bulk_create(
+            User(username=f"stress-{tag}-{i}") for i in range(options["students"])
+        )
+        Profile.objects.bulk_create(
+            Profile(user=student, role="student") for student in students
+        )
+        return course, students
+
+    def fire(self, view, method, course, users, threads):
+        """
+        Send one request per user from ``threads`` threads. Returns the
+        status counts, latencies and wall time.
+        """
+        factory = APIRequestFactory()
+        pending = iter(users)
+        lock = threading.Lock()
+        statuses = Counter()
+        latencies = []
+
+        def worker():
+            while True:
+                with lock:
+                    user = next(pending, None)
+                if user is None:
+                    break
+                request = getattr(factory, method)(f"/api/courses/{course.pk}/")
+                force_authenticate(request, user=user)
+                start = time.perf_counter()
+                try:
+                    status = view(request, pk=course.pk).status_code
+                except Exception as exc:
+                    status = type(exc).__name__
+                elapsed = time.perf_counter() - start
+                with lock:
+                    statuses[status] += 1
+                    latencies.append(elapsed)
+            close_old_connections()
+            connection.close()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return statuses, latencies, time.perf_counter() - start
+
+    def report(self, name, statuses, latencies, seconds):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{name}: {len(latencies)} requests in {seconds:.2f}s "
+            f"({len(latencies) / seconds:.0f} req/s), "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p99 {p99 * 1000:.1f} ms"
+        )
+        counts = sorted(statuses.items(), key=lambda item: str(item[0]))
+        self.stdout.write(
+            "  responses: "
+            + ", ".join(f"{status}: {count}" for status, count in counts)
+        )
+
+    def run_checks(self, course, students, options):
+        failures = []
+        capacity = options["capacity"]
+        threads = options["threads"]
+
+        enroll = UnthrottledCourseViewSet.as_view({"post": "enroll"})
+        statuses, latencies, seconds = self.fire(
+            enroll, "post", course, students, threads
+        )
+        self.report("enroll", statuses, latencies, seconds)
+
+        course.refresh_from_db()
+        enrolled = Enrollment.objects.filter(course=course).count()
+        waiting = WaitlistEntry.objects.filter(course=course).count()
+        self.stdout.write(
+            f"  enrolled {enrolled}, seats_taken {course.seats_taken}, "
+            f"capacity {capacity}, waitlisted {waiting}"
+        )
+        if enrolled > capacity:
+            failures.append(f"oversold: {enrolled} enrollments for {capacity} seats")
+        if course.seats_taken != enrolled:
+            failures.append(
+                f"seats_taken is {course.seats_taken}, {enrolled} enrolled"
+            )
+        if statuses[201] != enrolled or statuses[202] != waiting:
+            failures.append("responses do not match the enrollments and waitlist")
+        errors = len(students) - statuses[201] - statuses[202]
+        if errors:
+            # Failed requests changed nothing (their transaction rolled back);
+            # on SQLite they are writers that outwaited busy_timeout.
+            self.stdout.write(
+                self.style.WARNING(f"  {errors} requests failed without effect")
+            )
+
+        if not options["unenroll"]:
+            return failures
+
+        # The students who should be promoted: the head of the waitlist.
+        expected = list(
+            WaitlistEntry.objects.filter(course=course)
+            .order_by("id")
+            .values_list("student_id", flat=True)[: options["unenroll"]]
+        )
+        enrolled_ids = list(
+            Enrollment.objects.filter(course=course).values_list(
+                "student_id", flat=True
+            )
+        )
+        count = min(options["unenroll"], len(enrolled_ids))
+        leaving_ids = set(random.sample(enrolled_ids, count))
+        leaving = [student for student in students if student.pk in leaving_ids]
+
+        unenroll = UnthrottledCourseViewSet.as_view({"delete": "unenroll"})
+        statuses, latencies, seconds = self.fire(
+            unenroll, "delete", course, leaving, threads
+        )
+        self.report("unenroll", statuses, latencies, seconds)
+
+        course.refresh_from_db()
+        now_enrolled = set(
+            Enrollment.objects.filter(course=course).values_list(
+                "student_id", flat=True
+            )
+        )
+        promoted = now_enrolled - set(enrolled_ids)
+        self.stdout.write(
+            f"  enrolled {len(now_enrolled)}, seats_taken {course.seats_taken}, "
+            f"promoted {len(promoted)}"
+        )
+        if len(now_enrolled) > capacity:
+            failures.append(f"oversold after promotion: {len(now_enrolled)}")
+        if course.seats_taken != len(now_enrolled):
+            failures.append("seats_taken drifted during promotion")
+        if promoted != set(expected[: len(promoted)]):
+            failures.append("promotion did not follow the waitlist order")
+        if len(promoted) < min(statuses[200], len(expected)):
+            self.stdout.write(
+                self.style.WARNING("  some freed seats were not promoted yet")
+            )
+        return failures
+
+    def cleanup(self, course, students):
+        instructor_id = course.created_by_id
+        course.delete()
+        user_ids = [student.pk for student in students] + [instructor_id]
+        User.objects.filter(pk__in=user_ids).delete()
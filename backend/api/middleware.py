@@ -0,0 +1,83 @@
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+
+class AdmissionControlMiddleware:
+    """
+    Shed load once too much work is in flight in this worker process.
+
+    Requests beyond ``ADMISSION_CONTROL["MAX_IN_FLIGHT"]`` concurrent API
+    requests are rejected immediately with a 503 and a ``Retry-After``
+    header instead of queueing behind the work already admitted. Rejecting
+    early keeps latency bounded for the requests we do accept during retry
+    storms. Per-client limits are handled separately by the DRF throttles in
+    ``api/throttling.py`` (which answer with 429).
+
+    Works in both sync and async stacks, so the event stream is not adapted
+    to a thread under ASGI. A streaming response counts as in flight only
+    until the view returns it, not while it streams.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, "ADMISSION_CONTROL", {})
+        self.max_in_flight = config.get("MAX_IN_FLIGHT", 0)
+        self.retry_after = config.get("RETRY_AFTER", 1)
+        self.path_prefixes = tuple(config.get("PATH_PREFIXES", ("/api/",)))
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _admit(self, request):
+        """
+        ``None`` if ``request`` is not subject to admission control,
+        otherwise whether it was admitted (and counted as in flight).
+        """
+        if not self.max_in_flight or not request.path.startswith(self.path_prefixes):
+            return None
+        with self.lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _busy(self):
+        response = JsonResponse(
+            {"detail": "Server is busy. Please retry shortly."}, status=503
+        )
+        response["Retry-After"] = str(self.retry_after)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        admitted = self._admit(request)
+        if admitted is False:
+            return self._busy()
+        try:
+            return self.get_response(request)
+        finally:
+            if admitted:
+                self._release()
+
+    async def __acall__(self, request):
+        admitted = self._admit(request)
+        if admitted is False:
+            return self._busy()
+        try:
+            return await self.get_response(request)
+        finally:
+            if admitted:
+                self._release()
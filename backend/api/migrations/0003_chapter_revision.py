@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_chapter_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='revision',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_chapterrevision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_opened_at', models.DateTimeField()),
+                ('last_opened_at', models.DateTimeField()),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='api.chapter')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chapter_progress', to='api.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chapter_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'course'], name='api_chapter_student_6cc873_idx')],
+                'unique_together': {('student', 'chapter')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_chapterprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivitySegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('records', models.PositiveIntegerField(default=0)),
+                ('rolled_up_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('chapter_view', 'Chapter view'), ('enroll', 'Enroll'), ('unenroll', 'Unenroll'), ('login', 'Login')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('chapter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='api.chapter')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='api.course')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['course', 'date'], name='api_dailyac_course__e986e5_idx')],
+            },
+        ),
+    ]
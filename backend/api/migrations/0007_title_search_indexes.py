@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_activity_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chapter',
+            index=models.Index(fields=['title'], name='api_chapter_title_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['title'], name='api_course_title_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_title_search_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstructorStats',
+            fields=[
+                ('instructor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('course_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('chapter_count', models.IntegerField(default=0)),
+                ('public_chapter_count', models.IntegerField(default=0)),
+                ('recent_enrollments', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
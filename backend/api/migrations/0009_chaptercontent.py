@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_instructorstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterContent',
+            fields=[
+                ('chapter_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('data', models.JSONField(blank=True, default=list, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='chapter',
+            old_name='content',
+            new_name='legacy_content',
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='legacy_content',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_seats_taken(apps, schema_editor):
+    Course = apps.get_model("api", "Course")
+    Enrollment = apps.get_model("api", "Enrollment")
+    counts = (
+        Enrollment.objects.filter(course=OuterRef("pk"))
+        .order_by()
+        .values("course")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Course.objects.update(
+        seats_taken=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_asset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='api.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'id'], name='api_waitlist_course_id_idx')],
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(count_seats_taken, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:14
+
+import math
+from datetime import datetime, timezone
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of api/ranking.py's EPOCH, empty score and default half-life,
+# so that replaying this migration always gives the same scores. Courses
+# ranked with another TRENDING_HALF_LIFE_DAYS are rescored by
+# rebuild_course_rankings.
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+EMPTY_SCORE = 0.0
+HALF_LIFE_SECONDS = 7 * 86400
+
+
+def trending_score(enrollment_times):
+    # log(exp(EMPTY_SCORE) + sum(exp(weight))), computed without overflow.
+    weights = [EMPTY_SCORE] + [
+        math.log(2) * (at - EPOCH).total_seconds() / HALF_LIFE_SECONDS
+        for at in enrollment_times
+    ]
+    top = max(weights)
+    return top + math.log(sum(math.exp(weight - top) for weight in weights))
+
+
+def score_existing_courses(apps, schema_editor):
+    Course = apps.get_model("api", "Course")
+    Enrollment = apps.get_model("api", "Enrollment")
+    rows = Enrollment.objects.order_by("course_id").values_list(
+        "course_id", "enrolled_at"
+    )
+    courses = [
+        Course(pk=course_id, trending_score=trending_score(at for _, at in group))
+        for course_id, group in groupby(rows.iterator(), key=lambda row: row[0])
+    ]
+    Course.objects.bulk_update(courses, ["trending_score"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_course_capacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='trending_score',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-seats_taken', '-created_at'], name='api_course_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-trending_score', '-created_at'], name='api_course_trending_idx'),
+        ),
+        migrations.RunPython(score_existing_courses, migrations.RunPython.noop),
+    ]
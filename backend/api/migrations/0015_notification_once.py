@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicates(apps, schema_editor):
+    # Overlapping fan-outs could insert the same notification twice; keep
+    # the first so the constraint can be added.
+    Notification = apps.get_model("api", "Notification")
+    first_ids = (
+        Notification.objects.values("recipient", "chapter", "kind")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    Notification.objects.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_soft_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'chapter', 'kind'), name='api_notification_once_uniq'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .fieldsets import requested_fieldsets
+from .routers import replica_configured, replica_reads, use_replica_for_reads
+from .serializers import SparseFieldsMixin
+
+
+class ReplicaReadMixin:
+    """
+    Serve read-only requests from the read replica when one is configured.
+
+    After a user performs a write, their reads are pinned to the primary for
+    ``REPLICA_PIN_SECONDS`` so they always see their own changes despite
+    replication lag.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Scope the routing decision to this request.
+        with replica_reads(False):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        if not replica_configured():
+            return
+
+        pin_key = None
+        if request.user.is_authenticated:
+            pin_key = f"replica-pin:{request.user.pk}"
+
+        if request.method in SAFE_METHODS:
+            if pin_key is None or not cache.get(pin_key):
+                use_replica_for_reads()
+        elif pin_key is not None:
+            cache.set(pin_key, True, getattr(settings, "REPLICA_PIN_SECONDS", 5))
+
+
+class FieldsetMixin:
+    """
+    Shape read responses with ``?fields=`` / ``?expand=`` (see
+    ``api/fieldsets.py``), passed to serializers that support them.
+    """
+
+    def get_fieldsets(self):
+        return requested_fieldsets(self.request)
+
+    def wants(self, name):
+        """
+        Whether the top-level field ``name`` is selected by ``?fields=``.
+        """
+        fields, _ = self.get_fieldsets()
+        return fields is None or name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_fieldsets()
+        if (fields is not None or expand is not None) and issubclass(
+            self.get_serializer_class(), SparseFieldsMixin
+        ):
+            kwargs.setdefault("fields", fields)
+            kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+class RowListMixin(FieldsetMixin):
+    """
+    Serve ``list`` through a compiled ``RowSerializer`` over ``.values()``
+    rows instead of the DRF serializer, keeping pagination unchanged.
+    """
+
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.row_serializer_class(*self.get_fieldsets())
+        rows = row_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+
+        return Response(row_serializer.serialize(rows))
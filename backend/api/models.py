@@ -16,6 +16,15 @@ class Profile(models.Model):
         return f"{self.user.username} - {self.role}"
 
 
+class VisibleCourseManager(models.Manager):
+    """
+    Excludes courses hidden while their deletion job runs (``api/deletion.py``).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Course(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -25,8 +34,55 @@ class Course(models.Model):
     students = models.ManyToManyField(
         User, through="Enrollment", related_name="enrolled_courses"
     )
+    # Seat limit; None means unlimited. Enrollments beyond it go to the
+    # waitlist (api/seats.py).
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    # Number of enrollments, maintained with conditional UPDATEs so seats
+    # are allocated without counting rows or locking the enrollment table.
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    # Log of the time-decayed enrollment count behind ?ordering=trending
+    # (api/ranking.py).
+    trending_score = models.FloatField(default=0.0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the course is deleted; its rows are removed in the background.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = VisibleCourseManager()
+    all_objects = models.Manager()
+
+    # Only written with .update() (api/seats.py, api/ranking.py,
+    # api/deletion.py); a full save must not write back the copies loaded
+    # with the instance.
+    UPDATE_ONLY_FIELDS = ("seats_taken", "trending_score", "deleted_at")
+
+    class Meta:
+        indexes = [
+            # Prefix search (title__startswith) in the admin.
+            models.Index(
+                fields=["title"],
+                name="api_course_title_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Catalog pages for ?ordering=popular and ?ordering=trending.
+            models.Index(
+                fields=["-seats_taken", "-created_at"],
+                name="api_course_popular_idx",
+            ),
+            models.Index(
+                fields=["-trending_score", "-created_at"],
+                name="api_course_trending_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -37,19 +93,124 @@ class Chapter(models.Model):
         Course, on_delete=models.CASCADE, related_name="chapters"
     )
     title = models.CharField(max_length=200)
-    content = models.JSONField(default=list, blank=True, null=True)
+    # Bodies live in ChapterContent (content database); this column only
+    # holds bodies not yet moved there by ``move_chapter_content``.
+    legacy_content = models.JSONField(null=True, blank=True, editable=False)
     order = models.PositiveIntegerField()
     is_public = models.BooleanField(default=False)
+    # Incremented on every content write; used as the base revision for
+    # delta (JSON Patch) updates.
+    revision = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["order"]
         unique_together = [["course", "order"]]
+        indexes = [
+            models.Index(
+                fields=["title"],
+                name="api_chapter_title_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    @property
+    def content(self):
+        """
+        The chapter body, read from the content database on first access.
+        ``api.content.load_content`` loads many chapters' bodies in one query.
+        """
+        if "_content" not in self.__dict__:
+            row = None
+            if self.pk is not None:
+                row = (
+                    ChapterContent.objects.filter(chapter_id=self.pk)
+                    .values_list("data")
+                    .first()
+                )
+            self._content = self.legacy_content if row is None else row[0]
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._content_changed = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and "_content" not in self.__dict__:
+            self.content = []
+        super().save(*args, **kwargs)
+        if self.__dict__.pop("_content_changed", False):
+            self.save_content()
+
+    def save_content(self):
+        """
+        Upsert the body into the content database. Wrap the surrounding
+        write in ``api.content.atomic_with_content()`` to commit both
+        databases together.
+        """
+        ChapterContent.objects.bulk_create(
+            [ChapterContent(chapter_id=self.pk, data=self._content)],
+            update_conflicts=True,
+            unique_fields=["chapter_id"],
+            update_fields=["data", "updated_at"],
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the change events in api/signals.py can tell a
+        # reorder or (un)publish from an ordinary edit.
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in ("order", "is_public")
+        }
+        return instance
+
+
+class ChapterContent(models.Model):
+    """
+    Body of a chapter, stored in the ``content`` database (api/routers.py).
+
+    Kept apart from the metadata so the default database stays small; the
+    chapter is referenced by id only, since foreign keys cannot span
+    databases. Rows are removed when their chapter is deleted.
+    """
+
+    chapter_id = models.PositiveIntegerField(primary_key=True)
+    data = models.JSONField(default=list, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Content of chapter {self.chapter_id}"
+
+
+class Asset(models.Model):
+    """
+    An uploaded chapter image, stored on disk under its SHA-256 digest
+    (api/assets.py). Identical uploads share one row and one file.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assets",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type}, {self.size} bytes)"
+
 
 class Enrollment(models.Model):
     student = models.ForeignKey(
@@ -65,3 +226,265 @@ class Enrollment(models.Model):
 
     def __str__(self):
         return f"{self.student.username} enrolled in {self.course.title}"
+
+
+class WaitlistEntry(models.Model):
+    """
+    A student waiting for a seat in a full course. Entries are promoted to
+    enrollments in ``id`` (arrival) order as seats free up.
+    """
+
+    student = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="waitlist"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [["student", "course"]]
+        indexes = [
+            models.Index(fields=["course", "id"], name="api_waitlist_course_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} waiting for {self.course.title}"
+
+
+class ChapterRevision(models.Model):
+    """
+    One entry in a chapter's content history.
+
+    Snapshots hold the full content; deltas hold the JSON Patch from the
+    previous revision. A snapshot is written at least every
+    ``CHAPTER_REVISIONS["SNAPSHOT_INTERVAL"]`` revisions, so rebuilding any
+    revision applies a bounded number of deltas.
+    """
+
+    SNAPSHOT = "snapshot"
+    DELTA = "delta"
+    KIND_CHOICES = [
+        (SNAPSHOT, "Snapshot"),
+        (DELTA, "Delta"),
+    ]
+
+    chapter = models.ForeignKey(
+        Chapter, on_delete=models.CASCADE, related_name="revisions"
+    )
+    revision = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.JSONField(blank=True, null=True)
+    size = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-revision"]
+        unique_together = [["chapter", "revision"]]
+
+    def __str__(self):
+        return f"{self.chapter.title} - r{self.revision} ({self.kind})"
+
+
+class ChapterProgress(models.Model):
+    """
+    A student's progress through one chapter.
+
+    Written through the write-behind buffer in ``api/progress.py``, so rows
+    may lag reads by up to ``PROGRESS_TRACKING["FLUSH_INTERVAL"]`` seconds.
+    """
+
+    student = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="chapter_progress"
+    )
+    chapter = models.ForeignKey(
+        Chapter, on_delete=models.CASCADE, related_name="progress"
+    )
+    # Denormalized from chapter.course for per-course rollups.
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="chapter_progress"
+    )
+    first_opened_at = models.DateTimeField()
+    last_opened_at = models.DateTimeField()
+    view_count = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [["student", "chapter"]]
+        indexes = [models.Index(fields=["student", "course"])]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.chapter.title}"
+
+
+class DailyActivity(models.Model):
+    """
+    Per-day event counts rolled up from the activity log (``api/activity.py``).
+
+    Course-level events (enrollments) leave ``chapter`` empty; platform-wide
+    events (logins) leave ``course`` empty as well.
+    """
+
+    CHAPTER_VIEW = "chapter_view"
+    ENROLL = "enroll"
+    UNENROLL = "unenroll"
+    LOGIN = "login"
+    KIND_CHOICES = [
+        (CHAPTER_VIEW, "Chapter view"),
+        (ENROLL, "Enroll"),
+        (UNENROLL, "Unenroll"),
+        (LOGIN, "Login"),
+    ]
+
+    date = models.DateField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_activity",
+    )
+    chapter = models.ForeignKey(
+        Chapter,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_activity",
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["date"]
+        indexes = [models.Index(fields=["course", "date"])]
+
+    def __str__(self):
+        return f"{self.date} {self.kind} x{self.count}"
+
+
+class ActivitySegment(models.Model):
+    """
+    An activity log segment that has been rolled up, so it is never counted
+    twice even if deleting the file fails.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    records = models.PositiveIntegerField(default=0)
+    rolled_up_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class InstructorStats(models.Model):
+    """
+    Dashboard totals for one instructor, kept current by the signal handlers
+    in ``api/signals.py`` (see ``api/stats.py``). ``check_instructor_stats``
+    recomputes them from scratch and reports (or fixes) any drift.
+    """
+
+    instructor = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    course_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    chapter_count = models.IntegerField(default=0)
+    public_chapter_count = models.IntegerField(default=0)
+    # Newest enrollments first, at most RECENT_ENROLLMENTS entries.
+    recent_enrollments = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    RECENT_ENROLLMENTS = 10
+
+    def __str__(self):
+        return f"Stats for {self.instructor.username}"
+
+
+class Notification(models.Model):
+    """
+    An inbox entry telling an enrolled student about a new or newly public
+    chapter. Written in bulk by the fan-out job in ``api/notifications.py``.
+    """
+
+    CHAPTER_CREATED = "chapter_created"
+    CHAPTER_PUBLISHED = "chapter_published"
+    KIND_CHOICES = [
+        (CHAPTER_CREATED, "Chapter added"),
+        (CHAPTER_PUBLISHED, "Chapter made public"),
+    ]
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notifications"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="notifications"
+    )
+    chapter = models.ForeignKey(
+        Chapter, on_delete=models.CASCADE, related_name="notifications"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The inbox, newest first.
+            models.Index(
+                fields=["recipient", "-id"], name="api_notification_inbox_idx"
+            ),
+        ]
+        constraints = [
+            # One notification of each kind per student and chapter.
+            models.UniqueConstraint(
+                fields=["recipient", "chapter", "kind"],
+                name="api_notification_once_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.recipient.username}"
+
+
+class DeletionJob(models.Model):
+    """
+    Background removal of a hidden course or deactivated user and all their
+    dependent rows (``api/deletion.py``). ``deleted_rows`` grows as chunks
+    are deleted.
+    """
+
+    COURSE = "course"
+    USER = "user"
+    KIND_CHOICES = [(COURSE, "Course"), (USER, "User")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="deletion_jobs",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    deleted_rows = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Delete {self.kind} {self.object_id} ({self.status})"
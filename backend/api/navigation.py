@@ -0,0 +1,170 @@
+"""
+Sequential reading support for chapter detail responses.
+
+Each chapter response carries its previous/next chapter (among those the
+reader may see), found with one windowed query over the course outline,
+plus matching ``Link`` headers. Serialized chapters are cached per version,
+and the next chapter is rendered into the cache in the background so the
+reader's "next" click is a cache hit.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, F, Q, Window
+from django.db.models.functions import Lag, Lead
+from django.urls import reverse
+
+from .background import submit
+from .content import load_content
+from .models import Chapter, Enrollment
+from .serializers import ChapterSerializer
+
+
+def get_navigation_setting(name, default):
+    return getattr(settings, "CHAPTER_NAVIGATION", {}).get(name, default)
+
+
+def chapter_neighbors(chapter, user):
+    """
+    Return ``(previous, next)`` for ``chapter`` in reading order, skipping
+    chapters ``user`` may not see. Each is ``None`` or a dict with the
+    neighbor's ``id``, ``title``, ``order`` and ``updated_at``.
+    """
+    siblings = Chapter.objects.filter(course_id=chapter.course_id)
+    if not user.is_authenticated:
+        siblings = siblings.filter(is_public=True)
+    elif chapter.course.created_by_id != user.id:
+        enrolled = Enrollment.objects.filter(
+            course_id=chapter.course_id, student_id=user.id
+        )
+        siblings = siblings.filter(Q(is_public=True) | Exists(enrolled))
+
+    # The neighbors are the rows whose next/previous chapter is this one;
+    # Django evaluates the window in a subquery and filters on it outside.
+    rows = (
+        siblings.annotate(
+            previous_id=Window(Lag("id"), order_by=F("order").asc()),
+            next_id=Window(Lead("id"), order_by=F("order").asc()),
+        )
+        .filter(Q(previous_id=chapter.pk) | Q(next_id=chapter.pk))
+        .values("id", "title", "order", "updated_at", "next_id")
+    )
+
+    previous = next_ = None
+    for row in rows:
+        if row.pop("next_id") == chapter.pk:
+            previous = row
+        else:
+            next_ = row
+    return previous, next_
+
+
+def is_prefetch(request):
+    """
+    Whether the request is a speculative fetch (``Sec-Purpose`` or
+    ``Purpose: prefetch``) rather than the reader opening the chapter.
+    """
+    purpose = request.headers.get("Sec-Purpose") or request.headers.get("Purpose")
+    return "prefetch" in (purpose or "")
+
+
+def navigation_links(previous, next_):
+    """
+    ``Link`` header value pointing at the neighbors. The next chapter is
+    also a ``preload`` hint for proxies and clients that act on one.
+    """
+    links = []
+    if previous is not None:
+        url = reverse("chapter-detail", args=[previous["id"]])
+        links.append(f'<{url}>; rel="prev"')
+    if next_ is not None:
+        url = reverse("chapter-detail", args=[next_["id"]])
+        links.append(f'<{url}>; rel="next preload"; as="fetch"')
+    return ", ".join(links)
+
+
+def chapter_cache_key(chapter_id, updated_at, course_updated_at, raw):
+    # updated_at changes with every save and content patch, and the course's
+    # with every rename, so edits never serve a stale entry.
+    return (
+        f"chapter-detail:{chapter_id}:{updated_at.timestamp()}:"
+        f"{course_updated_at.timestamp()}:{int(raw)}"
+    )
+
+
+def chapter_etag(chapter, previous, next_, raw=False, fields=""):
+    """
+    Strong ETag for a chapter detail response, derived from the versions of
+    everything in it (and the ``?fields=`` selection) so it is known without
+    rendering the body.
+    """
+    parts = [
+        chapter.pk,
+        chapter.updated_at.timestamp(),
+        chapter.course.updated_at.timestamp(),
+        int(raw),
+        fields,
+    ]
+    for neighbor in (previous, next_):
+        if neighbor is None:
+            parts.append("-")
+        else:
+            parts.extend([neighbor["id"], neighbor["updated_at"].timestamp()])
+    digest = hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def chapter_data(chapter, raw=False):
+    """
+    Serialized ``chapter`` (``ChapterSerializer``), from the cache when
+    possible. ``raw`` embeds the content as JSON text for the passthrough
+    renderer.
+    """
+    timeout = get_navigation_setting("CACHE_TIMEOUT", 60)
+    key = chapter_cache_key(
+        chapter.pk, chapter.updated_at, chapter.course.updated_at, raw
+    )
+    data = cache.get(key) if timeout else None
+    if data is None:
+        load_content([chapter], raw=raw)
+        data = dict(ChapterSerializer(chapter).data)
+        if timeout:
+            cache.set(key, data, timeout)
+    return data
+
+
+def warm_chapter(chapter_id, updated_at, course_updated_at, raw=False):
+    """
+    Render a chapter into the cache unless it is already there.
+    """
+    key = chapter_cache_key(chapter_id, updated_at, course_updated_at, raw)
+    if cache.get(key) is not None:
+        return
+    chapter = (
+        Chapter.objects.select_related("course")
+        .defer("legacy_content")
+        .filter(pk=chapter_id)
+        .first()
+    )
+    if chapter is not None:
+        chapter_data(chapter, raw)
+
+
+def warm_next(chapter, next_, raw=False):
+    """
+    Warm the chapter after ``chapter`` on the background pool, if enabled.
+    """
+    if (
+        next_ is not None
+        and get_navigation_setting("WARM_NEXT", True)
+        and get_navigation_setting("CACHE_TIMEOUT", 60)
+    ):
+        submit(
+            warm_chapter,
+            next_["id"],
+            next_["updated_at"],
+            chapter.course.updated_at,
+            raw,
+        )
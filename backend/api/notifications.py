@@ -0,0 +1,84 @@
+"""
+Inbox notifications for enrolled students when a chapter is added or made
+public.
+
+The request that saves the chapter only schedules one fan-out job, after
+its transaction commits, on the shared background pool
+(``api/background.py``). The job streams the enrolled student IDs with
+``.iterator()`` and inserts their inbox rows with ``bulk_create`` in chunks
+of ``CHUNK_SIZE``, each chunk its own short transaction, so neither the
+request nor the database holds a write per student. A student gets each
+kind of notification at most once per chapter (a unique constraint backs
+this when two fan-outs for the same chapter overlap), so a draft chapter
+produces ``chapter_created`` and, once published, ``chapter_published``.
+
+Jobs run in-process: ones still queued when a worker exits are lost, as
+with the other background tasks.
+"""
+
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .background import submit
+from .models import Chapter, Enrollment, Notification
+
+
+def get_notification_setting(name, default):
+    return getattr(settings, "NOTIFICATIONS", {}).get(name, default)
+
+
+def fan_out(kind, course_id, chapter_id):
+    """
+    Notify every student enrolled in the course about the chapter. Returns
+    the number of notifications sent (an overlapping fan-out may have
+    sent some of them).
+    """
+    if not Chapter.objects.filter(pk=chapter_id).exists():
+        # Deleted before the job ran.
+        return 0
+
+    chunk_size = get_notification_setting("CHUNK_SIZE", 1000)
+    notified = Notification.objects.filter(
+        chapter_id=chapter_id, kind=kind, recipient_id=OuterRef("student_id")
+    )
+    student_ids = (
+        Enrollment.objects.filter(course_id=course_id)
+        .filter(~Exists(notified))
+        .order_by()
+        .values_list("student_id", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    created = 0
+    while True:
+        chunk = list(islice(student_ids, chunk_size))
+        if not chunk:
+            return created
+        Notification.objects.bulk_create(
+            (
+                Notification(
+                    recipient_id=student_id,
+                    kind=kind,
+                    course_id=course_id,
+                    chapter_id=chapter_id,
+                )
+                for student_id in chunk
+            ),
+            # Rows another fan-out for the chapter inserted meanwhile.
+            ignore_conflicts=True,
+        )
+        created += len(chunk)
+
+
+def notify_on_commit(kind, chapter):
+    """
+    Schedule the fan-out for ``chapter`` once the current transaction
+    commits.
+    """
+    transaction.on_commit(
+        partial(submit, fan_out, kind, chapter.course_id, chapter.pk)
+    )
@@ -0,0 +1,44 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+def _is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return False
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser backed by orjson, with DRF's parser as the fallback.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        # orjson only reads UTF-8 and rejects NaN/Infinity, which the stock
+        # parser accepts unless STRICT_JSON is set.
+        if orjson is None or not self.strict or not _is_utf8(encoding):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class JSONPatchParser(FastJSONParser):
+    """
+    Parses RFC 6902 JSON Patch documents (``application/json-patch+json``).
+    """
+
+    media_type = "application/json-patch+json"
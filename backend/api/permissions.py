@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .loaders import get_loaders
+
 
 class IsInstructor(permissions.BasePermission):
     """
@@ -39,15 +41,36 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
+        if not request.user.is_authenticated:
+            return False
+
         # Check if object is a Course or Chapter
-        if hasattr(obj, "created_by"):
-            return obj.created_by == request.user
-        elif hasattr(obj, "course"):
-            return obj.course.created_by == request.user
+        if hasattr(obj, "created_by_id"):
+            return obj.created_by_id == request.user.id
+        elif hasattr(obj, "course_id"):
+            course = get_loaders(request).related(obj, "course")
+            return course is not None and course.created_by_id == request.user.id
 
         return False
 
 
+class IsCourseOwner(permissions.BasePermission):
+    """
+    Permission to only allow the course instructor, for reads and writes
+    alike (e.g. a chapter's edit history).
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if not request.user.is_authenticated:
+            return False
+
+        if hasattr(obj, "created_by_id"):
+            course = obj
+        else:
+            course = get_loaders(request).related(obj, "course")
+        return course is not None and course.created_by_id == request.user.id
+
+
 class IsEnrolledOrInstructor(permissions.BasePermission):
     """
     Permission to allow access to chapters if user is enrolled in the course
@@ -63,11 +86,12 @@ class IsEnrolledOrInstructor(permissions.BasePermission):
             return False
 
         # Course instructor has full access
-        if obj.course.created_by == request.user:
+        loaders = get_loaders(request)
+        if loaders.related(obj, "course").created_by_id == request.user.id:
             return True
 
         # Check if user is enrolled in the course
-        return request.user in obj.course.students.all()
+        return loaders.is_enrolled(obj.course_id)
 
 
 class CanEnroll(permissions.BasePermission):
@@ -86,6 +110,6 @@ class CanEnroll(permissions.BasePermission):
                 return False
 
             # Check if user is not already enrolled
-            return not obj.students.filter(id=request.user.id).exists()
+            return not get_loaders(request).is_enrolled(obj.pk)
         except:
             return False
@@ -0,0 +1,262 @@
+"""
+Write-behind buffer for chapter progress.
+
+Chapter views are recorded in memory and coalesced per (student, chapter):
+ten views of the same chapter between flushes become one row update. A
+background thread flushes the buffer every ``FLUSH_INTERVAL`` seconds, or
+sooner once ``MAX_PENDING`` entries are waiting, with an
+``INSERT ... ON CONFLICT DO UPDATE`` per 100 rows that adds the views to the
+stored count in the database. Entries whose student, chapter or course has
+been deleted are dropped. A crash loses at most the unflushed interval;
+pending entries are also flushed at interpreter exit.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connections, router, transaction
+from django.utils import timezone
+
+from .models import Chapter, ChapterProgress, Course
+
+logger = logging.getLogger(__name__)
+
+# Columns written by a flush, in VALUES order.
+UPSERT_FIELDS = (
+    "student",
+    "chapter",
+    "course",
+    "first_opened_at",
+    "last_opened_at",
+    "view_count",
+    "completed_at",
+)
+# Rows per INSERT: 7 parameters each stays under SQLite's variable limit.
+UPSERT_BATCH_SIZE = 100
+
+
+def get_progress_setting(name, default):
+    return getattr(settings, "PROGRESS_TRACKING", {}).get(name, default)
+
+
+def _earliest(a, b):
+    if a is None or b is None:
+        return a or b
+    return min(a, b)
+
+
+class PendingProgress:
+    __slots__ = (
+        "course_id",
+        "first_opened_at",
+        "last_opened_at",
+        "views",
+        "completed_at",
+    )
+
+    def __init__(self, course_id, at):
+        self.course_id = course_id
+        self.first_opened_at = at
+        self.last_opened_at = at
+        self.views = 0
+        self.completed_at = None
+
+
+class ProgressBuffer:
+    """
+    Coalesce progress updates in memory and flush them in batches.
+
+    With ``FLUSH_INTERVAL`` set to 0 every update is written immediately,
+    which is what tests and management commands want.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record_view(self, student_id, chapter_id, course_id, at=None):
+        self._record(student_id, chapter_id, course_id, at, view=True)
+
+    def record_completion(self, student_id, chapter_id, course_id, at=None):
+        self._record(student_id, chapter_id, course_id, at, view=False)
+
+    def _record(self, student_id, chapter_id, course_id, at, view):
+        at = at or timezone.now()
+        with self._lock:
+            entry = self._pending.get((student_id, chapter_id))
+            if entry is None:
+                entry = self._pending[(student_id, chapter_id)] = PendingProgress(
+                    course_id, at
+                )
+            entry.first_opened_at = min(entry.first_opened_at, at)
+            entry.last_opened_at = max(entry.last_opened_at, at)
+            if view:
+                entry.views += 1
+            else:
+                entry.completed_at = _earliest(entry.completed_at, at)
+            pending = len(self._pending)
+
+        if not get_progress_setting("FLUSH_INTERVAL", 2):
+            self.flush()
+        elif pending >= get_progress_setting("MAX_PENDING", 1000):
+            self._ensure_thread()
+            self._wakeup.set()
+        else:
+            self._ensure_thread()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Write all pending updates now. Returns the number of rows written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                written = self._write(batch)
+            except Exception:
+                # Put the batch back so the next flush retries it.
+                with self._lock:
+                    for key, entry in batch.items():
+                        self._merge(key, entry)
+                raise
+            return written
+
+    def _merge(self, key, entry):
+        current = self._pending.get(key)
+        if current is None:
+            self._pending[key] = entry
+            return
+        current.first_opened_at = min(current.first_opened_at, entry.first_opened_at)
+        current.last_opened_at = max(current.last_opened_at, entry.last_opened_at)
+        current.views += entry.views
+        current.completed_at = _earliest(current.completed_at, entry.completed_at)
+
+    def _write(self, batch):
+        # Entries for students, chapters or courses deleted (or hidden for
+        # deletion) since they were recorded would fail the whole batch on
+        # their foreign keys, or race the deletion job; drop them.
+        students = set(
+            User._base_manager.filter(
+                pk__in={student_id for student_id, _ in batch}
+            ).values_list("pk", flat=True)
+        )
+        chapters = set(
+            Chapter._base_manager.filter(
+                pk__in={chapter_id for _, chapter_id in batch}
+            ).values_list("pk", flat=True)
+        )
+        courses = set(
+            Course._base_manager.filter(
+                pk__in={entry.course_id for entry in batch.values()},
+                deleted_at__isnull=True,
+            ).values_list("pk", flat=True)
+        )
+        rows = [
+            (student_id, chapter_id, entry)
+            for (student_id, chapter_id), entry in batch.items()
+            if student_id in students
+            and chapter_id in chapters
+            and entry.course_id in courses
+        ]
+
+        connection = connections[router.db_for_write(ChapterProgress)]
+        with transaction.atomic(using=connection.alias):
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                self._upsert(connection, rows[start : start + UPSERT_BATCH_SIZE])
+        return len(rows)
+
+    def _upsert(self, connection, rows):
+        """
+        Insert or merge ``rows`` in one statement. The merge happens in the
+        database (``view_count = view_count + n``), so concurrent flushes
+        from other processes add up instead of overwriting each other.
+        """
+        meta = ChapterProgress._meta
+        fields = [meta.get_field(name) for name in UPSERT_FIELDS]
+        columns = {
+            field.name: connection.ops.quote_name(field.column) for field in fields
+        }
+        table = connection.ops.quote_name(meta.db_table)
+        least, greatest = (
+            ("MIN", "MAX") if connection.vendor == "sqlite" else ("LEAST", "GREATEST")
+        )
+
+        def merged(function, name):
+            current = f"{table}.{columns[name]}"
+            new = f"excluded.{columns[name]}"
+            # SQLite's MIN/MAX are NULL if either side is.
+            return f"COALESCE({function}({current}, {new}), {current}, {new})"
+
+        params = []
+        for student_id, chapter_id, entry in rows:
+            values = [
+                student_id,
+                chapter_id,
+                entry.course_id,
+                entry.first_opened_at,
+                entry.last_opened_at,
+                entry.views,
+                entry.completed_at,
+            ]
+            params.extend(
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, values)
+            )
+
+        placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns.values())}) "
+            f"VALUES {', '.join([placeholder] * len(rows))} "
+            f"ON CONFLICT ({columns['student']}, {columns['chapter']}) DO UPDATE SET "
+            f"{columns['first_opened_at']} = {merged(least, 'first_opened_at')}, "
+            f"{columns['last_opened_at']} = {merged(greatest, 'last_opened_at')}, "
+            f"{columns['view_count']} = "
+            f"{table}.{columns['view_count']} + excluded.{columns['view_count']}, "
+            f"{columns['completed_at']} = {merged(least, 'completed_at')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="progress-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(get_progress_setting("FLUSH_INTERVAL", 2))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush chapter progress")
+            finally:
+                close_old_connections()
+
+
+progress_buffer = ProgressBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        progress_buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush chapter progress at exit")
@@ -0,0 +1,93 @@
+"""
+Catalog rankings kept on the course row as enrollments come and go.
+
+``popular`` orders by ``seats_taken``, the enrollment count maintained by
+``api/seats.py``. ``trending`` orders by ``trending_score``, an
+exponentially decayed enrollment count in which each enrollment is worth
+half as much every ``TRENDING_HALF_LIFE_DAYS``.
+
+Decay is measured from a fixed ``EPOCH`` rather than from now: an
+enrollment at time ``t`` contributes ``exp(rate * (t - EPOCH))``. Letting
+time pass would scale every course's score by the same factor, which never
+changes their order, so a score only changes when an enrollment is added or
+removed, and both ranks are served from indexed columns. The sum grows
+without bound, so it is stored as its natural log and updated with a
+log-sum-exp in a single UPDATE, which neither overflows nor races.
+"""
+
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .models import Course
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+# The score of a course without enrollments: one enrollment at EPOCH, which
+# any enrollment since has long outweighed.
+EMPTY_SCORE = 0.0
+
+CATALOG_ORDERINGS = {
+    "newest": ("-created_at",),
+    "popular": ("-seats_taken", "-created_at"),
+    "trending": ("-trending_score", "-created_at"),
+}
+
+
+def get_ranking_setting(name, default):
+    return getattr(settings, "COURSE_RANKING", {}).get(name, default)
+
+
+def catalog_ordering(name):
+    """
+    ``order_by`` fields for ``?ordering=``; newest first by default.
+    """
+    return CATALOG_ORDERINGS.get(name, CATALOG_ORDERINGS["newest"])
+
+
+def log_weight(enrolled_at):
+    """
+    Natural log of the weight of an enrollment made at ``enrolled_at``.
+    """
+    half_life = get_ranking_setting("TRENDING_HALF_LIFE_DAYS", 7) * 86400
+    return math.log(2) * (enrolled_at - EPOCH).total_seconds() / half_life
+
+
+def trending_score(enrollment_times):
+    """
+    Score for a course with enrollments at ``enrollment_times``, computed
+    from scratch (``rebuild_course_rankings``).
+    """
+    weights = [EMPTY_SCORE] + [log_weight(at) for at in enrollment_times]
+    top = max(weights)
+    return top + math.log(sum(math.exp(weight - top) for weight in weights))
+
+
+def record_enrollment(course_id, enrolled_at):
+    """
+    Add an enrollment's weight: ``score = log(exp(score) + exp(weight))``.
+    """
+    weight = Value(log_weight(enrolled_at), output_field=FloatField())
+    score = Greatest(F("trending_score"), weight) + Ln(
+        1 + Exp(-Abs(F("trending_score") - weight))
+    )
+    Course.objects.filter(pk=course_id).update(trending_score=score)
+
+
+def remove_enrollment(course_id, enrolled_at):
+    """
+    Subtract an enrollment's weight: ``score = log(exp(score) - exp(weight))``.
+    """
+    weight = Value(log_weight(enrolled_at), output_field=FloatField())
+    Course.objects.filter(pk=course_id).update(
+        trending_score=Case(
+            # Nothing (measurable) is left but the empty score.
+            When(trending_score__lte=weight + 1e-9, then=Value(EMPTY_SCORE)),
+            default=F("trending_score")
+            + Ln(1 - Exp(weight - F("trending_score"))),
+            output_field=FloatField(),
+        )
+    )
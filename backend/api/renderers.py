@@ -0,0 +1,88 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is missing
+    orjson = None
+
+
+class RawJSON:
+    """
+    Already-encoded JSON text to be embedded in a response as-is.
+
+    Used for large JSON columns (``Chapter.content``) so the database text
+    can go straight into the response body instead of being decoded into
+    Python objects and encoded again.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and other.raw == self.raw
+
+    def __repr__(self):
+        return f"RawJSON({self.raw[:40]!r})"
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    """
+    DRF's encoder, extended to understand ``RawJSON`` values.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            return json.loads(obj.raw)
+        return super().default(obj)
+
+
+_drf_default = JSONEncoder().default
+
+
+def _orjson_default(obj):
+    if isinstance(obj, RawJSON):
+        if hasattr(orjson, "Fragment"):
+            return orjson.Fragment(obj.raw)
+        return orjson.loads(obj.raw)
+    # Datetimes are passed through so they are formatted exactly like DRF
+    # does (e.g. "Z" instead of "+00:00").
+    return _drf_default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, with DRF's renderer as the fallback.
+
+    orjson is used for compact unicode output, which is what the API serves
+    by default. Indented output (browsable API, ``; indent=N``) and
+    installations without orjson go through the stock ``JSONRenderer``.
+    """
+
+    encoder_class = JSONEncoder
+    # Whether RawJSON values are embedded without a decode/encode round trip.
+    raw_json_passthrough = orjson is not None and hasattr(orjson, "Fragment")
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if orjson is None or indent is not None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Match DRF: escape U+2028/U+2029 so the output is a JavaScript subset.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
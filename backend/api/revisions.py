@@ -0,0 +1,162 @@
+"""
+Chapter content history stored as periodic snapshots plus forward deltas.
+
+Every save of a chapter records one ``ChapterRevision``. Most revisions only
+store the JSON Patch from the previous revision; a full snapshot is written
+when the chain since the last snapshot reaches ``SNAPSHOT_INTERVAL`` (or when
+the delta would not be smaller than the document itself). Rebuilding a
+revision therefore loads one snapshot and fewer than ``SNAPSHOT_INTERVAL``
+deltas, whatever the length of the history.
+"""
+
+import copy
+import json
+
+from django.conf import settings
+from django.db.models import Max, Q
+
+from .jsonpatch import apply_patch, make_patch
+from .models import ChapterRevision
+
+
+class RevisionConflict(Exception):
+    """
+    Raised when a chapter was saved since the revision an edit is based on.
+    ``revision`` is the chapter's current revision.
+    """
+
+    def __init__(self, revision):
+        super().__init__(f"Chapter is at revision {revision}.")
+        self.revision = revision
+
+
+def get_revision_setting(name, default):
+    return getattr(settings, "CHAPTER_REVISIONS", {}).get(name, default)
+
+
+def _size(data):
+    return len(json.dumps(data, separators=(",", ":")))
+
+
+def record_revision(chapter, previous_content=None, delta=None, user=None):
+    """
+    Record ``chapter.revision`` (already incremented and saved) in the
+    history.
+
+    ``previous_content`` is the content of the revision before it, used to
+    compute the delta; callers that already have the operations (the JSON
+    Patch endpoint) pass them as ``delta`` too. Saves that leave the content
+    unchanged should not bump the revision or call this.
+    """
+    interval = get_revision_setting("SNAPSHOT_INTERVAL", 10)
+    content = chapter.content
+    history = ChapterRevision.objects.filter(chapter=chapter).aggregate(
+        latest=Max("revision"),
+        snapshot=Max("revision", filter=Q(kind=ChapterRevision.SNAPSHOT)),
+    )
+
+    if (
+        history["latest"] is None
+        and previous_content is not None
+        and chapter.revision > 1
+    ):
+        # First edit of a chapter saved before the history existed: keep the
+        # body it replaces, so the edit can be undone.
+        ChapterRevision.objects.create(
+            chapter=chapter,
+            revision=chapter.revision - 1,
+            kind=ChapterRevision.SNAPSHOT,
+            data=previous_content,
+            size=_size(previous_content),
+        )
+        history = {"latest": chapter.revision - 1, "snapshot": chapter.revision - 1}
+
+    # A delta is only usable if it extends an unbroken chain that starts at
+    # a snapshot.
+    if (
+        history["snapshot"] is not None
+        and history["latest"] == chapter.revision - 1
+        and chapter.revision - history["snapshot"] < interval
+        and (delta is not None or previous_content is not None)
+    ):
+        if delta is None:
+            delta = make_patch(previous_content, content)
+        size = _size(delta)
+        if size < _size(content):
+            return ChapterRevision.objects.create(
+                chapter=chapter,
+                revision=chapter.revision,
+                kind=ChapterRevision.DELTA,
+                data=delta,
+                size=size,
+                created_by=user,
+            )
+
+    entry = ChapterRevision.objects.create(
+        chapter=chapter,
+        revision=chapter.revision,
+        kind=ChapterRevision.SNAPSHOT,
+        data=content,
+        size=_size(content),
+        created_by=user,
+    )
+    # Retention only changes when a new snapshot lands, so prune then.
+    prune_revisions(chapter)
+    return entry
+
+
+def reconstruct(chapter, revision):
+    """
+    Return the content of ``chapter`` at ``revision``, or raise
+    ``ChapterRevision.DoesNotExist`` if it is not in the history.
+    """
+    revisions = ChapterRevision.objects.filter(chapter=chapter)
+    snapshot = (
+        revisions.filter(kind=ChapterRevision.SNAPSHOT, revision__lte=revision)
+        .order_by("-revision")
+        .values_list("revision", flat=True)[:1]
+    )
+    chain = list(
+        revisions.filter(revision__gte=snapshot, revision__lte=revision)
+        .order_by("revision")
+        .values_list("revision", "kind", "data")
+    )
+    if not chain or chain[-1][0] != revision or chain[0][1] != ChapterRevision.SNAPSHOT:
+        raise ChapterRevision.DoesNotExist(
+            f"Revision {revision} of chapter {chapter.pk} is not in the history."
+        )
+
+    content = copy.deepcopy(chain[0][2])
+    for _, _, delta in chain[1:]:
+        content = apply_patch(content, delta)
+    return content
+
+
+def prune_revisions(chapter, keep=None):
+    """
+    Drop revisions older than the newest ``keep`` ones.
+
+    When the oldest kept revision is a delta it is squashed into a snapshot
+    first, so the remaining history can still be rebuilt. Returns the number
+    of revisions deleted.
+    """
+    keep = get_revision_setting("KEEP", 50) if keep is None else keep
+    revisions = ChapterRevision.objects.filter(chapter=chapter)
+    oldest_kept = (
+        revisions.order_by("-revision")
+        .values_list("revision", "kind")[keep - 1 : keep]
+        .first()
+    )
+    if oldest_kept is None:
+        return 0
+
+    revision, kind = oldest_kept
+    if not revisions.filter(revision__lt=revision).exists():
+        return 0
+    if kind == ChapterRevision.DELTA:
+        content = reconstruct(chapter, revision)
+        revisions.filter(revision=revision).update(
+            kind=ChapterRevision.SNAPSHOT, data=content, size=_size(content)
+        )
+    deleted, _ = revisions.filter(revision__lt=revision).delete()
+    return deleted
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = "replica"
+CONTENT_DB_ALIAS = "content"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Route ORM reads inside the block to the read replica (when configured).
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica_for_reads():
+    """
+    Switch the enclosing ``replica_reads()`` scope over to the replica.
+    """
+    _replica_reads.set(True)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def content_database():
+    """
+    Alias holding chapter bodies: ``content`` when configured, otherwise
+    the default database.
+    """
+    if CONTENT_DB_ALIAS in settings.DATABASES:
+        return CONTENT_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+class ContentRouter:
+    """
+    Keep ``ChapterContent`` (chapter bodies) in the ``content`` database and
+    everything else out of it.
+
+    Listed before ``ReadReplicaRouter``: bodies are never read from the
+    replica. Migrate the content database with
+    ``python manage.py migrate --database content``.
+    """
+
+    content_models = {"chaptercontent"}
+
+    def _is_content(self, app_label, model_name):
+        return app_label == "api" and model_name in self.content_models
+
+    def db_for_read(self, model, **hints):
+        if self._is_content(model._meta.app_label, model._meta.model_name):
+            return content_database()
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == CONTENT_DB_ALIAS:
+            return self._is_content(app_label, model_name)
+        if self._is_content(app_label, model_name):
+            return db == content_database()
+        return None
+
+
+class ReadReplicaRouter:
+    """
+    Send reads from read-only viewset actions to the ``replica`` alias.
+
+    Reads are only routed to the replica inside an enabled
+    ``replica_reads()`` scope, which ``ReplicaReadMixin`` turns on for
+    read-only requests. Everything else, including every write, stays on the
+    default database. The replica is populated outside Django (streaming
+    replication, a copied SQLite file), so migrations never run against it.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        primary = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in primary and obj2._state.db in primary:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
@@ -0,0 +1,159 @@
+"""
+Seat allocation for courses with a ``capacity``.
+
+A seat is taken with a single conditional UPDATE of the course's
+``seats_taken`` counter (``... WHERE seats_taken < capacity``). Concurrent
+enrollments therefore cannot oversell: the database serializes the
+increments on the course row, and a request that finds the course full joins
+the FIFO waitlist instead. Enrollment rows are never counted or locked.
+
+The ``Enrollment`` signals keep ``seats_taken`` in step with enrollments
+created or deleted anywhere (admin, cascades). Every seat freed is offered
+to the head of the waitlist once the releasing transaction commits.
+"""
+
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .activity import log_event
+from .models import Course, DailyActivity, Enrollment, WaitlistEntry
+
+
+class EnrollmentError(ValueError):
+    """
+    Raised when a student cannot be enrolled or unenrolled.
+    """
+
+
+def take_seat(course_id):
+    """
+    Claim a seat in the course. Returns ``False`` when it is full.
+    """
+    return bool(
+        Course.objects.filter(pk=course_id)
+        .filter(Q(capacity__isnull=True) | Q(seats_taken__lt=F("capacity")))
+        .update(seats_taken=F("seats_taken") + 1)
+    )
+
+
+def count_seat(course_id):
+    """
+    Count an enrollment created without ``take_seat`` (admin, fixtures),
+    even past the capacity.
+    """
+    Course.objects.filter(pk=course_id).update(seats_taken=F("seats_taken") + 1)
+
+
+def release_seat(course_id):
+    Course.objects.filter(pk=course_id, seats_taken__gt=0).update(
+        seats_taken=F("seats_taken") - 1
+    )
+
+
+def create_enrollment(student_id, course_id):
+    """
+    Insert an enrollment whose seat has already been taken.
+    """
+    enrollment = Enrollment(student_id=student_id, course_id=course_id)
+    # Tells the post_save handler not to count the seat again.
+    enrollment._seat_taken = True
+    enrollment.save()
+    return enrollment
+
+
+def enroll_student(course, student):
+    """
+    Enroll ``student`` if a seat is free, otherwise put them on the
+    waitlist. Returns ``(enrollment, None)`` or ``(None, waitlist_entry)``;
+    raises ``EnrollmentError`` if they are already enrolled or waiting.
+    """
+    try:
+        with transaction.atomic():
+            if take_seat(course.pk):
+                return create_enrollment(student.pk, course.pk), None
+            if Enrollment.objects.filter(student=student, course=course).exists():
+                raise EnrollmentError("You are already enrolled in this course.")
+            return None, WaitlistEntry.objects.create(student=student, course=course)
+    except IntegrityError:
+        # Lost a race with another request by the same student.
+        if Enrollment.objects.filter(student=student, course=course).exists():
+            raise EnrollmentError("You are already enrolled in this course.")
+        raise EnrollmentError("You are already on the waitlist for this course.")
+
+
+def unenroll_student(course, student):
+    """
+    Remove ``student`` from the course, or from its waitlist. Returns
+    ``True`` if an enrollment was removed (its seat goes to the waitlist),
+    ``False`` if a waitlist entry was; raises ``EnrollmentError`` otherwise.
+    """
+    with transaction.atomic():
+        enrollment = Enrollment.objects.filter(student=student, course=course).first()
+        if enrollment is not None:
+            enrollment.delete()
+            return True
+        deleted, _ = WaitlistEntry.objects.filter(
+            student=student, course=course
+        ).delete()
+    if not deleted:
+        raise EnrollmentError("You are not enrolled in this course")
+    return False
+
+
+def waitlist_position(entry):
+    """
+    1-based position of ``entry`` in its course's waitlist.
+    """
+    return WaitlistEntry.objects.filter(
+        course_id=entry.course_id, id__lte=entry.id
+    ).count()
+
+
+def promote_waitlist(course_id):
+    """
+    Enroll waitlisted students, first come first served, while the course
+    has free seats. Returns the new enrollments.
+    """
+    promoted = []
+    while True:
+        try:
+            with transaction.atomic():
+                entry = (
+                    WaitlistEntry.objects.filter(course_id=course_id)
+                    .order_by("id")
+                    .select_for_update(skip_locked=True)
+                    .first()
+                )
+                if entry is None:
+                    break
+                deleted, _ = WaitlistEntry.objects.filter(pk=entry.pk).delete()
+                if not deleted:
+                    # Promoted by a concurrent worker.
+                    continue
+                if Enrollment.objects.filter(
+                    student_id=entry.student_id, course_id=course_id
+                ).exists():
+                    # Enrolled some other way meanwhile; drop the stale entry.
+                    continue
+                if not take_seat(course_id):
+                    transaction.set_rollback(True)
+                    break
+                promoted.append(create_enrollment(entry.student_id, course_id))
+        except IntegrityError:
+            # The student enrolled concurrently; the next pass drops the entry.
+            continue
+
+    for enrollment in promoted:
+        log_event(DailyActivity.ENROLL, enrollment.student, course_id=course_id)
+    return promoted
+
+
+def promote_on_commit(course_id):
+    """
+    Offer free seats to the waitlist once the current transaction commits.
+    """
+    # robust: a failed promotion is logged, not raised into the request
+    # that freed the seat; the next release or course save retries it.
+    transaction.on_commit(partial(promote_waitlist, course_id), robust=True)
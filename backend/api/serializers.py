@@ -1,19 +1,136 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db.models import F
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import Chapter, Course, Enrollment, Profile
-
-
-class ProfileSerializer(serializers.ModelSerializer):
+from .assets import asset_url, extract_inline_assets, has_inline_assets
+from .content import atomic_with_content
+from .fieldsets import subset
+from .jsonpatch import make_patch
+from .models import (
+    Asset,
+    Chapter,
+    Course,
+    DeletionJob,
+    Enrollment,
+    InstructorStats,
+    Notification,
+    Profile,
+)
+from .renderers import RawJSON
+from .revisions import RevisionConflict, record_revision
+
+
+class RawJSONField(serializers.JSONField):
+    """
+    JSONField that can emit the column's JSON text without decoding it.
+
+    When the instance carries a ``<source>_json`` annotation (the raw JSON
+    text selected by the view) it is returned as ``RawJSON`` for the renderer
+    to embed as-is; otherwise the decoded value is used as usual.
+    """
+
+    def get_attribute(self, instance):
+        raw_attr = f"{self.source}_json"
+        if raw_attr in instance.__dict__:
+            raw = instance.__dict__[raw_attr]
+            return None if raw is None else RawJSON(raw)
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if isinstance(value, RawJSON):
+            return value
+        return super().to_representation(value)
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=`` / ``?expand=`` support (see ``api/fieldsets.py``).
+
+    ``fields`` and ``expand`` are parsed fieldsets, passed on to nested
+    serializers. ``Meta.expandable_fields`` maps a field name to the
+    ``(serializer_class, kwargs)`` that replaces it when expanded, and
+    ``Meta.field_sources`` lists the lookups a method field reads, so that
+    ``prune_queryset`` can load just what the selected fields need.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fields
+        self.expand = expand or {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in self.expand:
+            if name in expandable and name in fields:
+                serializer_class, kwargs = expandable[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        if self.fieldset is not None:
+            fields = {
+                name: field for name, field in fields.items() if name in self.fieldset
+            }
+
+        for name, field in fields.items():
+            if isinstance(field, SparseFieldsMixin):
+                field.fieldset = subset(self.fieldset, name)
+                field.expand = self.expand.get(name) or {}
+        return fields
+
+    def query_lookups(self, prefix=""):
+        """
+        Return ``(columns, relations)``: the lookups the selected fields
+        read and the forward relations they traverse.
+        """
+        sources = getattr(self.Meta, "field_sources", {})
+        columns, relations = [], []
+        for name, field in self.fields.items():
+            if isinstance(field, SparseFieldsMixin):
+                relation = prefix + field.source.replace(".", "__")
+                nested_columns, nested_relations = field.query_lookups(relation + "__")
+                relations += [relation, *nested_relations]
+                columns += nested_columns
+                continue
+
+            if name in sources:
+                lookups = sources[name]
+            elif isinstance(field, serializers.SerializerMethodField):
+                lookups = []
+            else:
+                lookups = [field.source.replace(".", "__")]
+            for lookup in lookups:
+                parts = lookup.split("__")
+                relations += [
+                    prefix + "__".join(parts[:depth]) for depth in range(1, len(parts))
+                ]
+                columns.append(prefix + lookup)
+        return columns, relations
+
+    def prune_queryset(self, queryset, *columns):
+        """
+        Load only the columns and joins the selected fields read, plus
+        ``columns``.
+        """
+        field_columns, relations = self.query_lookups()
+        if relations:
+            # select_related() without arguments would follow every relation.
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*field_columns, *columns)
+
+
+class ProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ["role", "bio"]
         extra_kwargs = {"bio": {"required": False}}
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
 
     class Meta:
@@ -21,7 +138,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "email", "first_name", "last_name", "profile"]
 
 
-class UserUpdateSerializer(serializers.ModelSerializer):
+class UserUpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(required=False)
 
     class Meta:
@@ -47,7 +164,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class PublicUserSerializer(serializers.ModelSerializer):
+class PublicUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     role = serializers.CharField(source="profile.role", read_only=True)
 
     class Meta:
@@ -80,7 +197,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class CourseListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = serializers.SerializerMethodField()
     student_count = serializers.SerializerMethodField()
     chapter_count = serializers.SerializerMethodField()
@@ -96,6 +213,8 @@ class CourseListSerializer(serializers.ModelSerializer):
             "student_count",
             "chapter_count",
         ]
+        expandable_fields = {"created_by": (PublicUserSerializer, {})}
+        field_sources = {"created_by": ["created_by__id", "created_by__username"]}
 
     def get_created_by(self, obj):
         return {"id": obj.created_by.id, "username": obj.created_by.username}
@@ -107,7 +226,22 @@ class CourseListSerializer(serializers.ModelSerializer):
         return obj.chapters.count()
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class MyCourseSerializer(CourseListSerializer):
+    """
+    Course list entry for the current student, with their progress rollup
+    (read from the ``progress_*`` annotations added by ``MyCoursesView``).
+    """
+
+    progress = serializers.SerializerMethodField()
+
+    class Meta(CourseListSerializer.Meta):
+        fields = CourseListSerializer.Meta.fields + ["progress"]
+
+    def get_progress(self, obj):
+        return {"opened": obj.progress_opened, "completed": obj.progress_completed}
+
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     student_count = serializers.SerializerMethodField()
     is_enrolled = serializers.SerializerMethodField()
@@ -121,31 +255,40 @@ class CourseSerializer(serializers.ModelSerializer):
             "created_by",
             "created_at",
             "updated_at",
+            "capacity",
+            "seats_taken",
             "student_count",
             "is_enrolled",
         ]
         read_only_fields = ["created_by", "created_at", "updated_at"]
 
     def get_student_count(self, obj):
+        # Prefer the count annotated by CourseViewSet.retrieve
+        if hasattr(obj, "student_count"):
+            return obj.student_count
         return obj.enrollments.count()
 
     def get_is_enrolled(self, obj):
+        # The view annotates the requesting user's enrollment time
+        if hasattr(obj, "enrolled_at"):
+            return obj.enrolled_at is not None
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.students.filter(id=request.user.id).exists()
         return False
 
 
-class ChapterListSerializer(serializers.ModelSerializer):
+class ChapterListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Chapter
         fields = ["id", "title", "order", "is_public"]
 
 
-class ChapterSerializer(serializers.ModelSerializer):
+class ChapterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Make course read-only for updates so PUT/PATCH doesn't require sending the course FK again.
     course = serializers.PrimaryKeyRelatedField(read_only=True)
     course_title = serializers.SerializerMethodField()
+    content = RawJSONField(required=False, allow_null=True)
 
     class Meta:
         model = Chapter
@@ -156,28 +299,190 @@ class ChapterSerializer(serializers.ModelSerializer):
             "content",
             "order",
             "is_public",
+            "revision",
             "created_at",
             "updated_at",
             "course_title",
         ]
-        read_only_fields = ["created_at", "updated_at", "course_title"]
+        read_only_fields = ["revision", "created_at", "updated_at", "course_title"]
         extra_kwargs = {
             "course": {"required": False}  # Make course optional for updates
         }
+        expandable_fields = {"course": (CourseListSerializer, {})}
+        # content lives in the content database (api/content.py).
+        field_sources = {"content": [], "course_title": ["course__title"]}
 
     def get_course_title(self, obj):
         return obj.course.title
 
+    def _editor(self):
+        request = self.context.get("request")
+        user = getattr(request, "user", None)
+        return user if user is not None and user.is_authenticated else None
+
+    def _extract_assets(self, validated_data):
+        # Pasted base64 images go to the asset store, not the document.
+        content = validated_data.get("content")
+        if has_inline_assets(content):
+            validated_data["content"], _ = extract_inline_assets(
+                content, user=self._editor()
+            )
+
+    def create(self, validated_data):
+        self._extract_assets(validated_data)
+        with atomic_with_content():
+            instance = super().create(validated_data)
+            record_revision(instance, user=self._editor())
+        return instance
+
+    def update(self, instance, validated_data):
+        """
+        Save the edit, unless the chapter was saved since it was read (or
+        since the ``base_revision`` in the context): then
+        ``RevisionConflict`` is raised instead of overwriting that save.
+        Only content changes make a new revision.
+        """
+        self._extract_assets(validated_data)
+        base_revision = self.context.get("base_revision")
+        if base_revision is not None and base_revision != instance.revision:
+            raise RevisionConflict(instance.revision)
+        previous_content = instance.content
+        delta = None
+        if "content" in validated_data:
+            delta = make_patch(previous_content, validated_data["content"])
+        bump = 1 if delta else 0
+        with atomic_with_content():
+            # Conditional, as in the JSON Patch endpoint; it also locks the
+            # row until the rest of the save commits.
+            updated = Chapter.objects.filter(
+                pk=instance.pk, revision=instance.revision
+            ).update(revision=F("revision") + bump)
+            if not updated:
+                raise RevisionConflict(
+                    Chapter.objects.filter(pk=instance.pk)
+                    .values_list("revision", flat=True)
+                    .first()
+                )
+            validated_data["revision"] = instance.revision + bump
+            instance = super().update(instance, validated_data)
+            if delta:
+                record_revision(
+                    instance,
+                    previous_content=previous_content,
+                    delta=delta,
+                    user=self._editor(),
+                )
+        return instance
+
     def validate_order(self, value):
         if value < 1:
             raise serializers.ValidationError("Order must be a positive number.")
         return value
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
     course = CourseListSerializer(read_only=True)
 
     class Meta:
         model = Enrollment
         fields = ["id", "student", "course", "enrolled_at"]
+
+
+class BatchEntrySerializer(serializers.Serializer):
+    method = serializers.CharField()
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_method(self, value):
+        value = value.upper()
+        if value not in ["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"]:
+            raise serializers.ValidationError(f"Unsupported method '{value}'.")
+        return value
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith("/api/"):
+            raise serializers.ValidationError("Path must start with /api/.")
+        if path.rstrip("/") == "/api/batch":
+            raise serializers.ValidationError("Batch requests cannot be nested.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchEntrySerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, "BATCH_REQUESTS", {}).get("MAX_REQUESTS", 20)
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"A batch may contain at most {limit} requests."
+            )
+        return value
+
+
+class ChapterContentPatchSerializer(serializers.Serializer):
+    """
+    Body of ``PATCH /api/chapters/<id>/content/`` when sent as plain JSON.
+    """
+
+    base_revision = serializers.IntegerField(min_value=1)
+    patch = serializers.ListField(child=serializers.DictField(), allow_empty=True)
+
+
+class AssetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Asset
+        fields = ["sha256", "url", "content_type", "size", "created_at"]
+
+    def get_url(self, obj):
+        return asset_url(obj.sha256)
+
+
+class InstructorStatsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = InstructorStats
+        fields = [
+            "course_count",
+            "student_count",
+            "chapter_count",
+            "public_chapter_count",
+            "recent_enrollments",
+            "updated_at",
+        ]
+
+
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    course_title = serializers.CharField(source="course.title", read_only=True)
+    chapter_title = serializers.CharField(source="chapter.title", read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = [
+            "id",
+            "kind",
+            "course",
+            "course_title",
+            "chapter",
+            "chapter_title",
+            "created_at",
+            "read_at",
+        ]
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeletionJob
+        fields = [
+            "id",
+            "kind",
+            "object_id",
+            "status",
+            "deleted_rows",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
@@ -1,8 +1,15 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Profile
+from .content import delete_content
+from .events import chapter_event, course_channel, publish_on_commit
+from .models import Chapter, Course, Enrollment, Notification, Profile
+from .notifications import notify_on_commit
+from .ranking import record_enrollment, remove_enrollment
+from .seats import count_seat, promote_on_commit, release_seat
+from .snapshot import export_on_commit
+from .stats import apply_course_delta, apply_delta, enrollment_added, enrollment_removed
 
 
 @receiver(post_save, sender=User)
@@ -21,3 +28,98 @@ def save_user_profile(sender, instance, **kwargs):
     """
     if hasattr(instance, "profile"):
         instance.profile.save()
+
+
+@receiver(post_save, sender=Chapter)
+def chapter_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Update the instructor's stats, notify course event streams about a
+    created or changed chapter, and notify enrolled students about a new or
+    newly public one.
+    """
+    if raw:
+        return
+
+    loaded = getattr(instance, "_loaded_values", {})
+    if created:
+        kind = "created"
+    elif loaded.get("is_public", instance.is_public) != instance.is_public:
+        kind = "published" if instance.is_public else "unpublished"
+    elif loaded.get("order", instance.order) != instance.order:
+        kind = "reordered"
+    else:
+        kind = "updated"
+    instance._loaded_values = {"order": instance.order, "is_public": instance.is_public}
+
+    if kind == "created":
+        apply_delta(
+            instance.course.created_by_id,
+            chapter_count=1,
+            public_chapter_count=int(instance.is_public),
+        )
+        notify_on_commit(Notification.CHAPTER_CREATED, instance)
+    elif kind in ("published", "unpublished"):
+        apply_delta(
+            instance.course.created_by_id,
+            public_chapter_count=1 if instance.is_public else -1,
+        )
+        if instance.is_public:
+            notify_on_commit(Notification.CHAPTER_PUBLISHED, instance)
+
+    publish_on_commit(course_channel(instance.course_id), chapter_event(kind, instance))
+    export_on_commit()
+
+
+@receiver(post_delete, sender=Chapter)
+def chapter_deleted(sender, instance, **kwargs):
+    delete_content([instance.pk])
+    apply_course_delta(
+        instance.course_id,
+        chapter_count=-1,
+        public_chapter_count=-int(instance.is_public),
+    )
+    publish_on_commit(
+        course_channel(instance.course_id),
+        {
+            "type": "chapter.deleted",
+            "course": instance.course_id,
+            # Streams that can't see private chapters skip private ones.
+            "chapter": {"id": instance.pk, "is_public": instance.is_public},
+        },
+    )
+    export_on_commit()
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    export_on_commit()
+    if created:
+        apply_delta(instance.created_by_id, course_count=1)
+    elif instance.capacity is None or instance.capacity > instance.seats_taken:
+        # The capacity may have been raised.
+        promote_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    apply_delta(instance.created_by_id, create_missing=False, course_count=-1)
+    export_on_commit()
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        if not getattr(instance, "_seat_taken", False):
+            count_seat(instance.course_id)
+        record_enrollment(instance.course_id, instance.enrolled_at)
+        enrollment_added(instance)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    enrollment_removed(instance)
+    release_seat(instance.course_id)
+    remove_enrollment(instance.course_id, instance.enrolled_at)
+    promote_on_commit(instance.course_id)
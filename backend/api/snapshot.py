@@ -0,0 +1,286 @@
+"""
+Static snapshots of the public catalog, for serving anonymous reads from
+any static file server or CDN instead of Django.
+
+A snapshot mirrors the anonymous API under ``<DIRECTORY>/current``, one
+``index.json`` per URL::
+
+    api/courses/index.json                 GET /api/courses/
+    api/courses/page/<n>/index.json        GET /api/courses/?page=<n>
+    api/courses/<id>/index.json            GET /api/courses/<id>/?include=chapters
+    api/chapters/<id>/index.json           GET /api/chapters/<id>/ (public only)
+    manifest.json
+
+Responses are rendered through the API views as an anonymous client, so
+the files match what Django would serve. Each export builds a new directory
+under ``snapshots/`` and then atomically repoints the ``current`` symlink at
+it: readers see either the old or the new snapshot, never a mix. Files of
+courses whose version (the course's ``updated_at`` and the count and latest
+``updated_at`` of its public chapters) is unchanged since the previous
+snapshot are hard-linked from it instead of being rendered again. Catalog
+pages carry enrollment counts, so they are always rendered; counts inside
+course files are as of the course's last change.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.urls import resolve
+from django.utils import timezone
+
+from .background import submit
+from .models import Chapter, Course
+
+MANIFEST = "manifest.json"
+CURRENT = "current"
+SNAPSHOTS = "snapshots"
+
+LOCK_KEY = "catalog-export:lock"
+PENDING_KEY = "catalog-export:pending"
+
+
+class SnapshotError(ValueError):
+    """
+    Raised when a page of the catalog cannot be rendered.
+    """
+
+
+def get_snapshot_setting(name, default):
+    return getattr(settings, "CATALOG_EXPORT", {}).get(name, default)
+
+
+def export_directory(directory=None):
+    return Path(directory or get_snapshot_setting("DIRECTORY", "catalog")).resolve()
+
+
+def _host():
+    # Pagination links are built from the host, which must be allowed.
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip(".")
+        if host and host != "*":
+            return host
+    return "localhost"
+
+
+def render_get(path):
+    """
+    Render ``GET path`` through the URLconf as an anonymous client and
+    return the response body.
+    """
+    url = urlsplit(path)
+    request = WSGIRequest(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": url.path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": url.query,
+            "SERVER_NAME": _host(),
+            "SERVER_PORT": "80",
+            "HTTP_HOST": _host(),
+            "HTTP_ACCEPT": "application/json",
+            # Not a reader: don't count chapter views or warm caches.
+            "HTTP_PURPOSE": "prefetch",
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(),
+        }
+    )
+    match = resolve(url.path)
+    request.resolver_match = match
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code != 200:
+        raise SnapshotError(f"GET {path} returned {response.status_code}.")
+    return response.content
+
+
+def _relative_page_link(link):
+    """
+    Turn an absolute pagination link into a site-relative one, valid both
+    on the API and in the snapshot.
+    """
+    if link is None:
+        return None
+    page = parse_qs(urlsplit(link).query).get("page", ["1"])[0]
+    return f"/api/courses/?page={page}"
+
+
+def _write(root, path, content):
+    target = root / path.lstrip("/") / "index.json"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    return str(target.relative_to(root))
+
+
+def _reuse(previous, root, name):
+    source = previous / name
+    target = root / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        # Different file system, or no hard link support.
+        shutil.copy2(source, target)
+
+
+def course_versions():
+    """
+    Map each course ID to the version of everything rendered for it.
+    """
+    public = Q(chapters__is_public=True)
+    courses = Course.objects.annotate(
+        public_chapters=Count("chapters", filter=public),
+        chapters_updated=Max("chapters__updated_at", filter=public),
+    ).values_list("id", "updated_at", "public_chapters", "chapters_updated")
+    return {
+        course_id: "|".join(
+            str(part) for part in (updated_at, count, chapters_updated)
+        )
+        for course_id, updated_at, count, chapters_updated in courses.iterator()
+    }
+
+
+def current_snapshot(directory=None):
+    """
+    Path of the snapshot ``current`` points at, or ``None``.
+    """
+    directory = export_directory(directory)
+    link = directory / CURRENT
+    if not link.is_symlink():
+        return None
+    return link.resolve()
+
+
+def _load_manifest(snapshot):
+    if snapshot is None:
+        return {"courses": {}}
+    try:
+        return json.loads((snapshot / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {"courses": {}}
+
+
+def _export_course(root, course_id):
+    files = [
+        _write(
+            root,
+            f"/api/courses/{course_id}/",
+            render_get(f"/api/courses/{course_id}/?include=chapters"),
+        )
+    ]
+    chapter_ids = Chapter.objects.filter(course_id=course_id, is_public=True)
+    for chapter_id in chapter_ids.values_list("id", flat=True).iterator():
+        path = f"/api/chapters/{chapter_id}/"
+        files.append(_write(root, path, render_get(path)))
+    return files
+
+
+def _export_pages(root):
+    page = 1
+    while True:
+        data = json.loads(render_get(f"/api/courses/?page={page}"))
+        data["next"] = _relative_page_link(data.get("next"))
+        data["previous"] = _relative_page_link(data.get("previous"))
+        content = json.dumps(data).encode()
+        _write(root, f"/api/courses/page/{page}/", content)
+        if page == 1:
+            _write(root, "/api/courses/", content)
+        if data["next"] is None:
+            return page
+        page += 1
+
+
+def _swap(directory, snapshot):
+    """
+    Point ``current`` at ``snapshot`` with a rename, which is atomic.
+    """
+    link = directory / CURRENT
+    temporary = directory / f".{CURRENT}-{uuid.uuid4().hex}"
+    os.symlink(Path(SNAPSHOTS) / snapshot.name, temporary)
+    os.replace(temporary, link)
+
+
+def _prune(directory, keep):
+    current = current_snapshot(directory)
+    snapshots = sorted((directory / SNAPSHOTS).iterdir(), reverse=True)
+    for snapshot in snapshots[keep:]:
+        if snapshot.resolve() != current:
+            shutil.rmtree(snapshot, ignore_errors=True)
+
+
+def export_catalog(directory=None, full=False):
+    """
+    Write a new snapshot and make it current. Unless ``full`` is set, the
+    files of unchanged courses are reused from the current snapshot.
+    Returns the new manifest.
+    """
+    directory = export_directory(directory)
+    previous = None if full else current_snapshot(directory)
+    previous_courses = _load_manifest(previous)["courses"]
+
+    name = timezone.now().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:8]
+    root = directory / SNAPSHOTS / name
+    root.mkdir(parents=True)
+
+    manifest = {"generated_at": timezone.now().isoformat(), "courses": {}}
+    rendered = reused = 0
+    try:
+        for course_id, version in course_versions().items():
+            entry = previous_courses.get(str(course_id))
+            if entry is not None and entry["version"] == version:
+                for file in entry["files"]:
+                    _reuse(previous, root, file)
+                files = entry["files"]
+                reused += 1
+            else:
+                files = _export_course(root, course_id)
+                rendered += 1
+            manifest["courses"][str(course_id)] = {"version": version, "files": files}
+
+        manifest["pages"] = _export_pages(root)
+        manifest["rendered"] = rendered
+        manifest["reused"] = reused
+        (root / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    except Exception:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    _swap(directory, root)
+    _prune(directory, get_snapshot_setting("KEEP", 3))
+    return manifest
+
+
+def _export_when_idle():
+    """
+    Export unless another export is running, in which case that one runs
+    again when it finishes. A burst of changes costs at most two exports.
+    """
+    cache.set(PENDING_KEY, True, None)
+    while cache.get(PENDING_KEY):
+        if not cache.add(LOCK_KEY, True, get_snapshot_setting("LOCK_TIMEOUT", 600)):
+            # The holder checks PENDING_KEY again after releasing the lock.
+            return
+        try:
+            cache.delete(PENDING_KEY)
+            export_catalog()
+        finally:
+            cache.delete(LOCK_KEY)
+
+
+def export_on_commit():
+    """
+    Refresh the snapshot once the current transaction commits, when the
+    signal-driven mode (``CATALOG_EXPORT["AUTO"]``) is on.
+    """
+    if get_snapshot_setting("AUTO", False):
+        transaction.on_commit(lambda: submit(_export_when_idle))
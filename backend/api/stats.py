@@ -0,0 +1,134 @@
+"""
+Incrementally maintained instructor dashboard statistics.
+
+Signal handlers apply each enrollment/chapter/course change to the owning
+instructor's ``InstructorStats`` row as an ``F()`` delta, in the same
+transaction as the change, so the dashboard is a single-row read. Writes
+that bypass signals (``bulk_create``, ``.update()``, raw SQL) are caught by
+``python manage.py check_instructor_stats --fix``.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Chapter, Course, Enrollment, InstructorStats
+from .row_serializers import format_datetime
+
+COUNTERS = ("course_count", "student_count", "chapter_count", "public_chapter_count")
+
+
+def recent_enrollment_entry(enrollment):
+    return {
+        "id": enrollment.pk,
+        "student": {
+            "id": enrollment.student_id,
+            "username": enrollment.student.username,
+        },
+        "course": {"id": enrollment.course_id, "title": enrollment.course.title},
+        "enrolled_at": format_datetime(enrollment.enrolled_at),
+    }
+
+
+def recent_enrollments(instructor_id):
+    enrollments = (
+        Enrollment.objects.filter(
+            course__created_by_id=instructor_id, course__deleted_at__isnull=True
+        )
+        .select_related("student", "course")
+        .order_by("-enrolled_at", "-id")
+    )
+    return [
+        recent_enrollment_entry(enrollment)
+        for enrollment in enrollments[: InstructorStats.RECENT_ENROLLMENTS]
+    ]
+
+
+def compute_instructor_stats(instructor_id):
+    """
+    Recompute an instructor's statistics from the source tables.
+    """
+    # Courses being deleted (api/deletion.py) no longer count.
+    owned = {"course__created_by_id": instructor_id, "course__deleted_at__isnull": True}
+    chapters = Chapter.objects.filter(**owned).aggregate(
+        total=Count("id"), public=Count("id", filter=Q(is_public=True))
+    )
+    return {
+        "course_count": Course.objects.filter(created_by_id=instructor_id).count(),
+        "student_count": Enrollment.objects.filter(**owned).count(),
+        "chapter_count": chapters["total"],
+        "public_chapter_count": chapters["public"],
+        "recent_enrollments": recent_enrollments(instructor_id),
+    }
+
+
+def refresh_instructor_stats(instructor_id):
+    """
+    Rebuild an instructor's row from scratch and return it.
+    """
+    stats, _ = InstructorStats.objects.update_or_create(
+        instructor_id=instructor_id, defaults=compute_instructor_stats(instructor_id)
+    )
+    return stats
+
+
+def apply_delta(instructor_id, create_missing=True, **deltas):
+    """
+    Add ``deltas`` to the instructor's counters. A missing row is built from
+    scratch instead (which already includes the change being applied),
+    unless ``create_missing`` is off, as on delete paths where the
+    instructor may be going away too.
+    """
+    updated = InstructorStats.objects.filter(instructor_id=instructor_id).update(
+        updated_at=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items() if delta},
+    )
+    if not updated and create_missing:
+        refresh_instructor_stats(instructor_id)
+
+
+def apply_course_delta(course_id, **deltas):
+    """
+    ``apply_delta`` for the owner of ``course_id`` without loading the
+    course (used from cascaded deletes). Missing rows are left missing.
+    """
+    InstructorStats.objects.filter(instructor__created_courses=course_id).update(
+        updated_at=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items() if delta},
+    )
+
+
+def enrollment_added(enrollment):
+    instructor_id = enrollment.course.created_by_id
+    with transaction.atomic():
+        stats = (
+            InstructorStats.objects.select_for_update()
+            .filter(instructor_id=instructor_id)
+            .first()
+        )
+        if stats is None:
+            refresh_instructor_stats(instructor_id)
+            return
+        stats.student_count = F("student_count") + 1
+        stats.recent_enrollments = [recent_enrollment_entry(enrollment)] + [
+            entry for entry in stats.recent_enrollments if entry["id"] != enrollment.pk
+        ][: InstructorStats.RECENT_ENROLLMENTS - 1]
+        stats.save(update_fields=["student_count", "recent_enrollments", "updated_at"])
+
+
+def enrollment_removed(enrollment):
+    with transaction.atomic():
+        stats = (
+            InstructorStats.objects.select_for_update()
+            .filter(instructor__created_courses=enrollment.course_id)
+            .first()
+        )
+        if stats is None:
+            return
+        stats.student_count = F("student_count") - 1
+        fields = ["student_count", "updated_at"]
+        if any(entry["id"] == enrollment.pk for entry in stats.recent_enrollments):
+            # Refill the list from the table rather than leave a gap.
+            stats.recent_enrollments = recent_enrollments(stats.instructor_id)
+            fields.append("recent_enrollments")
+        stats.save(update_fields=fields)
@@ -1,3 +1,1294 @@
-from django.test import TestCase
+import asyncio
+import base64
+import copy
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Chapter,
+    ChapterContent,
+    ChapterProgress,
+    ChapterRevision,
+    Course,
+    DailyActivity,
+    DeletionJob,
+    Enrollment,
+    Notification,
+    Profile,
+    WaitlistEntry,
+)
+from .assets import asset_url, store_stream
+from .events import chapter_event, course_channel, publish
+from .idempotency import idempotent
+from .progress import ProgressBuffer
+from .middleware import AdmissionControlMiddleware
+from .jsonpatch import JsonPatchError, apply_patch, make_patch
+from .revisions import RevisionConflict, reconstruct, record_revision
+from .row_serializers import (
+    ChapterListRowSerializer,
+    CourseListRowSerializer,
+    EnrollmentRowSerializer,
+)
+from .seats import enroll_student
+from .throttling import LOCK_WAIT, TokenBucketThrottle
+from .views import course_events
+from .serializers import (
+    ChapterListSerializer,
+    ChapterSerializer,
+    CourseListSerializer,
+    EnrollmentSerializer,
+)
+
+# Write everything synchronously and keep the activity log off disk.
+test_settings = override_settings(
+    PROGRESS_TRACKING={"FLUSH_INTERVAL": 0},
+    ACTIVITY_LOG={"ENABLED": False},
+    BACKGROUND_TASKS={"ENABLED": False},
+)
+
+
+def create_user(username, role="student"):
+    user = User.objects.create_user(username, password="password")
+    user.profile.role = role
+    user.profile.save()
+    return user
+
+
+@test_settings
+class EnrollmentCapacityTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        self.course = Course.objects.create(
+            title="Full course",
+            description="Two seats.",
+            created_by=self.instructor,
+            capacity=2,
+        )
+        self.students = [create_user(f"student{i}") for i in range(5)]
+
+    def enroll(self, student):
+        self.client.force_authenticate(student)
+        return self.client.post(f"/api/courses/{self.course.pk}/enroll/")
+
+    def unenroll(self, student):
+        self.client.force_authenticate(student)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.delete(f"/api/courses/{self.course.pk}/unenroll/")
+
+    def test_capacity_is_never_exceeded(self):
+        responses = [self.enroll(student) for student in self.students]
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * 2 + [status.HTTP_202_ACCEPTED] * 3,
+        )
+        self.assertEqual(
+            [response.data["position"] for response in responses[2:]], [1, 2, 3]
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, 2)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
+
+    def test_waitlist_is_promoted_in_arrival_order(self):
+        for student in self.students:
+            self.enroll(student)
+
+        self.unenroll(self.students[0])
+        self.unenroll(self.students[1])
+
+        enrolled = set(
+            Enrollment.objects.filter(course=self.course).values_list(
+                "student", flat=True
+            )
+        )
+        self.assertEqual(enrolled, {self.students[2].pk, self.students[3].pk})
+        self.assertEqual(
+            list(
+                WaitlistEntry.objects.filter(course=self.course).values_list(
+                    "student", flat=True
+                )
+            ),
+            [self.students[4].pk],
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, 2)
+
+    def test_leaving_the_waitlist_keeps_the_seats(self):
+        for student in self.students[:3]:
+            self.enroll(student)
+
+        response = self.unenroll(self.students[2])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(WaitlistEntry.objects.filter(course=self.course).exists())
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
+
+
+@test_settings
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    databases = {"default", "content"}
+
+    def test_concurrent_enrollments_do_not_oversell(self):
+        instructor = create_user("instructor", role="instructor")
+        course = Course.objects.create(
+            title="Contended course",
+            description="Three seats.",
+            created_by=instructor,
+            capacity=3,
+        )
+        students = [create_user(f"student{i}") for i in range(12)]
+        barrier = threading.Barrier(len(students))
+
+        def enroll(student):
+            try:
+                barrier.wait()
+                # The in-memory SQLite test database fails on lock contention
+                # instead of waiting; retry like a client would.
+                for _ in range(100):
+                    try:
+                        enroll_student(course, student)
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [
+            threading.Thread(target=enroll, args=(student,)) for student in students
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        course.refresh_from_db()
+        self.assertEqual(course.seats_taken, 3)
+        self.assertEqual(Enrollment.objects.filter(course=course).count(), 3)
+        self.assertEqual(WaitlistEntry.objects.filter(course=course).count(), 9)
+
+
+@test_settings
+class RowSerializerTests(APITestCase):
+    """
+    The compiled list serializers must produce exactly what the DRF
+    serializers they replace do.
+    """
+
+    databases = {"default", "content"}
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = create_user("instructor", role="instructor")
+        students = [create_user(f"student{i}") for i in range(3)]
+        # A student without a profile, as left behind by bulk_create.
+        students.append(User.objects.create_user("noprofile"))
+        Profile.objects.filter(user=students[-1]).delete()
+
+        courses = [
+            Course.objects.create(
+                title=f"Course {i}",
+                description="Description",
+                created_by=instructor,
+                capacity=10 if i % 2 else None,
+            )
+            for i in range(3)
+        ]
+        for i in range(4):
+            Chapter.objects.create(
+                course=courses[0],
+                title=f"Chapter {i}",
+                order=i + 1,
+                content=[{"type": "p", "text": f"Body {i}"}],
+                is_public=i % 2 == 0,
+            )
+        for i, student in enumerate(students):
+            Enrollment.objects.create(student=student, course=courses[i % 2])
+
+    def assertSameOutput(self, drf_class, row_class, queryset):
+        row_serializer = row_class()
+        expected = drf_class(list(queryset), many=True).data
+        actual = row_serializer.serialize(list(row_serializer.values(queryset)))
+        self.assertEqual(
+            json.loads(json.dumps(actual)), json.loads(json.dumps(expected))
+        )
+
+    def test_course_list(self):
+        self.assertSameOutput(
+            CourseListSerializer,
+            CourseListRowSerializer,
+            Course.objects.select_related("created_by")
+            .prefetch_related("enrollments", "chapters")
+            .order_by("id"),
+        )
+
+    def test_chapter_list(self):
+        self.assertSameOutput(
+            ChapterListSerializer,
+            ChapterListRowSerializer,
+            Chapter.objects.order_by("order"),
+        )
+
+    def test_enrollment_list(self):
+        self.assertSameOutput(
+            EnrollmentSerializer,
+            EnrollmentRowSerializer,
+            Enrollment.objects.select_related("student__profile", "course__created_by")
+            .prefetch_related("course__enrollments", "course__chapters")
+            .order_by("id"),
+        )
+
+
+@test_settings
+@override_settings(CHAPTER_REVISIONS={"SNAPSHOT_INTERVAL": 3, "KEEP": 50})
+class ChapterRevisionTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        self.course = Course.objects.create(
+            title="Course", description="Description", created_by=self.instructor
+        )
+        self.client.force_authenticate(self.instructor)
+
+    def test_reconstruct_matches_saved_content(self):
+        content = [{"type": "p", "text": f"Paragraph {i} " * 10} for i in range(10)]
+        response = self.client.post(
+            f"/api/courses/{self.course.pk}/chapters/",
+            {"title": "Chapter", "order": 1, "content": content},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        chapter_id = response.data["id"]
+        saved = {1: copy.deepcopy(content)}
+
+        for revision in range(2, 10):
+            if revision % 4 == 0:
+                # Through the JSON Patch endpoint, which stores its own ops.
+                block = {"type": "p", "text": f"Added in {revision}"}
+                response = self.client.patch(
+                    f"/api/chapters/{chapter_id}/content/",
+                    {
+                        "base_revision": revision - 1,
+                        "patch": [{"op": "add", "path": "/-", "value": block}],
+                    },
+                    format="json",
+                )
+                content.append(block)
+            else:
+                content[revision]["text"] = f"Edited in {revision}"
+                response = self.client.patch(
+                    f"/api/chapters/{chapter_id}/", {"content": content}, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            saved[revision] = copy.deepcopy(content)
+
+        chapter = Chapter.objects.get(pk=chapter_id)
+        kinds = set(
+            ChapterRevision.objects.filter(chapter=chapter).values_list(
+                "kind", flat=True
+            )
+        )
+        self.assertEqual(kinds, {ChapterRevision.SNAPSHOT, ChapterRevision.DELTA})
+        for revision, expected in saved.items():
+            with self.subTest(revision=revision):
+                self.assertEqual(reconstruct(chapter, revision), expected)
+
+        response = self.client.get(f"/api/chapters/{chapter_id}/revisions/5/")
+        self.assertEqual(response.data["content"], saved[5])
+
+    def test_first_edit_keeps_the_previous_content(self):
+        # Chapters saved before the history existed have no revisions.
+        for path in ("", "content/"):
+            chapter = Chapter.objects.create(
+                course=self.course,
+                title="Chapter",
+                order=Chapter.objects.count() + 1,
+                content=[{"text": "original"}],
+            )
+            url = f"/api/chapters/{chapter.pk}/{path}"
+            if path:
+                operations = [{"op": "replace", "path": "/0/text", "value": "new"}]
+                data = {"base_revision": 1, "patch": operations}
+            else:
+                data = {"content": [{"text": "new"}]}
+
+            with self.subTest(path=path):
+                response = self.client.patch(url, data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(reconstruct(chapter, 1), [{"text": "original"}])
+                self.assertEqual(reconstruct(chapter, 2), [{"text": "new"}])
+
+    def test_unchanged_content_makes_no_revision(self):
+        response = self.client.post(
+            f"/api/courses/{self.course.pk}/chapters/",
+            {"title": "Chapter", "order": 1, "content": [{"text": "a"}]},
+            format="json",
+        )
+        url = f"/api/chapters/{response.data['id']}/"
+
+        response = self.client.patch(url, {"title": "Renamed"}, format="json")
+        self.assertEqual(response.data["revision"], 1)
+        response = self.client.patch(
+            url, {"content": [{"text": "a"}], "is_public": True}, format="json"
+        )
+        self.assertEqual(response.data["revision"], 1)
+        response = self.client.patch(
+            f"{url}content/",
+            {
+                "base_revision": 1,
+                "patch": [{"op": "test", "path": "/0/text", "value": "a"}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.data["revision"], 1)
+        self.assertEqual(
+            ChapterRevision.objects.filter(chapter_id=response.data["id"]).count(), 1
+        )
+
+    def test_missing_revision(self):
+        chapter = Chapter.objects.create(
+            course=self.course, title="Chapter", order=1, content=[]
+        )
+
+        with self.assertRaises(ChapterRevision.DoesNotExist):
+            reconstruct(chapter, chapter.revision + 1)
+        response = self.client.get(
+            f"/api/chapters/{chapter.pk}/revisions/{chapter.revision + 1}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@test_settings
+class ChapterEditConflictTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        course = Course.objects.create(
+            title="Course", description="Description", created_by=self.instructor
+        )
+        self.chapter = Chapter.objects.create(
+            course=course, title="Chapter", order=1, content=[{"text": "a"}]
+        )
+        self.url = f"/api/chapters/{self.chapter.pk}/"
+        self.client.force_authenticate(self.instructor)
+
+    def patch_content(self, base_revision, operations):
+        return self.client.patch(
+            f"{self.url}content/",
+            {"base_revision": base_revision, "patch": operations},
+            format="json",
+        )
+
+    def test_save_racing_a_patch_is_a_conflict(self):
+        stale = Chapter.objects.get(pk=self.chapter.pk)
+        response = self.patch_content(1, [{"op": "add", "path": "/-", "value": 1}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        serializer = ChapterSerializer(
+            stale, data={"content": [{"text": "b"}]}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(RevisionConflict) as raised:
+            serializer.save()
+
+        self.assertEqual(raised.exception.revision, 2)
+        chapter = Chapter.objects.get(pk=self.chapter.pk)
+        self.assertEqual(chapter.revision, 2)
+        self.assertEqual(chapter.content, [{"text": "a"}, 1])
+
+    def test_update_checks_if_match(self):
+        self.patch_content(1, [{"op": "add", "path": "/-", "value": 1}])
+
+        response = self.client.patch(
+            self.url, {"title": "Renamed"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["revision"], 2)
+
+        response = self.client.patch(
+            self.url, {"title": "Renamed"}, format="json", HTTP_IF_MATCH="latest"
+        )
+        self.assertEqual(response.status_code, status.HTTP_428_PRECONDITION_REQUIRED)
+
+        response = self.client.patch(
+            self.url, {"title": "Renamed"}, format="json", HTTP_IF_MATCH='"2"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_patch_content(self):
+        response = self.client.patch(
+            f"{self.url}content/",
+            json.dumps([{"op": "replace", "path": "/0/text", "value": "b"}]),
+            content_type="application/json-patch+json",
+            HTTP_IF_MATCH='"1"',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["revision"], 2)
+        self.assertEqual(
+            Chapter.objects.get(pk=self.chapter.pk).content, [{"text": "b"}]
+        )
+
+    def test_patch_content_on_a_stale_revision(self):
+        self.patch_content(1, [{"op": "add", "path": "/-", "value": 1}])
+
+        response = self.patch_content(1, [{"op": "add", "path": "/-", "value": 2}])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["revision"], 2)
+        self.assertEqual(
+            Chapter.objects.get(pk=self.chapter.pk).content, [{"text": "a"}, 1]
+        )
+
+    def test_json_patch_requires_if_match(self):
+        operations = json.dumps([{"op": "add", "path": "/-", "value": 1}])
+        for headers in ({}, {"HTTP_IF_MATCH": "*"}, {"HTTP_IF_MATCH": '"abc"'}):
+            with self.subTest(headers=headers):
+                response = self.client.patch(
+                    f"{self.url}content/",
+                    operations,
+                    content_type="application/json-patch+json",
+                    **headers,
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_428_PRECONDITION_REQUIRED
+                )
+
+    def test_failed_patch_leaves_content_unchanged(self):
+        response = self.patch_content(
+            1,
+            [
+                {"op": "add", "path": "/-", "value": 1},
+                {"op": "test", "path": "/0/text", "value": "z"},
+            ],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        chapter = Chapter.objects.get(pk=self.chapter.pk)
+        self.assertEqual(chapter.revision, 1)
+        self.assertEqual(chapter.content, [{"text": "a"}])
+
+
+class JsonPatchTests(SimpleTestCase):
+    def apply(self, document, *operations):
+        return apply_patch(copy.deepcopy(document), list(operations))
+
+    def test_add(self):
+        document = {"blocks": ["a", "c"]}
+        self.assertEqual(
+            self.apply(document, {"op": "add", "path": "/blocks/1", "value": "b"}),
+            {"blocks": ["a", "b", "c"]},
+        )
+        self.assertEqual(
+            self.apply(document, {"op": "add", "path": "/blocks/-", "value": "d"}),
+            {"blocks": ["a", "c", "d"]},
+        )
+        self.assertEqual(
+            self.apply(document, {"op": "add", "path": "/title", "value": "T"}),
+            {"blocks": ["a", "c"], "title": "T"},
+        )
+        self.assertEqual(
+            self.apply(document, {"op": "add", "path": "", "value": []}), []
+        )
+
+    def test_remove_and_replace(self):
+        document = {"blocks": ["a", "b"], "title": "T"}
+        self.assertEqual(
+            self.apply(document, {"op": "remove", "path": "/blocks/0"}),
+            {"blocks": ["b"], "title": "T"},
+        )
+        self.assertEqual(
+            self.apply(document, {"op": "replace", "path": "/title", "value": "U"}),
+            {"blocks": ["a", "b"], "title": "U"},
+        )
+
+    def test_move_and_copy(self):
+        document = {"blocks": ["a", "b", "c"], "title": "T"}
+        move = {"op": "move", "from": "/blocks/0", "path": "/blocks/-"}
+        self.assertEqual(
+            self.apply(document, move), {"blocks": ["b", "c", "a"], "title": "T"}
+        )
+        self.assertEqual(
+            self.apply(document, {"op": "copy", "from": "/title", "path": "/blocks/0"}),
+            {"blocks": ["T", "a", "b", "c"], "title": "T"},
+        )
+        with self.assertRaises(JsonPatchError):
+            self.apply(document, {"op": "move", "from": "/blocks", "path": "/blocks/0"})
+
+    def test_test(self):
+        document = {"flag": True, "count": 1}
+        self.assertEqual(
+            self.apply(document, {"op": "test", "path": "/count", "value": 1}), document
+        )
+        # JSON true is not 1.
+        for path, value in (("/count", 2), ("/flag", 1)):
+            with self.assertRaises(JsonPatchError):
+                self.apply(document, {"op": "test", "path": path, "value": value})
+
+    def test_invalid_pointers(self):
+        document = {"blocks": ["a"], "a/b": {"~": 1}}
+        self.assertEqual(
+            self.apply(document, {"op": "remove", "path": "/a~1b/~0"}),
+            {"blocks": ["a"], "a/b": {}},
+        )
+        for operation in (
+            {"op": "remove", "path": "blocks/0"},
+            {"op": "remove", "path": "/blocks/-"},
+            {"op": "remove", "path": "/blocks/01"},
+            {"op": "remove", "path": "/blocks/1"},
+            {"op": "add", "path": "/blocks/2", "value": "x"},
+            {"op": "add", "path": "/missing/0", "value": "x"},
+            {"op": "replace", "path": "/blocks/0/x", "value": "x"},
+            {"op": "add", "path": "/blocks/0"},
+            {"op": "frobnicate", "path": "/blocks"},
+        ):
+            with self.subTest(operation=operation), self.assertRaises(JsonPatchError):
+                self.apply(document, operation)
+
+    def test_make_patch_round_trips(self):
+        old = [{"text": "a"}, {"text": "b", "bold": True}, {"text": "c"}]
+        new = [{"text": "a"}, {"text": "B"}, {"text": "c"}, {"text": "d"}]
+        self.assertEqual(apply_patch(copy.deepcopy(old), make_patch(old, new)), new)
+        self.assertEqual(make_patch(old, copy.deepcopy(old)), [])
+
+
+@test_settings
+class CatalogExportTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        export = {"DIRECTORY": directory.name, "AUTO": True}
+        self.enterContext(override_settings(CATALOG_EXPORT=export))
+        self.instructor = create_user("instructor", role="instructor")
+        self.client.force_authenticate(self.instructor)
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(
+                title="Course", description="Description", created_by=self.instructor
+            )
+            self.chapters = [
+                Chapter.objects.create(
+                    course=course,
+                    title=f"Chapter {i}",
+                    order=i + 1,
+                    content=[{"text": "original"}],
+                    is_public=True,
+                )
+                for i in range(2)
+            ]
+
+    def exported(self, chapter):
+        path = self.directory / f"current/api/chapters/{chapter.pk}/index.json"
+        return json.loads(path.read_bytes())
+
+    def test_patched_chapter_is_exported(self):
+        chapter = self.chapters[0]
+        self.assertEqual(self.exported(chapter)["content"], [{"text": "original"}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/chapters/{chapter.pk}/content/",
+                {
+                    "base_revision": 1,
+                    "patch": [{"op": "replace", "path": "/0/text", "value": "new"}],
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        exported = self.exported(chapter)
+        self.assertEqual(exported["content"], [{"text": "new"}])
+        self.assertEqual(exported["revision"], 2)
+
+    def test_prefetch_does_not_warm_the_next_chapter(self):
+        url = f"/api/chapters/{self.chapters[0].pk}/"
+        with mock.patch("api.views.warm_next") as warm_next:
+            self.client.get(url, HTTP_PURPOSE="prefetch")
+            warm_next.assert_not_called()
+            self.client.get(url)
+            warm_next.assert_called_once()
+
+
+# A complete 1x1 PNG.
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8"
+    "AAAAASUVORK5CYII="
+)
+
+
+@test_settings
+class AssetTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = {"DIRECTORY": directory.name}
+        self.enterContext(override_settings(ASSET_STORAGE=storage))
+        self.instructor = create_user("instructor", role="instructor")
+        self.client.force_authenticate(self.instructor)
+
+    def download(self, sha256, **headers):
+        response = self.client.get(f"/api/assets/{sha256}/", **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_patch_moves_inline_images_to_the_store(self):
+        course = Course.objects.create(
+            title="Course", description="Description", created_by=self.instructor
+        )
+        chapter = Chapter.objects.create(course=course, title="Chapter", order=1)
+        data_url = "data:image/png;base64," + base64.b64encode(PNG).decode()
+        image = {"type": "img", "url": data_url}
+
+        response = self.client.patch(
+            f"/api/chapters/{chapter.pk}/content/",
+            {
+                "base_revision": 1,
+                "patch": [{"op": "add", "path": "/-", "value": image}],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        asset, _ = store_stream(io.BytesIO(PNG))
+        url = asset_url(asset.sha256)
+        expected = [{"type": "img", "url": url, "asset": asset.sha256}]
+        self.assertEqual(response.data["content"], expected)
+        chapter = Chapter.objects.get(pk=chapter.pk)
+        self.assertEqual(chapter.content, expected)
+        self.assertEqual(reconstruct(chapter, 2), expected)
+
+    def test_download_headers(self):
+        asset, _ = store_stream(io.BytesIO(PNG))
+
+        response = self.download(asset.sha256)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), PNG)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["ETag"], f'"{asset.sha256}"')
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        etag = f'"{asset.sha256}"'
+        response = self.download(asset.sha256, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_range_requests(self):
+        asset, _ = store_stream(io.BytesIO(PNG))
+        size = len(PNG)
+
+        for header, (start, end) in (
+            ("bytes=0-9", (0, 9)),
+            ("bytes=10-", (10, size - 1)),
+            ("bytes=-8", (size - 8, size - 1)),
+            (f"bytes=5-{size + 100}", (5, size - 1)),
+        ):
+            with self.subTest(header=header):
+                response = self.download(asset.sha256, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+                self.assertEqual(
+                    response["Content-Range"], f"bytes {start}-{end}/{size}"
+                )
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(
+                    b"".join(response.streaming_content), PNG[start : end + 1]
+                )
+
+        for header in (f"bytes={size}-", "bytes=-0", "bytes=9-5"):
+            with self.subTest(header=header):
+                response = self.download(asset.sha256, HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                )
+                self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+        # A stale If-Range gets the whole file.
+        response = self.download(
+            asset.sha256, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"other"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@test_settings
+class BatchTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        self.student = create_user("student")
+        self.course = Course.objects.create(
+            title="Course", description="Description", created_by=self.instructor
+        )
+        self.client.force_authenticate(self.student)
+
+    def batch(self, *requests):
+        response = self.client.post(
+            "/api/batch/", {"requests": list(requests)}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_entries_have_their_own_status(self):
+        course = f"/api/courses/{self.course.pk}/"
+        results = self.batch(
+            {"method": "GET", "path": course},
+            {"method": "GET", "path": "/api/courses/0/"},
+            {"method": "GET", "path": "/api/nowhere/"},
+            {"method": "POST", "path": "/api/courses/", "body": {"title": "x"}},
+            {"method": "POST", "path": f"{course}enroll/"},
+            {"method": "POST", "path": f"{course}enroll/"},
+            {"method": "GET", "path": "/api/my-courses/"},
+        )
+
+        statuses = [result["status"] for result in results]
+        self.assertEqual(statuses, [200, 404, 404, 403, 201, 403, 200])
+        self.assertEqual(results[0]["body"]["title"], "Course")
+        self.assertEqual(results[6]["body"]["count"], 1)
+
+    def test_failing_entry_does_not_abort_the_others(self):
+        enroll = mock.patch("api.views.CourseViewSet.enroll", side_effect=RuntimeError)
+        with enroll, self.assertLogs("api.batch", "ERROR"):
+            results = self.batch(
+                {"method": "POST", "path": f"/api/courses/{self.course.pk}/enroll/"},
+                {"method": "GET", "path": f"/api/courses/{self.course.pk}/"},
+            )
+
+        self.assertEqual([result["status"] for result in results], [500, 200])
+        self.assertEqual(results[0]["body"], {"detail": "Internal server error."})
+
+    def test_streaming_entries_are_rejected(self):
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        with override_settings(ASSET_STORAGE={"DIRECTORY": storage.name}):
+            asset, _ = store_stream(io.BytesIO(PNG))
+            with mock.patch("api.batch._result") as result:
+                results = self.batch(
+                    {"method": "GET", "path": f"/api/assets/{asset.sha256}/"},
+                    {"method": "GET", "path": f"/api/courses/{self.course.pk}/events/"},
+                )
+                result.assert_not_called()
+
+        self.assertEqual([result["status"] for result in results], [400, 400])
+
+
+class CountingView(APIView):
+    """
+    Counts the requests that actually run; answers with ``response_status``.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+    calls = 0
+    delay = 0
+    response_status = status.HTTP_201_CREATED
+
+    @idempotent
+    def post(self, request):
+        type(self).calls += 1
+        time.sleep(self.delay)
+        return Response(
+            {"calls": self.calls, **request.data}, status=self.response_status
+        )
+
+
+@override_settings(IDEMPOTENCY={"POLL_INTERVAL": 0.01})
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        CountingView.calls = 0
+
+    def post(self, data=None, key="key-1", **attributes):
+        request = APIRequestFactory().post(
+            "/api/counting/", data or {}, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+        return CountingView.as_view(**attributes)(request)
+
+    def test_replays_the_stored_response(self):
+        first = self.post({"title": "a"})
+        second = self.post({"title": "a"})
+
+        self.assertEqual(CountingView.calls, 1)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertFalse(first.has_header("Idempotent-Replayed"))
+
+        self.post({"title": "a"}, key="key-2")
+        self.assertEqual(CountingView.calls, 2)
+
+    def test_key_reused_with_another_body(self):
+        self.post({"title": "a"})
+        response = self.post({"title": "b"})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_concurrent_duplicates_run_once(self):
+        responses = []
+
+        def post():
+            responses.append(self.post({"title": "a"}, delay=0.2))
+
+        threads = [threading.Thread(target=post) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(CountingView.calls, 1)
+        self.assertEqual([response.data["calls"] for response in responses], [1] * 5)
+        replayed = [r.has_header("Idempotent-Replayed") for r in responses]
+        self.assertEqual(replayed.count(True), 4)
+
+    def test_errors_and_throttled_responses_are_not_stored(self):
+        for code in (
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ):
+            with self.subTest(status=code):
+                CountingView.calls = 0
+                self.post(response_status=code, key=f"key-{code}")
+                response = self.post(response_status=code, key=f"key-{code}")
+
+                self.assertEqual(CountingView.calls, 2)
+                self.assertEqual(response.status_code, code)
+                self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+
+class ThreePerMinuteThrottle(TokenBucketThrottle):
+    scope = "test"
+    now = 1000.0
+
+    def get_rate(self):
+        return "3/min"
+
+    def get_cache_key(self, request, view):
+        return "throttle_test"
+
+    def timer(self):
+        return type(self).now
+
+
+class ThrottledView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [ThreePerMinuteThrottle]
+
+    def get(self, request):
+        return Response({})
+
+
+class TokenBucketThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        ThreePerMinuteThrottle.now = 1000.0
+
+    def get(self):
+        return ThrottledView.as_view()(APIRequestFactory().get("/api/throttled/"))
+
+    def test_empty_bucket_answers_429_with_retry_after(self):
+        statuses = [self.get().status_code for _ in range(3)]
+        response = self.get()
+
+        self.assertEqual(statuses, [status.HTTP_200_OK] * 3)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # One token every 20 seconds.
+        self.assertEqual(response["Retry-After"], "20")
+
+        ThreePerMinuteThrottle.now += 15
+        self.assertEqual(self.get()["Retry-After"], "5")
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(3):
+            self.get()
+
+        ThreePerMinuteThrottle.now += 20
+        self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Refilling stops at the bucket size.
+        ThreePerMinuteThrottle.now += 3600
+        statuses = [self.get().status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_busy_bucket_wait_follows_its_state(self):
+        cache.add("throttle_test:lock", True)
+        throttle = ThreePerMinuteThrottle()
+
+        self.assertFalse(throttle.allow_request(None, None))
+        # The bucket still holds tokens, so only the lock is worth waiting for.
+        self.assertEqual(throttle.wait(), LOCK_WAIT)
+
+        cache.set("throttle_test", (0.5, ThreePerMinuteThrottle.now))
+        self.assertFalse(throttle.allow_request(None, None))
+        self.assertEqual(throttle.wait(), 10)
+
+
+@override_settings(ADMISSION_CONTROL={"MAX_IN_FLIGHT": 1, "RETRY_AFTER": 2})
+class AdmissionControlTests(SimpleTestCase):
+    def test_requests_beyond_the_limit_are_rejected(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def get_response(request):
+            if request.path == "/api/slow/":
+                entered.set()
+                release.wait(5)
+            return HttpResponse()
+
+        middleware = AdmissionControlMiddleware(get_response)
+        factory = RequestFactory()
+        slow = threading.Thread(target=middleware, args=(factory.get("/api/slow/"),))
+        slow.start()
+        entered.wait(5)
+        try:
+            response = middleware(factory.get("/api/courses/"))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "2")
+            # Only API paths are limited.
+            self.assertEqual(middleware(factory.get("/admin/")).status_code, 200)
+        finally:
+            release.set()
+            slow.join()
+
+        self.assertEqual(middleware(factory.get("/api/courses/")).status_code, 200)
+        self.assertEqual(middleware.in_flight, 0)
+
+    def test_async_stack(self):
+        release = asyncio.Event()
+
+        async def get_response(request):
+            if request.path == "/api/slow/":
+                await release.wait()
+            return HttpResponse()
+
+        middleware = AdmissionControlMiddleware(get_response)
+        factory = RequestFactory()
+
+        async def run():
+            slow = asyncio.ensure_future(middleware(factory.get("/api/slow/")))
+            await asyncio.sleep(0)
+            busy = await middleware(factory.get("/api/courses/"))
+            release.set()
+            await slow
+            return busy, await middleware(factory.get("/api/courses/"))
+
+        busy, admitted = asyncio.run(run())
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(admitted.status_code, 200)
+
+
+@test_settings
+@override_settings(DELETION={"CHUNK_SIZE": 2})
+class CourseDeletionTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        self.students = [create_user(f"student{i}") for i in range(5)]
+        self.course = self.create_course("Deleted")
+        self.other = self.create_course("Kept")
+
+    def create_course(self, title):
+        course = Course.objects.create(
+            title=title,
+            description="Description",
+            created_by=self.instructor,
+            capacity=3,
+        )
+        for student in self.students:
+            enroll_student(course, student)
+        now = timezone.now()
+        for i in range(5):
+            chapter = Chapter.objects.create(
+                course=course, title=f"{title} {i}", order=i + 1, content=[{"i": i}]
+            )
+            record_revision(chapter)
+            for student in self.students[:3]:
+                ChapterProgress.objects.create(
+                    student=student,
+                    chapter=chapter,
+                    course=course,
+                    first_opened_at=now,
+                    last_opened_at=now,
+                    view_count=1,
+                )
+                Notification.objects.create(
+                    recipient=student,
+                    kind=Notification.CHAPTER_CREATED,
+                    course=course,
+                    chapter=chapter,
+                )
+            DailyActivity.objects.create(
+                date=now.date(),
+                kind=DailyActivity.CHAPTER_VIEW,
+                course=course,
+                chapter=chapter,
+                count=3,
+            )
+        return course
+
+    def rows(self, course=None):
+        """
+        Row counts of the course's dependents, or of all rows without one.
+        """
+        chapters = Chapter.objects.all()
+        querysets = {
+            "revisions": ChapterRevision.objects.all(),
+            "enrollments": Enrollment.objects.all(),
+            "waitlist": WaitlistEntry.objects.all(),
+            "progress": ChapterProgress.objects.all(),
+            "notifications": Notification.objects.all(),
+            "activity": DailyActivity.objects.all(),
+        }
+        contents = ChapterContent.objects.all()
+        if course is not None:
+            chapters = chapters.filter(course=course)
+            querysets = {
+                name: queryset.filter(
+                    **{"chapter__course" if name == "revisions" else "course": course}
+                )
+                for name, queryset in querysets.items()
+            }
+            contents = contents.filter(
+                chapter_id__in=list(chapters.values_list("pk", flat=True))
+            )
+        return {
+            "chapters": chapters.count(),
+            "contents": contents.count(),
+            **{name: queryset.count() for name, queryset in querysets.items()},
+        }
+
+    def test_course_and_dependents_are_deleted_in_chunks(self):
+        before = self.rows(self.course)
+        self.assertEqual(
+            before,
+            {
+                "chapters": 5,
+                "contents": 5,
+                "revisions": 5,
+                "enrollments": 3,
+                "waitlist": 2,
+                "progress": 15,
+                "notifications": 15,
+                "activity": 5,
+            },
+        )
+        kept = self.rows(self.other)
+
+        self.client.force_authenticate(self.instructor)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/courses/{self.course.pk}/")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = DeletionJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, DeletionJob.DONE)
+        # The course row counts; chapter bodies (content database) don't.
+        self.assertEqual(
+            job.deleted_rows, sum(before.values()) - before["contents"] + 1
+        )
+        self.assertFalse(Course.all_objects.filter(pk=self.course.pk).exists())
+        # Only the other course's rows are left, on both databases.
+        self.assertEqual(self.rows(), kept)
+        self.assertEqual(User.objects.count(), len(self.students) + 1)
+
+
+@test_settings
+class ProgressBufferTests(APITestCase):
+    databases = {"default", "content"}
+
+    def setUp(self):
+        # Buffered, and flushed by the tests rather than a background thread.
+        tracking = {"FLUSH_INTERVAL": 60, "MAX_PENDING": 1000}
+        self.enterContext(override_settings(PROGRESS_TRACKING=tracking))
+        self.enterContext(mock.patch.object(ProgressBuffer, "_ensure_thread"))
+        self.buffer = ProgressBuffer()
+        instructor = create_user("instructor", role="instructor")
+        self.student = create_user("student")
+        self.course = Course.objects.create(
+            title="Course", description="Description", created_by=instructor
+        )
+        self.chapter = Chapter.objects.create(
+            course=self.course, title="Chapter", order=1
+        )
+        self.start = timezone.now()
+
+    def at(self, minutes):
+        return self.start + timedelta(minutes=minutes)
+
+    def record(self, minutes, completed=False, chapter=None):
+        chapter = chapter or self.chapter
+        record = (
+            self.buffer.record_completion if completed else self.buffer.record_view
+        )
+        record(self.student.pk, chapter.pk, chapter.course_id, at=self.at(minutes))
+
+    def test_updates_are_coalesced_into_one_row(self):
+        for minutes in (5, 1, 9):
+            self.record(minutes)
+        self.record(7, completed=True)
+        self.record(3, completed=True)
+        self.assertEqual(self.buffer.pending_count(), 1)
+
+        self.assertEqual(self.buffer.flush(), 1)
+
+        progress = ChapterProgress.objects.get()
+        self.assertEqual(progress.view_count, 3)
+        self.assertEqual(progress.first_opened_at, self.at(1))
+        self.assertEqual(progress.last_opened_at, self.at(9))
+        self.assertEqual(progress.completed_at, self.at(3))
+
+    def test_flush_merges_with_the_stored_row(self):
+        self.record(5)
+        self.record(6, completed=True)
+        self.buffer.flush()
+        self.record(2)
+        self.record(8)
+        self.record(4, completed=True)
+        self.buffer.flush()
+
+        progress = ChapterProgress.objects.get()
+        self.assertEqual(progress.view_count, 3)
+        self.assertEqual(progress.first_opened_at, self.at(2))
+        self.assertEqual(progress.last_opened_at, self.at(8))
+        self.assertEqual(progress.completed_at, self.at(4))
+
+    def test_entries_for_deleted_rows_are_dropped(self):
+        other = Course.objects.create(
+            title="Other", description="Description", created_by=self.student
+        )
+        hidden = Chapter.objects.create(course=other, title="Chapter", order=1)
+        deleted = Chapter.objects.create(course=self.course, title="Gone", order=2)
+        self.record(1)
+        self.record(1, chapter=hidden)
+        self.record(1, chapter=deleted)
+        Course.objects.filter(pk=other.pk).update(deleted_at=timezone.now())
+        deleted.delete()
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(
+            list(ChapterProgress.objects.values_list("chapter", flat=True)),
+            [self.chapter.pk],
+        )
+
+
+@test_settings
+class CourseEventStreamTests(APITestCase):
+    def setUp(self):
+        self.instructor = create_user("instructor", role="instructor")
+        self.student = create_user("student")
+        self.outsider = create_user("outsider")
+        self.course = Course.objects.create(
+            title="Course", description="Description", created_by=self.instructor
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+
+    def event(self, kind, pk, is_public):
+        chapter = Chapter(
+            pk=pk,
+            course=self.course,
+            title=f"Chapter {pk}",
+            order=pk,
+            is_public=is_public,
+        )
+        return chapter_event(kind, chapter)
+
+    def receive(self, user, *events):
+        """
+        Subscribe as ``user`` (anonymous when None), publish ``events`` and
+        return the first event delivered.
+        """
+        params = {"token": str(AccessToken.for_user(user))} if user else {}
+        request = RequestFactory().get(
+            f"/api/courses/{self.course.pk}/events/", params
+        )
+
+        async def run():
+            response = await course_events(request, self.course.pk)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            stream = response.streaming_content
+            try:
+                # The first chunk is sent once the stream has subscribed.
+                await asyncio.wait_for(anext(stream), 5)
+                for event in events:
+                    publish(course_channel(self.course.pk), event)
+                chunk = await asyncio.wait_for(anext(stream), 5)
+            finally:
+                await stream.aclose()
+            lines = dict(
+                line.split(": ", 1) for line in chunk.decode().strip().splitlines()
+            )
+            return lines["event"], json.loads(lines["data"])["chapter"]
+
+        return async_to_sync(run)()
+
+    def test_private_events_are_not_delivered_to_outsiders(self):
+        for user in (None, self.outsider):
+            with self.subTest(user=user):
+                kind, chapter = self.receive(
+                    user,
+                    self.event("updated", 1, is_public=False),
+                    self.event("updated", 2, is_public=True),
+                )
+                self.assertEqual((kind, chapter["id"]), ("chapter.updated", 2))
+
+    def test_unpublished_events_hide_chapter_details_from_outsiders(self):
+        for user in (None, self.outsider):
+            with self.subTest(user=user):
+                kind, chapter = self.receive(
+                    user, self.event("unpublished", 1, is_public=False)
+                )
+                self.assertEqual(kind, "chapter.unpublished")
+                self.assertEqual(chapter, {"id": 1})
+
+    def test_private_events_are_delivered_to_members(self):
+        for user in (self.instructor, self.student):
+            with self.subTest(user=user):
+                kind, chapter = self.receive(
+                    user,
+                    self.event("updated", 1, is_public=False),
+                    self.event("updated", 2, is_public=True),
+                )
+                self.assertEqual((kind, chapter["id"]), ("chapter.updated", 1))
+                self.assertEqual(chapter["title"], "Chapter 1")
+
+    def test_invalid_token_is_rejected(self):
+        request = RequestFactory().get(
+            f"/api/courses/{self.course.pk}/events/", {"token": "expired"}
+        )
+        response = async_to_sync(course_events)(request, self.course.pk)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
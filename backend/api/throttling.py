@@ -0,0 +1,176 @@
+import math
+import time
+
+from django.core.cache.backends.redis import RedisCacheClient
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# Takes a token from the bucket in KEYS[1] atomically. ARGV: capacity,
+# refill rate (tokens per second), now, TTL. Returns {allowed, tokens};
+# tokens as a string, since Redis truncates Lua numbers to integers.
+TAKE_TOKEN = """
+local capacity = tonumber(ARGV[1])
+local now = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "stamp")
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * tonumber(ARGV[2]))
+if tokens < 1 then
+    return {0, tostring(tokens)}
+end
+redis.call("HSET", KEYS[1], "tokens", tokens - 1, "stamp", now)
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return {1, tostring(tokens - 1)}
+"""
+
+# Without Redis, the bucket is updated under a cache.add() lock. A request
+# that can't get the lock within LOCK_WAIT seconds is rejected: the bucket
+# is that busy.
+LOCK_TIMEOUT = 1
+LOCK_WAIT = 0.05
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle with its state kept in the shared Django cache.
+
+    A rate of ``"N/period"`` is read as a bucket holding ``N`` tokens that
+    refills at ``N / period`` tokens per second. Clients can burst up to
+    ``N`` requests but cannot sustain more than the configured rate, and a
+    rejected client is told exactly how long until the next token arrives.
+
+    Taking a token is atomic, so concurrent requests can't all spend the
+    same one: a Lua script does it on Redis (``REDIS_URL``), a short
+    ``cache.add`` lock around the read and write on other caches.
+    """
+
+    def get_rate(self):
+        # Read the rate on every instantiation (rather than the class-level
+        # snapshot SimpleRateThrottle uses) so settings overrides apply.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        if isinstance(getattr(self.cache, "_cache", None), RedisCacheClient):
+            allowed, tokens = self._take_token_redis()
+        else:
+            allowed, tokens = self._take_token_locked()
+        if not allowed:
+            self.deficit = 1 - tokens
+        return allowed
+
+    def _refill(self, tokens, stamp):
+        refill = (self.now - stamp) * self.num_requests / self.duration
+        return min(self.num_requests, tokens + refill)
+
+    def _take_token_redis(self):
+        key = self.cache.make_and_validate_key(self.key)
+        client = self.cache._cache.get_client(key, write=True)
+        allowed, tokens = client.register_script(TAKE_TOKEN)(
+            keys=[key],
+            args=[
+                self.num_requests,
+                self.num_requests / self.duration,
+                self.now,
+                # A full bucket is indistinguishable from a missing key, so
+                # the entry only needs to live as long as a refill takes.
+                math.ceil(self.duration),
+            ],
+        )
+        return bool(allowed), float(tokens)
+
+    def _take_token_locked(self):
+        lock_key = f"{self.key}:lock"
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.cache.add(lock_key, True, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                # Report the bucket as last written, so the wait matches it.
+                state = self.cache.get(self.key, (self.num_requests, self.now))
+                return False, self._refill(*state)
+            time.sleep(0.001)
+        try:
+            state = self.cache.get(self.key, (self.num_requests, self.now))
+            tokens = self._refill(*state)
+            if tokens < 1:
+                return False, tokens
+            self.cache.set(self.key, (tokens - 1, self.now), self.duration)
+            return True, tokens - 1
+        finally:
+            self.cache.delete(lock_key)
+
+    def wait(self):
+        # A bucket that was too busy to lock may still hold tokens; retry
+        # it after the lock wait rather than being told zero.
+        return max(self.deficit * self.duration / self.num_requests, LOCK_WAIT)
+
+
+class RegisterRateThrottle(TokenBucketThrottle):
+    """
+    Throttle registrations per client IP (password hashing is CPU-bound).
+    """
+
+    scope = "register"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """
+    Throttle login attempts per client IP.
+    """
+
+    scope = "login"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class EnrollUserRateThrottle(TokenBucketThrottle):
+    """
+    Throttle enrollment attempts per authenticated user.
+    """
+
+    scope = "enroll_user"
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": request.user.pk}
+
+
+class AssetUploadRateThrottle(TokenBucketThrottle):
+    """
+    Throttle asset uploads per authenticated user.
+    """
+
+    scope = "asset_upload"
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": request.user.pk}
+
+
+class EnrollCourseRateThrottle(TokenBucketThrottle):
+    """
+    Throttle enrollment attempts per course, shared by all users.
+
+    This caps the INSERT rate a single popular course can generate during a
+    registration rush regardless of how many students are retrying.
+    """
+
+    scope = "enroll_course"
+
+    def get_cache_key(self, request, view):
+        course_id = view.kwargs.get("pk")
+        if course_id is None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": course_id}
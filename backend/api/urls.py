@@ -1,16 +1,24 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from .views import (  # defensive refresh view
+    AssetUploadView,
+    BatchView,
     ChapterViewSet,
     CourseViewSet,
+    DeletionJobView,
+    InstructorStatsView,
     LoginView,
     LogoutView,
     MyCoursesView,
+    NotificationListView,
+    NotificationReadView,
     ProfileView,
     RegisterView,
     SafeTokenRefreshView,
     UserDetailView,
+    asset_download,
+    course_events,
 )
 
 router = DefaultRouter()
@@ -28,6 +36,26 @@ urlpatterns = [
     path("users/<int:pk>/", UserDetailView.as_view(), name="user-detail"),
     # Student specific endpoints
     path("my-courses/", MyCoursesView.as_view(), name="my-courses"),
+    # Inbox
+    path("notifications/", NotificationListView.as_view(), name="notifications"),
+    path(
+        "notifications/read/",
+        NotificationReadView.as_view(),
+        name="notifications-read",
+    ),
+    # Progress of background deletions
+    path("deletions/<int:pk>/", DeletionJobView.as_view(), name="deletion-job"),
+    # Instructor specific endpoints
+    path("dashboard/stats/", InstructorStatsView.as_view(), name="instructor-stats"),
+    # Batch endpoint (several API calls in one request)
+    path("batch/", BatchView.as_view(), name="batch"),
+    # Chapter images: raw-body upload, content-addressed download
+    path("assets/", AssetUploadView.as_view(), name="asset-upload"),
+    re_path(
+        r"^assets/(?P<sha256>[0-9a-f]{64})/$", asset_download, name="asset-detail"
+    ),
+    # Server-Sent Events stream of chapter changes in a course
+    path("courses/<int:pk>/events/", course_events, name="course-events"),
     # Nested chapters route
     path(
         "courses/<int:course_id>/chapters/",
@@ -1,61 +1,216 @@
+import asyncio
+import copy
+import io
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.db import IntegrityError
-from django.shortcuts import get_object_or_404
+from django.db.models import DateTimeField, OuterRef, Subquery, Value
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .models import Chapter, Course, Enrollment, Profile
+from .activity import log_event
+from .assets import (
+    AssetError,
+    FileRange,
+    asset_path,
+    extract_inline_assets,
+    has_inline_assets,
+    parse_range,
+    store_stream,
+)
+from .batch import run_batch
+from .compression import compressed_response, etag_matches
+from .content import atomic_with_content, load_content
+from .deletion import delete_course
+from .events import (
+    broker,
+    chapter_event,
+    course_channel,
+    format_sse,
+    get_events_setting,
+    publish_on_commit,
+    subscribe,
+)
+from .jsonpatch import JsonPatchError, apply_patch, make_patch
+from .fieldsets import subset
+from .idempotency import idempotent
+from .loaders import get_loaders
+from .mixins import FieldsetMixin, ReplicaReadMixin, RowListMixin
+from .models import (
+    Asset,
+    Chapter,
+    ChapterProgress,
+    ChapterRevision,
+    Course,
+    DailyActivity,
+    DeletionJob,
+    Enrollment,
+    InstructorStats,
+    Notification,
+    Profile,
+    WaitlistEntry,
+)
+from .navigation import (
+    chapter_data,
+    chapter_etag,
+    chapter_neighbors,
+    is_prefetch,
+    navigation_links,
+    warm_next,
+)
+from .parsers import FastJSONParser, JSONPatchParser
 from .permissions import (
     CanEnroll,
+    IsCourseOwner,
     IsEnrolledOrInstructor,
     IsInstructor,
     IsOwnerOrReadOnly,
     IsStudent,
 )
+from .progress import progress_buffer
+from .ranking import catalog_ordering
+from .revisions import RevisionConflict, reconstruct, record_revision
+from .stats import refresh_instructor_stats
+from .row_serializers import (
+    ChapterListRowSerializer,
+    CourseListRowSerializer,
+    MyCourseRowSerializer,
+    count_of,
+    format_datetime,
+)
+from .seats import (
+    EnrollmentError,
+    enroll_student,
+    unenroll_student,
+    waitlist_position,
+)
 from .serializers import (
+    BatchSerializer,
+    AssetSerializer,
+    ChapterContentPatchSerializer,
     ChapterListSerializer,
     ChapterSerializer,
     CourseListSerializer,
     CourseSerializer,
+    DeletionJobSerializer,
     EnrollmentSerializer,
+    InstructorStatsSerializer,
+    MyCourseSerializer,
+    NotificationSerializer,
     ProfileSerializer,
     PublicUserSerializer,
     RegisterSerializer,
     UserSerializer,
     UserUpdateSerializer,
 )
+from .snapshot import export_on_commit
+from .throttling import (
+    AssetUploadRateThrottle,
+    EnrollCourseRateThrottle,
+    EnrollUserRateThrottle,
+    LoginRateThrottle,
+    RegisterRateThrottle,
+)
+
+
+def visible_chapters(course, user, is_enrolled=None):
+    """
+    Chapters of ``course`` that ``user`` may see, in reading order.
+
+    The course instructor and enrolled students see every chapter, everyone
+    else only public ones. Pass ``is_enrolled`` when it is already known to
+    skip the membership query.
+    """
+    queryset = Chapter.objects.filter(course=course).order_by("order")
+
+    if user.is_authenticated and course.created_by_id == user.id:
+        return queryset
+
+    if is_enrolled is None:
+        is_enrolled = (
+            user.is_authenticated and course.students.filter(id=user.id).exists()
+        )
+
+    if is_enrolled:
+        return queryset
+    return queryset.filter(is_public=True)
+
+
+def if_match_revision(request):
+    """
+    The chapter revision in the ``If-Match`` header, ``None`` without one.
+    Raises ``ValueError`` if the header does not carry a revision.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return None
+    return int(header.strip('W/" '))
+
+
+def registration_data(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        "user": UserSerializer(user).data,
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }
+
+
+def _store_registration(response):
+    # Keep the user ID, not the tokens, in the idempotency cache.
+    if response.status_code == status.HTTP_201_CREATED:
+        return {"user_id": response.data["user"]["id"]}
+    return response.data
+
+
+def _replay_registration(stored):
+    if "user_id" not in stored:
+        return stored
+    user = User.objects.filter(pk=stored["user_id"], is_active=True).first()
+    if user is None:
+        raise NotFound("The user registered with this Idempotency-Key is gone.")
+    return registration_data(user)
 
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterRateThrottle]
 
+    @idempotent(store_data=_store_registration, replay_data=_replay_registration)
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
-            user_data = UserSerializer(user).data
-
-            return Response(
-                {
-                    "user": user_data,
-                    "access": str(refresh.access_token),
-                    "refresh": str(refresh),
-                },
-                status=status.HTTP_201_CREATED,
-            )
+            return Response(registration_data(user), status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class LoginView(TokenObtainPairView):
+    throttle_classes = [LoginRateThrottle]
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
 
@@ -72,6 +227,7 @@ class LoginView(TokenObtainPairView):
                     user = User.objects.get(id=user_id)
                     user_data = UserSerializer(user).data
                     response.data["user"] = user_data
+                    log_event(DailyActivity.LOGIN, user)
             except Exception:
                 # Fall back gracefully if token decoding fails
                 pass
@@ -92,8 +248,9 @@ class LogoutView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ReplicaReadMixin, RowListMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
+    row_serializer_class = CourseListRowSerializer
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -111,8 +268,15 @@ class CourseViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), CanEnroll()]
         elif self.action == "unenroll":
             return [IsAuthenticated()]
+        elif self.action == "analytics":
+            return [IsAuthenticated(), IsCourseOwner()]
         return [IsAuthenticated()]
 
+    def get_throttles(self):
+        if self.action == "enroll":
+            return [EnrollUserRateThrottle(), EnrollCourseRateThrottle()]
+        return super().get_throttles()
+
     def get_queryset(self):
         queryset = Course.objects.all()
         instructor_id = self.request.query_params.get("instructor")
@@ -120,30 +284,185 @@ class CourseViewSet(viewsets.ModelViewSet):
         if instructor_id:
             queryset = queryset.filter(created_by_id=instructor_id)
 
-        return queryset.order_by("-created_at")
+        if self.action == "retrieve":
+            # Load everything CourseSerializer (and ?include=) needs with the
+            # course itself instead of one query per method field, and only
+            # what the ?fields= it selects read.
+            queryset = self.get_serializer().prune_queryset(queryset, "created_by")
+            if self.wants("student_count"):
+                queryset = queryset.annotate(
+                    student_count=count_of(Enrollment, "course")
+                )
+
+            user = self.request.user
+            if self.wants("is_enrolled") or self.get_includes():
+                if user.is_authenticated:
+                    enrolled_at = Subquery(
+                        Enrollment.objects.filter(course=OuterRef("pk"), student=user)
+                        .values("enrolled_at")[:1]
+                    )
+                else:
+                    enrolled_at = Value(None, output_field=DateTimeField())
+                queryset = queryset.annotate(enrolled_at=enrolled_at)
+
+        # ?ordering=popular|trending read precomputed, indexed columns.
+        ordering = catalog_ordering(self.request.query_params.get("ordering"))
+        return queryset.order_by(*ordering)
+
+    def get_object(self):
+        course = super().get_object()
+        # The owner is usually the requesting user, loaded already.
+        get_loaders(self.request).attach([course], "created_by", fetch=False)
+        return course
+
+    def get_includes(self):
+        return {
+            name.strip()
+            for name in self.request.query_params.get("include", "").split(",")
+            if name.strip()
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Return the course, optionally with ``?include=chapters,enrollment``.
+
+        ``chapters`` embeds the chapter outline visible to the user and
+        ``enrollment`` the user's enrollment state, so the course page needs
+        a single request and a fixed number of queries. ``?fields=`` selects
+        inside them too (``chapters.title``).
+        """
+        course = self.get_object()
+        data = self.get_serializer(course).data
+
+        include = self.get_includes()
+        is_enrolled = getattr(course, "enrolled_at", None) is not None
+        fields, _ = self.get_fieldsets()
+
+        if "chapters" in include:
+            row_serializer = ChapterListRowSerializer(subset(fields, "chapters"))
+            chapters = visible_chapters(course, request.user, is_enrolled=is_enrolled)
+            data["chapters"] = row_serializer.serialize(row_serializer.values(chapters))
+
+        if "enrollment" in include:
+            position = None
+            if not is_enrolled and request.user.is_authenticated:
+                entry = WaitlistEntry.objects.filter(
+                    course=course, student=request.user
+                ).first()
+                if entry is not None:
+                    position = waitlist_position(entry)
+            data["enrollment"] = {
+                "is_enrolled": is_enrolled,
+                "enrolled_at": format_datetime(course.enrolled_at),
+                "waitlist_position": position,
+            }
+
+        return Response(data)
+
+    @action(detail=True)
+    def analytics(self, request, pk=None):
+        """
+        Daily chapter views and enrollment changes for the last ``?days=``
+        days (default 30), read from the ``DailyActivity`` rollups only.
+        Today's numbers appear once ``rollup_activity`` has run.
+        """
+        course = self.get_object()
+        try:
+            days = min(max(int(request.query_params.get("days", 30)), 1), 365)
+        except ValueError:
+            days = 30
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+
+        rows = DailyActivity.objects.filter(
+            course=course, date__range=(start, end)
+        ).values_list("date", "kind", "chapter_id", "count")
+
+        kinds = [
+            DailyActivity.CHAPTER_VIEW,
+            DailyActivity.ENROLL,
+            DailyActivity.UNENROLL,
+        ]
+        totals = dict.fromkeys(kinds, 0)
+        daily = {}
+        chapters = {}
+        for day, kind, chapter_id, count in rows:
+            if kind not in totals:
+                continue
+            totals[kind] += count
+            daily.setdefault(day, dict.fromkeys(kinds, 0))[kind] += count
+            if chapter_id is not None and kind == DailyActivity.CHAPTER_VIEW:
+                views = chapters.setdefault(chapter_id, {})
+                views[day] = views.get(day, 0) + count
+
+        titles = dict(
+            Chapter.objects.filter(course=course).values_list("id", "title")
+        )
+        return Response(
+            {
+                "course": course.pk,
+                "start": start,
+                "end": end,
+                "totals": totals,
+                "daily": [
+                    {"date": day, **counts} for day, counts in sorted(daily.items())
+                ],
+                "chapters": [
+                    {
+                        "id": chapter_id,
+                        "title": titles.get(chapter_id),
+                        "views": sum(views.values()),
+                        "daily": [
+                            {"date": day, "views": count}
+                            for day, count in sorted(views.items())
+                        ],
+                    }
+                    for chapter_id, views in sorted(
+                        chapters.items(), key=lambda item: -sum(item[1].values())
+                    )
+                ],
+            }
+        )
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        Hide the course at once and delete its chapters, enrollments and
+        other rows in the background (``api/deletion.py``). Responds with
+        the deletion job, which ``/api/deletions/<id>/`` reports on.
+        """
+        job = delete_course(self.get_object(), requested_by=request.user)
+        return Response(
+            DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
 
     @action(methods=["post"], detail=True)
+    @idempotent
     def enroll(self, request, pk=None):
         course = self.get_object()
         # Ensure object-level permissions (CanEnroll) are checked
         self.check_object_permissions(request, course)
 
         try:
-            enrollment = Enrollment.objects.create(student=request.user, course=course)
-        except IntegrityError:
+            enrollment, entry = enroll_student(course, request.user)
+        except EnrollmentError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if entry is not None:
+            # The course is full: the seat is offered when one frees up.
             return Response(
-                {"error": "You are already enrolled in this course."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"waitlisted": True, "position": waitlist_position(entry)},
+                status=status.HTTP_202_ACCEPTED,
             )
 
+        log_event(DailyActivity.ENROLL, request.user, course_id=course.pk)
         serializer = EnrollmentSerializer(enrollment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -152,20 +471,21 @@ class CourseViewSet(viewsets.ModelViewSet):
         course = self.get_object()
 
         try:
-            enrollment = Enrollment.objects.get(student=request.user, course=course)
-            enrollment.delete()
-            return Response(
-                {"message": "Unenrolled successfully"}, status=status.HTTP_200_OK
-            )
-        except Enrollment.DoesNotExist:
-            return Response(
-                {"error": "You are not enrolled in this course"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            enrolled = unenroll_student(course, request.user)
+        except EnrollmentError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not enrolled:
+            return Response({"message": "Left the waitlist"}, status=status.HTTP_200_OK)
+        log_event(DailyActivity.UNENROLL, request.user, course_id=course.pk)
+        return Response(
+            {"message": "Unenrolled successfully"}, status=status.HTTP_200_OK
+        )
 
 
-class ChapterViewSet(viewsets.ModelViewSet):
+class ChapterViewSet(ReplicaReadMixin, RowListMixin, viewsets.ModelViewSet):
     queryset = Chapter.objects.all()
+    row_serializer_class = ChapterListRowSerializer
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -177,13 +497,35 @@ class ChapterViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         elif self.action == "retrieve":
             return [IsEnrolledOrInstructor()]
+        elif self.action == "complete":
+            return [IsAuthenticated(), IsEnrolledOrInstructor()]
         elif self.action == "create":
             return [IsInstructor()]
-        elif self.action in ["update", "partial_update", "destroy"]:
+        elif self.action in ["update", "partial_update", "destroy", "patch_content"]:
             return [IsOwnerOrReadOnly()]
+        elif self.action in ["revisions", "revision_detail", "restore_revision"]:
+            return [IsAuthenticated(), IsCourseOwner()]
         return [IsAuthenticated()]
 
     def get_queryset(self):
+        # Bodies are read from the content database (Chapter.content); the
+        # legacy column is only loaded for chapters not moved there yet.
+        queryset = (
+            self.get_visible_queryset()
+            .filter(course__deleted_at__isnull=True)
+            .defer("legacy_content")
+        )
+        if self.action == "retrieve":
+            # Course is needed for permissions, navigation and course_title,
+            # plus whatever relations ?expand= adds.
+            _, relations = self.get_serializer().query_lookups()
+            queryset = queryset.select_related("course", *relations)
+        elif self.detail:
+            # Object permissions check the course owner.
+            queryset = queryset.select_related("course")
+        return queryset
+
+    def get_visible_queryset(self):
         # Support both query params and URL kwargs for course_id
         course_id = self.request.query_params.get("course_id") or self.kwargs.get(
             "course_id"
@@ -194,27 +536,25 @@ class ChapterViewSet(viewsets.ModelViewSet):
 
             # Filter chapters based on user permissions
             if self.action == "list":
-                try:
-                    course = Course.objects.get(id=course_id)
-                except Course.DoesNotExist:
+                course = get_loaders(self.request).courses.load(course_id)
+                if course is None:
                     # Return empty queryset if course doesn't exist
                     return Chapter.objects.none()
 
-                user = self.request.user
+                return visible_chapters(course, self.request.user)
 
-                # Show all chapters to instructor
-                if user.is_authenticated and course.created_by == user:
-                    return queryset.order_by("order")
+            return queryset.order_by("order")
 
-                # Show all chapters if user is enrolled, otherwise only public ones
-                if user.is_authenticated and user in course.students.all():
-                    return queryset.order_by("order")
-                else:
-                    return queryset.filter(is_public=True).order_by("order")
+        # Detail actions are guarded by object permissions
+        # (IsEnrolledOrInstructor / IsOwnerOrReadOnly), so private chapters
+        # stay reachable for the instructor and enrolled students.
+        if self.detail:
+            return Chapter.objects.order_by("order")
 
         # If no course_id provided, only return public chapters to avoid leaking private titles
         return Chapter.objects.filter(is_public=True).order_by("order")
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         # Only allow creation via nested route that provides course_id
         course_id = self.kwargs.get("course_id")
@@ -226,10 +566,12 @@ class ChapterViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_405_METHOD_NOT_ALLOWED,
             )
 
-        course = get_object_or_404(Course, id=course_id)
+        course = get_loaders(request).courses.load(course_id)
+        if course is None:
+            raise Http404
 
         # Ensure the requesting user is the course owner
-        if course.created_by != request.user:
+        if course.created_by_id != request.user.id:
             raise PermissionDenied("You can only create chapters for your own courses.")
 
         serializer = self.get_serializer(data=request.data)
@@ -253,22 +595,318 @@ class ChapterViewSet(viewsets.ModelViewSet):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["base_revision"] = getattr(self, "base_revision", None)
+        return context
+
+    def update(self, request, *args, **kwargs):
+        """
+        PUT/PATCH of the chapter. An ``If-Match`` revision, when sent, must
+        be the current one; either way an edit that races another save gets
+        409 with the current revision instead of overwriting it.
+        """
+        try:
+            self.base_revision = if_match_revision(request)
+        except ValueError:
+            return self._precondition_required()
+        try:
+            return super().update(request, *args, **kwargs)
+        except RevisionConflict as exc:
+            return self._revision_conflict(exc.revision)
+
     def retrieve(self, request, *args, **kwargs):
-        """Override retrieve to enforce object-level permissions for chapters."""
+        """
+        Return the chapter with its previous/next chapter for navigation.
+
+        JSON responses carry an ETag, honour ``If-None-Match`` and are
+        compressed per ``Accept-Encoding`` from a per-version cache.
+        ``?fields=`` skips the content and neighbors when they are not
+        selected. Object permissions are enforced by ``get_object``.
+        """
+        chapter = self.get_object()
+        # Embed the body as raw JSON text when the renderer can, skipping
+        # the decode/re-encode of large documents.
+        renderer = getattr(request, "accepted_renderer", None)
+        raw = getattr(renderer, "raw_json_passthrough", False)
+        fields, expand = self.get_fieldsets()
+        prefetch = is_prefetch(request)
+        previous = next_ = None
+        if self.wants("previous") or self.wants("next"):
+            previous, next_ = chapter_neighbors(chapter, request.user)
+            if not prefetch:
+                warm_next(chapter, next_, raw)
+
+        if not prefetch:
+            self._track_progress(chapter, completed=False)
+            log_event(
+                DailyActivity.CHAPTER_VIEW,
+                request.user,
+                course_id=chapter.course_id,
+                chapter_id=chapter.pk,
+            )
+        headers = {}
+        links = navigation_links(previous, next_)
+        if links:
+            headers["Link"] = links
+
+        def get_data():
+            if fields is None and expand is None:
+                data = chapter_data(chapter, raw)
+            else:
+                if self.wants("content"):
+                    load_content([chapter], raw=raw)
+                data = self.get_serializer(chapter).data
+            data = {**data}
+            for name, neighbor in (("previous", previous), ("next", next_)):
+                if self.wants(name):
+                    data[name] = neighbor
+            return data
+
+        # Compact JSON responses are versioned by an ETag known before
+        # rendering, so unchanged chapters cost a 304 or a cached,
+        # already-compressed body (api/compression.py). Expanded relations
+        # carry data outside the chapter's version, so they are not cached.
+        media_type = getattr(request, "accepted_media_type", None)
+        if (
+            expand is not None
+            or not isinstance(renderer, JSONRenderer)
+            or renderer.get_indent(media_type, self.get_renderer_context())
+        ):
+            return Response(get_data(), headers=headers)
+
+        etag = chapter_etag(
+            chapter, previous, next_, raw, request.query_params.get("fields", "")
+        )
+        headers["ETag"] = etag
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = compressed_response(
+                request,
+                etag,
+                renderer.media_type,
+                lambda: renderer.render(
+                    get_data(), media_type, self.get_renderer_context()
+                ),
+            )
+        if response is None:
+            response = Response(get_data(), headers=headers)
+        else:
+            for name, value in headers.items():
+                response[name] = value
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    @action(methods=["post"], detail=True)
+    def complete(self, request, pk=None):
+        """
+        Mark the chapter as completed by the current user.
+        """
+        chapter = self.get_object()
+        self._track_progress(chapter, completed=True)
+        return Response({"chapter": chapter.pk, "completed": True})
+
+    def _track_progress(self, chapter, completed):
+        # Buffered (api/progress.py): reads don't pay for a write each.
+        user = self.request.user
+        if not user.is_authenticated or chapter.course.created_by_id == user.id:
+            return
+        record = (
+            progress_buffer.record_completion
+            if completed
+            else progress_buffer.record_view
+        )
+        record(user.id, chapter.pk, chapter.course_id)
+
+    @action(
+        methods=["patch"],
+        detail=True,
+        url_path="content",
+        parser_classes=[FastJSONParser, JSONPatchParser],
+    )
+    def patch_content(self, request, pk=None):
+        """
+        Apply an RFC 6902 JSON Patch to the chapter content.
+
+        Send either ``application/json-patch+json`` with the base revision in
+        ``If-Match``, or ``{"base_revision": n, "patch": [...]}``. The patch
+        is only stored if the chapter is still at the base revision;
+        otherwise 409 is returned with the current revision.
+        """
         chapter = self.get_object()
-        self.check_object_permissions(request, chapter)
-        serializer = self.get_serializer(chapter)
+
+        if isinstance(request.data, list):
+            operations = request.data
+            try:
+                base_revision = if_match_revision(request)
+            except ValueError:
+                base_revision = None
+            if base_revision is None:
+                return self._precondition_required()
+        else:
+            serializer = ChapterContentPatchSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            operations = serializer.validated_data["patch"]
+            base_revision = serializer.validated_data["base_revision"]
+
+        if chapter.revision != base_revision:
+            return self._revision_conflict(chapter.revision)
+
+        # apply_patch works in place; the previous body is kept for the
+        # history.
+        previous_content = chapter.content
+        try:
+            content = apply_patch(copy.deepcopy(previous_content), operations)
+        except JsonPatchError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not make_patch(previous_content, content):
+            return Response(
+                {
+                    "id": chapter.pk,
+                    "revision": chapter.revision,
+                    "updated_at": format_datetime(chapter.updated_at),
+                }
+            )
+        # As on PUT/PATCH, pasted base64 images go to the asset store. The
+        # stored body then differs from the client's, so it is returned.
+        extracted = has_inline_assets(content)
+        if extracted:
+            content, _ = extract_inline_assets(content, user=request.user)
+
+        # Conditional write: only succeeds if nobody saved since we read.
+        updated_at = timezone.now()
+        with atomic_with_content():
+            updated = Chapter.objects.filter(
+                pk=chapter.pk, revision=base_revision
+            ).update(revision=base_revision + 1, updated_at=updated_at)
+            if updated:
+                chapter.content = content
+                chapter.revision = base_revision + 1
+                chapter.save_content()
+                # The client's operations are exactly the delta to store.
+                record_revision(
+                    chapter,
+                    previous_content=previous_content,
+                    delta=None if extracted else operations,
+                    user=request.user,
+                )
+                # .update() bypasses post_save, so notify streams and
+                # refresh the static catalog here.
+                publish_on_commit(
+                    course_channel(chapter.course_id), chapter_event("updated", chapter)
+                )
+                export_on_commit()
+        if not updated:
+            current = Chapter.objects.filter(pk=chapter.pk).values_list(
+                "revision", flat=True
+            )
+            return self._revision_conflict(current.first())
+
+        data = {
+            "id": chapter.pk,
+            "revision": base_revision + 1,
+            "updated_at": format_datetime(updated_at),
+        }
+        if extracted:
+            data["content"] = content
+        return Response(data)
+
+    @action(detail=True, url_path="revisions")
+    def revisions(self, request, pk=None):
+        """
+        List the chapter's stored revisions, newest first, without their
+        content.
+        """
+        chapter = self.get_object()
+        queryset = ChapterRevision.objects.filter(chapter=chapter).values(
+            "revision", "kind", "size", "created_at", "created_by__username"
+        )
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        data = [
+            {
+                "revision": row["revision"],
+                "kind": row["kind"],
+                "size": row["size"],
+                "created_by": row["created_by__username"],
+                "created_at": format_datetime(row["created_at"]),
+            }
+            for row in rows
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=True, url_path=r"revisions/(?P<revision>\d+)")
+    def revision_detail(self, request, pk=None, revision=None):
+        """
+        Return the chapter content as of ``revision``.
+        """
+        chapter = self.get_object()
+        try:
+            content = reconstruct(chapter, int(revision))
+        except ChapterRevision.DoesNotExist:
+            return Response(
+                {"error": "Revision not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            {"id": chapter.pk, "revision": int(revision), "content": content}
+        )
+
+    @action(
+        methods=["post"], detail=True, url_path=r"revisions/(?P<revision>\d+)/restore"
+    )
+    def restore_revision(self, request, pk=None, revision=None):
+        """
+        Save the content of ``revision`` as a new revision of the chapter.
+        """
+        chapter = self.get_object()
+        try:
+            content = reconstruct(chapter, int(revision))
+        except ChapterRevision.DoesNotExist:
+            return Response(
+                {"error": "Revision not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = ChapterSerializer(
+            chapter,
+            data={"content": content},
+            partial=True,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save()
+        except RevisionConflict as exc:
+            return self._revision_conflict(exc.revision)
         return Response(serializer.data)
 
+    def _precondition_required(self):
+        return Response(
+            {"error": "If-Match must carry the base revision."},
+            status=status.HTTP_428_PRECONDITION_REQUIRED,
+        )
+
+    def _revision_conflict(self, revision):
+        return Response(
+            {
+                "error": "Chapter was modified since the base revision.",
+                "revision": revision,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
     def perform_create(self, serializer):
         # Try to obtain course either from validated_data (if provided) or from URL kwargs
         course = serializer.validated_data.get("course")
         if not course:
             course_id = self.kwargs.get("course_id")
             if course_id:
-                course = get_object_or_404(Course, id=course_id)
+                course = get_loaders(self.request).courses.load(course_id)
+                if course is None:
+                    raise Http404
 
-        if course and course.created_by != self.request.user:
+        if course and course.created_by_id != self.request.user.id:
             raise PermissionDenied("You can only create chapters for your own courses.")
 
         if course:
@@ -278,7 +916,7 @@ class ChapterViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ReplicaReadMixin, FieldsetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserUpdateSerializer
     permission_classes = [IsAuthenticated]
 
@@ -286,20 +924,113 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
-class UserDetailView(generics.RetrieveAPIView):
-    queryset = User.objects.all()
+class UserDetailView(ReplicaReadMixin, FieldsetMixin, generics.RetrieveAPIView):
     serializer_class = PublicUserSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        return self.get_serializer().prune_queryset(User.objects.all())
+
 
-class MyCoursesView(generics.ListAPIView):
-    serializer_class = CourseListSerializer
+class MyCoursesView(ReplicaReadMixin, RowListMixin, generics.ListAPIView):
+    serializer_class = MyCourseSerializer
+    row_serializer_class = MyCourseRowSerializer
     permission_classes = [IsAuthenticated, IsStudent]
 
     def get_queryset(self):
-        return Course.objects.filter(students=self.request.user).order_by(
-            "-enrollments__enrolled_at"
+        user = self.request.user
+        return (
+            Course.objects.filter(students=user)
+            .annotate(
+                progress_opened=count_of(ChapterProgress, "course", student=user),
+                progress_completed=count_of(
+                    ChapterProgress,
+                    "course",
+                    student=user,
+                    completed_at__isnull=False,
+                ),
+            )
+            .order_by("-enrollments__enrolled_at")
+        )
+
+
+class DeletionJobView(generics.RetrieveAPIView):
+    """
+    Progress of a deletion the current user requested.
+    """
+
+    serializer_class = DeletionJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return DeletionJob.objects.filter(requested_by=self.request.user)
+
+
+class InboxPagination(CursorPagination):
+    # Keyset pagination over the (recipient, -id) index: every page costs
+    # the same however deep the inbox is, and no COUNT(*) is run.
+    ordering = "-id"
+    page_size = 20
+
+
+class NotificationListView(ReplicaReadMixin, FieldsetMixin, generics.ListAPIView):
+    """
+    The current user's notifications, newest first (``?unread=true`` for
+    unread ones only).
+    """
+
+    serializer_class = NotificationSerializer
+    pagination_class = InboxPagination
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(
+            recipient=self.request.user, course__deleted_at__isnull=True
         )
+        if self.request.query_params.get("unread") in ("1", "true"):
+            queryset = queryset.filter(read_at__isnull=True)
+        return self.get_serializer().prune_queryset(queryset)
+
+
+class NotificationReadView(APIView):
+    """
+    Mark the notifications listed in ``ids`` as read, or all of them when
+    ``ids`` is omitted.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        queryset = Notification.objects.filter(
+            recipient=request.user, read_at__isnull=True
+        )
+        if ids is not None:
+            if not isinstance(ids, list) or not all(
+                isinstance(pk, int) for pk in ids
+            ):
+                return Response(
+                    {"error": "ids must be a list of notification IDs."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            queryset = queryset.filter(pk__in=ids)
+        updated = queryset.update(read_at=timezone.now())
+        return Response({"updated": updated})
+
+
+class InstructorStatsView(ReplicaReadMixin, FieldsetMixin, generics.RetrieveAPIView):
+    """
+    Dashboard totals for the current instructor: one precomputed row,
+    maintained incrementally (see ``api/stats.py``).
+    """
+
+    serializer_class = InstructorStatsSerializer
+    permission_classes = [IsAuthenticated, IsInstructor]
+
+    def get_object(self):
+        user = self.request.user
+        stats = InstructorStats.objects.filter(instructor=user).first()
+        return stats or refresh_instructor_stats(user.id)
 
 
 class SafeTokenRefreshView(TokenRefreshView):
@@ -333,3 +1064,225 @@ class SafeTokenRefreshView(TokenRefreshView):
 
             # Unknown error: re-raise to avoid hiding unexpected failures
             raise
+
+
+class BatchView(APIView):
+    """
+    Execute several API calls in one HTTP request.
+
+    Accepts ``{"requests": [{"method", "path", "body"}, ...], "parallel":
+    bool}`` (or just the list) and returns one ``{"status", "headers",
+    "body"}`` result per entry, in order. The caller is authenticated once
+    and the same user object (with its profile) is shared by every
+    sub-request.
+    """
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data
+        if isinstance(data, list):
+            data = {"requests": data}
+
+        serializer = BatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        if request.user.is_authenticated:
+            # Cache the profile on the shared user before fanning out.
+            try:
+                request.user.profile
+            except Profile.DoesNotExist:
+                pass
+
+        results = run_batch(
+            request,
+            serializer.validated_data["requests"],
+            parallel=serializer.validated_data["parallel"],
+        )
+        return Response(results)
+
+
+class AssetUploadView(APIView):
+    """
+    Upload a chapter image as the raw request body (``Content-Type`` and
+    ``Content-Length`` required), e.g. ``curl --data-binary @figure.png``.
+
+    The body is streamed to disk and stored under its SHA-256 digest;
+    uploading the same file again returns the existing asset (200 instead
+    of 201). Reference it from chapter content by ``sha256``/``url``.
+    """
+
+    permission_classes = [IsInstructor]
+    throttle_classes = [AssetUploadRateThrottle]
+
+    def post(self, request):
+        try:
+            content_length = int(request.headers.get("Content-Length", ""))
+        except ValueError:
+            return Response(
+                {"error": "Content-Length is required."},
+                status=status.HTTP_411_LENGTH_REQUIRED,
+            )
+
+        # Read the body stream directly; request.data would buffer it.
+        try:
+            asset, created = store_stream(
+                request.stream or io.BytesIO(),
+                user=request.user,
+                content_length=content_length,
+            )
+        except AssetError as exc:
+            return Response({"error": str(exc)}, status=exc.status)
+
+        return Response(
+            AssetSerializer(asset).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+def asset_download(request, sha256):
+    """
+    Serve a stored asset. Contents never change for a digest, so responses
+    are cacheable forever; single ``Range`` requests get a 206.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"detail": "Method not allowed."}, status=405)
+
+    content_type = (
+        Asset.objects.filter(pk=sha256).values_list("content_type", flat=True).first()
+    )
+    path = asset_path(sha256)
+    if content_type is None or not path.exists():
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    etag = f'"{sha256}"'
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+    }
+    if etag in request.headers.get("If-None-Match", ""):
+        return HttpResponseNotModified(headers=headers)
+
+    size = path.stat().st_size
+    byte_range = None
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except AssetError as exc:
+            return HttpResponse(
+                status=exc.status,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    file = open(path, "rb")
+    if byte_range is None:
+        # FileResponse goes through wsgi.file_wrapper (sendfile where
+        # the server supports it).
+        return FileResponse(file, content_type=content_type, headers=headers)
+
+    start, end = byte_range
+    file.seek(start)
+    response = FileResponse(
+        FileRange(file, end - start + 1),
+        status=206,
+        content_type=content_type,
+        headers=headers,
+    )
+    response["Content-Length"] = end - start + 1
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def _authorize_event_stream(request, course_id):
+    """
+    Return ``(error_response, can_see_private)`` for an event stream.
+
+    ``EventSource`` cannot set headers, so the access token may also be
+    passed as ``?token=``. Anonymous clients get public chapter events only.
+    """
+    header = request.headers.get("Authorization", "")
+    raw_token = header[7:] if header.startswith("Bearer ") else None
+    raw_token = raw_token or request.GET.get("token")
+
+    user = None
+    if raw_token:
+        authentication = JWTAuthentication()
+        try:
+            user = authentication.get_user(
+                authentication.get_validated_token(raw_token)
+            )
+        except (InvalidToken, TokenError):
+            return JsonResponse({"detail": "Invalid token."}, status=401), False
+
+    owner_id = (
+        Course.objects.filter(pk=course_id)
+        .values_list("created_by_id", flat=True)
+        .first()
+    )
+    if owner_id is None:
+        return JsonResponse({"detail": "Not found."}, status=404), False
+    if user is None:
+        return None, False
+    if owner_id == user.id:
+        return None, True
+    return None, Enrollment.objects.filter(course_id=course_id, student=user).exists()
+
+
+async def course_events(request, pk):
+    """
+    Server-Sent Events stream of chapter changes in a course.
+
+    Each event is ``event: chapter.<kind>`` (created, updated, reordered,
+    published, unpublished, deleted) with the compact chapter as JSON data.
+    A ``resync`` event means events were dropped and the client should
+    refetch. Must be served by an ASGI server to hold connections open.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Method not allowed."}, status=405)
+
+    if broker.subscriber_count() >= get_events_setting("MAX_CONNECTIONS", 5000):
+        response = JsonResponse({"detail": "Too many open event streams."}, status=503)
+        response["Retry-After"] = "5"
+        return response
+
+    error, can_see_private = await sync_to_async(_authorize_event_stream)(request, pk)
+    if error is not None:
+        return error
+
+    heartbeat = get_events_setting("HEARTBEAT", 15)
+
+    async def stream():
+        # Subscribe here rather than in the view: the body is iterated on the
+        # server's event loop, which is the loop deliveries are scheduled on.
+        subscription = subscribe(course_channel(pk))
+        try:
+            yield format_sse(retry=5000, comment="connected")
+            while True:
+                try:
+                    event = await subscription.get(timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield format_sse(comment="keep-alive")
+                    continue
+
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield format_sse(event="resync", data={"course": pk})
+                    continue
+
+                chapter = event["chapter"]
+                # Events without is_public are treated as private.
+                if not can_see_private and not chapter.get("is_public", False):
+                    if event["type"] != "chapter.unpublished":
+                        continue
+                    # Tell the client to drop it, without the private details.
+                    event = {**event, "chapter": {"id": chapter["id"]}}
+                yield format_sse(event=event["type"], data=event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -14,6 +14,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -58,6 +59,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    # Sheds load before any session/auth work is done for the request.
+    "api.middleware.AdmissionControlMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -90,13 +93,69 @@ WSGI_APPLICATION = "lms_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite connections are tuned on connect (WAL, synchronous=NORMAL, mmap,
+# busy_timeout) by api/db.py, and kept open for CONN_MAX_AGE seconds.
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        # atomic() takes the write lock up front, so a transaction that reads
+        # before it writes (unenroll, waitlist promotion) waits out
+        # busy_timeout behind other writers instead of failing with
+        # "database is locked" when it upgrades its lock. Needs Django 5.1+.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
     }
 }
 
+# Chapter bodies (api.ChapterContent) live in their own SQLite file so the
+# metadata database stays small and cache-resident. See api/routers.py.
+DATABASES["content"] = {
+    **DATABASES["default"],
+    "NAME": os.getenv("CONTENT_DATABASE_PATH") or BASE_DIR / "content.sqlite3",
+}
+
+# Optional read replica for read-only requests (see api/routers.py). In tests
+# it mirrors the default database, so tests that read through it must use
+# TransactionTestCase to see committed rows.
+DATABASE_REPLICA_PATH = os.getenv("DATABASE_REPLICA_PATH")
+
+if DATABASE_REPLICA_PATH:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": DATABASE_REPLICA_PATH,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["api.routers.ContentRouter", "api.routers.ReadReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they write.
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Throttle state lives here, so point REDIS_URL at a shared Redis instance
+# when running more than one worker process.
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,8 +207,145 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_THROTTLE_RATES": {
+        "register": os.getenv("THROTTLE_REGISTER", "10/min"),
+        "login": os.getenv("THROTTLE_LOGIN", "20/min"),
+        "enroll_user": os.getenv("THROTTLE_ENROLL_USER", "30/min"),
+        "enroll_course": os.getenv("THROTTLE_ENROLL_COURSE", "100/s"),
+        "asset_upload": os.getenv("THROTTLE_ASSET_UPLOAD", "60/min"),
+    },
+}
+
+# Admission control: reject API requests with 503 + Retry-After once this
+# many are in flight in a single worker process (0 disables the limit).
+ADMISSION_CONTROL = {
+    "MAX_IN_FLIGHT": int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64")),
+    "RETRY_AFTER": 1,
+}
+
+# POST /api/batch/ limits: sub-requests per batch and worker threads used
+# for concurrent read-only sub-requests.
+BATCH_REQUESTS = {
+    "MAX_REQUESTS": 20,
+    "MAX_WORKERS": 4,
+}
+
+# Chapter content history: a full snapshot at least every SNAPSHOT_INTERVAL
+# revisions (deltas in between), and the newest KEEP revisions retained.
+CHAPTER_REVISIONS = {
+    "SNAPSHOT_INTERVAL": int(os.getenv("CHAPTER_SNAPSHOT_INTERVAL", "10")),
+    "KEEP": int(os.getenv("CHAPTER_REVISIONS_KEEP", "50")),
+}
+
+# Chapter progress is buffered in memory and flushed in batches every
+# FLUSH_INTERVAL seconds (0 writes through), or once MAX_PENDING updates
+# are waiting.
+PROGRESS_TRACKING = {
+    "FLUSH_INTERVAL": float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2")),
+    "MAX_PENDING": 1000,
+}
+
+# Activity events are appended to per-process segment files under
+# DIRECTORY, sealed at MAX_SEGMENT_BYTES or MAX_SEGMENT_SECONDS, and folded
+# into DailyActivity by `python manage.py rollup_activity`.
+ACTIVITY_LOG = {
+    "DIRECTORY": os.getenv("ACTIVITY_LOG_DIR") or str(BASE_DIR / "activity_log"),
+    "BUFFER_SIZE": 256,
+    "FLUSH_INTERVAL": 1,
+    "MAX_SEGMENT_BYTES": 8 * 1024 * 1024,
+    "MAX_SEGMENT_SECONDS": 300,
+}
+
+# Course change events streamed over SSE (GET /api/courses/<id>/events/).
+# With REDIS_URL, events published by any worker reach streams held by all
+# of them; otherwise only streams in the publishing process see them.
+EVENTS = {
+    "BACKEND": "api.events.RedisBackend" if REDIS_URL else "api.events.LocalBackend",
+    "QUEUE_SIZE": 100,
+    "HEARTBEAT": 15,
+    "MAX_CONNECTIONS": int(os.getenv("EVENTS_MAX_CONNECTIONS", "5000")),
+}
+
+# Chapter images, stored on local disk under their SHA-256 digest
+# (api/assets.py). Uploads are streamed to disk CHUNK_SIZE bytes at a time.
+ASSET_STORAGE = {
+    "DIRECTORY": os.getenv("ASSET_DIR") or str(BASE_DIR / "assets"),
+    "MAX_SIZE": int(os.getenv("ASSET_MAX_SIZE", str(10 * 1024 * 1024))),
+    "CHUNK_SIZE": 64 * 1024,
+}
+
+# Chapter detail responses are cached per chapter version for CACHE_TIMEOUT
+# seconds (0 disables), and the next chapter in reading order is rendered
+# into the cache in the background when WARM_NEXT is on.
+CHAPTER_NAVIGATION = {
+    "CACHE_TIMEOUT": int(os.getenv("CHAPTER_CACHE_TIMEOUT", "60")),
+    "WARM_NEXT": True,
+}
+
+# Compressed chapter detail bodies (api/compression.py) are cached per ETag
+# and encoding for CACHE_TIMEOUT seconds. gzip is always offered; br and zstd
+# when the optional brotli / zstandard packages are installed.
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "CACHE_TIMEOUT": int(os.getenv("COMPRESSION_CACHE_TIMEOUT", "3600")),
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+    "ZSTD_LEVEL": 10,
+}
+
+# ?ordering=trending weighs each enrollment half as much every
+# TRENDING_HALF_LIFE_DAYS (api/ranking.py). Run rebuild_course_rankings after
+# changing it.
+COURSE_RANKING = {
+    "TRENDING_HALF_LIFE_DAYS": float(os.getenv("TRENDING_HALF_LIFE_DAYS", "7")),
+}
+
+# Responses to POSTs sent with an Idempotency-Key (api/idempotency.py) are kept
+# for TTL seconds and replayed on retries; duplicates arriving while the first
+# request runs wait up to WAIT_TIMEOUT seconds for its result.
+IDEMPOTENCY = {
+    "TTL": int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400")),
+    "LOCK_TIMEOUT": 30,
+    "WAIT_TIMEOUT": 10,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Static snapshot of the public catalog (api/snapshot.py), written by
+# `python manage.py export_catalog` and, when AUTO is on, after every course or
+# chapter change. The newest KEEP snapshots are kept on disk.
+CATALOG_EXPORT = {
+    "DIRECTORY": os.getenv("CATALOG_EXPORT_DIR") or str(BASE_DIR / "catalog"),
+    "AUTO": os.getenv("CATALOG_EXPORT_AUTO", "False") == "True",
+    "KEEP": 3,
+    "LOCK_TIMEOUT": 600,
+}
+
+# Deleted courses and users are hidden at once and their rows removed in the
+# background, CHUNK_SIZE primary keys per DELETE (api/deletion.py).
+DELETION = {
+    "CHUNK_SIZE": 1000,
+}
+
+# Chapter notifications are fanned out to enrolled students on the background
+# pool, inserting CHUNK_SIZE inbox rows per statement (api/notifications.py).
+NOTIFICATIONS = {
+    "CHUNK_SIZE": 1000,
+}
+
+# Shared thread pool for best-effort work done after a response (api/background.py).
+BACKGROUND_TASKS = {
+    "MAX_WORKERS": 4,
 }
 
 # Simple JWT settings
@@ -167,3 +363,7 @@ CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000"
 )
 
 CORS_ALLOW_CREDENTIALS = True
+
+# "Purpose: prefetch" marks speculative chapter fetches (not counted as views);
+# "Idempotency-Key" lets retried POSTs replay the first response.
+CORS_ALLOW_HEADERS = (*default_headers, "purpose", "idempotency-key")
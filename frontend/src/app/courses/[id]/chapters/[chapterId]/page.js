@@ -1,7 +1,8 @@
 'use client';
 
+import { useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { useQuery } from '@tanstack/react-query';
+import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import Link from 'next/link';
 import api from '@/lib/axios';
 import useAuthStore from '@/store/authStore';
@@ -10,6 +11,7 @@ import PlateEditor from '@/components/PlateEditor';
 export default function ChapterViewerPage() {
   const params = useParams();
   const { user } = useAuthStore();
+  const queryClient = useQueryClient();
   const { id: courseId, chapterId } = params;
 
   const { data: chapter, isLoading, error } = useQuery({
@@ -22,11 +24,30 @@ export default function ChapterViewerPage() {
     retry: false,
   });
 
-  const { data: chapters = [] } = useQuery({
-    queryKey: ['chapters', courseId],
-    queryFn: async () => {
-      const response = await api.get(`/chapters/?course_id=${courseId}`);
-      return response.data.results || response.data;
+  // The detail response names its neighbors; fetch the next chapter ahead
+  // of the click so sequential reading doesn't wait on the network.
+  const nextChapterId = chapter?.next?.id;
+  useEffect(() => {
+    if (!nextChapterId) return;
+    queryClient.prefetchQuery({
+      queryKey: ['chapter', String(nextChapterId)],
+      queryFn: async () => {
+        // Marked as a prefetch so it isn't counted as opening the chapter.
+        const response = await api.get(`/chapters/${nextChapterId}/`, {
+          headers: { Purpose: 'prefetch' },
+        });
+        return response.data;
+      },
+    });
+  }, [nextChapterId, queryClient]);
+
+  const completeMutation = useMutation({
+    mutationFn: async () => {
+      const response = await api.post(`/chapters/${chapterId}/complete/`);
+      return response.data;
+    },
+    onSuccess: () => {
+      queryClient.invalidateQueries(['my-courses']);
     },
   });
 
@@ -65,9 +86,8 @@ export default function ChapterViewerPage() {
     );
   }
 
-  const currentIndex = chapters.findIndex((ch) => ch.id === parseInt(chapterId));
-  const previousChapter = currentIndex > 0 ? chapters[currentIndex - 1] : null;
-  const nextChapter = currentIndex < chapters.length - 1 ? chapters[currentIndex + 1] : null;
+  const previousChapter = chapter?.previous;
+  const nextChapter = chapter?.next;
 
   // Check if user is instructor - role is in profile
   const isInstructor = user?.profile?.role === 'instructor';
@@ -111,6 +131,18 @@ export default function ChapterViewerPage() {
         <div className="prose max-w-none">
           <PlateEditor initialValue={chapter?.content} readOnly={true} />
         </div>
+
+        {user?.profile?.role === 'student' && (
+          <div className="mt-8 text-right">
+            <button
+              onClick={() => completeMutation.mutate()}
+              disabled={completeMutation.isPending || completeMutation.isSuccess}
+              className="bg-green-600 text-white px-4 py-2 rounded hover:bg-green-700 disabled:opacity-50"
+            >
+              {completeMutation.isSuccess ? 'Completed' : 'Mark as completed'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Navigation */}
@@ -19,6 +19,7 @@ function CourseManagePage() {
 
   const [title, setTitle] = useState('');
   const [description, setDescription] = useState('');
+  const [capacity, setCapacity] = useState('');
   const [showDeleteModal, setShowDeleteModal] = useState(false);
   const [chapterToDelete, setChapterToDelete] = useState(null);
 
@@ -28,6 +29,7 @@ function CourseManagePage() {
       const response = await api.get(`/courses/${courseId}/`);
       setTitle(response.data.title);
       setDescription(response.data.description);
+      setCapacity(response.data.capacity ?? '');
       return response.data;
     },
   });
@@ -72,7 +74,11 @@ function CourseManagePage() {
 
   const handleSaveCourse = (e) => {
     e.preventDefault();
-    updateCourseMutation.mutate({ title, description });
+    updateCourseMutation.mutate({
+      title,
+      description,
+      capacity: capacity === '' ? null : Number(capacity),
+    });
   };
 
   const handleDeleteCourse = () => {
@@ -140,6 +146,16 @@ function CourseManagePage() {
             required
           />
 
+          <Input
+            label="Seat Limit"
+            type="number"
+            name="capacity"
+            value={capacity}
+            onChange={(e) => setCapacity(e.target.value)}
+            placeholder="Leave empty for unlimited seats"
+            error={updateCourseMutation.error?.response?.data?.capacity}
+          />
+
           <div className="flex space-x-4">
             <Button
               type="submit"
@@ -1,9 +1,10 @@
 'use client';
 
+import { useEffect } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import Link from 'next/link';
-import api from '@/lib/axios';
+import api, { refreshAccessToken, tokenExpired } from '@/lib/axios';
 import useAuthStore from '@/store/authStore';
 import ChapterList from '@/components/ChapterList';
 import Button from '@/components/Button';
@@ -15,22 +16,81 @@ export default function CourseDetailPage() {
   const { user, isAuthenticated } = useAuthStore();
   const courseId = params.id;
 
+  // Course, visible chapter outline and enrollment state in one request
   const { data: course, isLoading, error } = useQuery({
     queryKey: ['course', courseId],
     queryFn: async () => {
-      const response = await api.get(`/courses/${courseId}/`);
+      const response = await api.get(
+        `/courses/${courseId}/?include=chapters,enrollment`
+      );
       return response.data;
     },
   });
 
-  const { data: chapters = [] } = useQuery({
-    queryKey: ['chapters', courseId],
-    queryFn: async () => {
-      const response = await api.get(`/chapters/?course_id=${courseId}`);
-      return response.data.results || response.data;
-    },
-    enabled: !!courseId,
-  });
+  const chapters = course?.chapters || [];
+
+  // Refetch when the instructor changes a chapter, instead of polling
+  useEffect(() => {
+    if (typeof window === 'undefined' || !window.EventSource) return;
+    let source;
+    let retryTimer;
+    let failures = 0;
+    let stopped = false;
+    const refresh = () => queryClient.invalidateQueries(['course', courseId]);
+
+    const connect = (token) => {
+      const query = token ? `?token=${encodeURIComponent(token)}` : '';
+      source = new EventSource(
+        `${process.env.NEXT_PUBLIC_API_URL}/courses/${courseId}/events/${query}`
+      );
+      [
+        'chapter.created',
+        'chapter.updated',
+        'chapter.reordered',
+        'chapter.published',
+        'chapter.unpublished',
+        'chapter.deleted',
+        'resync',
+      ].forEach((type) => source.addEventListener(type, refresh));
+      source.onopen = () => {
+        failures = 0;
+      };
+
+      // EventSource retries dropped connections on its own, but with the
+      // token it was opened with: once that expires the stream is refused
+      // with a 401, which it can't report. Close it and reopen with a
+      // refreshed token instead, falling back to public events only.
+      source.onerror = () => {
+        if (!token) return;
+        if (source.readyState !== EventSource.CLOSED && !tokenExpired(token)) {
+          return;
+        }
+        source.close();
+        const refreshToken = localStorage.getItem('refreshToken');
+        const renewed = refreshToken
+          ? refreshAccessToken(refreshToken).catch(() => null)
+          : Promise.resolve(null);
+        renewed.then((access) => {
+          if (stopped) return;
+          // Back off if fresh tokens keep being refused.
+          const delay = failures ? Math.min(1000 * 2 ** failures, 30000) : 0;
+          failures += 1;
+          retryTimer = setTimeout(() => {
+            connect(access);
+            // Catch up on anything sent while disconnected.
+            refresh();
+          }, delay);
+        });
+      };
+    };
+
+    connect(localStorage.getItem('accessToken'));
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      source.close();
+    };
+  }, [courseId, isAuthenticated, queryClient]);
 
   const enrollMutation = useMutation({
     mutationFn: async () => {
@@ -82,6 +142,9 @@ export default function CourseDetailPage() {
   const isInstructor = user?.profile?.role === 'instructor' && user?.id === course?.created_by?.id;
   const isEnrolled = course?.is_enrolled;
   const isStudent = user?.profile?.role === 'student';
+  const waitlistPosition = course?.enrollment?.waitlist_position;
+  const isFull =
+    course?.capacity != null && course.seats_taken >= course.capacity;
 
   return (
     <div>
@@ -131,7 +194,10 @@ export default function CourseDetailPage() {
                 d="M12 4.354a4 4 0 110 5.292M15 21H3v-1a6 6 0 0112 0v1zm0 0h6v-1a6 6 0 00-9-5.197M13 7a4 4 0 11-8 0 4 4 0 018 0z"
               />
             </svg>
-            <span>{course.student_count} students enrolled</span>
+            <span>
+              {course.student_count} students enrolled
+              {course.capacity != null && ` (${course.capacity} seats)`}
+            </span>
           </div>
         </div>
 
@@ -146,16 +212,35 @@ export default function CourseDetailPage() {
             </Link>
           )}
 
-          {isStudent && !isEnrolled && (
+          {isStudent && !isEnrolled && !waitlistPosition && (
             <Button
               onClick={handleEnroll}
               disabled={enrollMutation.isPending}
               variant="primary"
             >
-              {enrollMutation.isPending ? 'Enrolling...' : 'Enroll in Course'}
+              {enrollMutation.isPending
+                ? 'Enrolling...'
+                : isFull
+                  ? 'Join Waitlist'
+                  : 'Enroll in Course'}
             </Button>
           )}
 
+          {isStudent && !isEnrolled && waitlistPosition && (
+            <>
+              <span className="self-center text-gray-700">
+                Waitlisted (#{waitlistPosition})
+              </span>
+              <Button
+                onClick={() => unenrollMutation.mutate()}
+                disabled={unenrollMutation.isPending}
+                variant="secondary"
+              >
+                Leave Waitlist
+              </Button>
+            </>
+          )}
+
           {isStudent && isEnrolled && (
             <Button
               onClick={handleUnenroll}
@@ -9,11 +9,14 @@ import Input from '@/components/Input';
 export default function CoursesPage() {
   const [searchQuery, setSearchQuery] = useState('');
   const [page, setPage] = useState(1);
+  const [ordering, setOrdering] = useState('newest');
 
   const { data, isLoading, error } = useQuery({
-    queryKey: ['courses', page],
+    queryKey: ['courses', page, ordering],
     queryFn: async () => {
-      const response = await api.get(`/courses/?page=${page}`);
+      const response = await api.get(
+        `/courses/?page=${page}&ordering=${ordering}`
+      );
       return response.data;
     },
   });
@@ -31,15 +34,29 @@ export default function CoursesPage() {
       <div className="mb-8">
         <h1 className="text-3xl font-bold text-gray-800 mb-4">All Courses</h1>
         
-        {/* Search Bar */}
-        <div className="max-w-md">
-          <Input
-            type="text"
-            placeholder="Search courses..."
-            value={searchQuery}
-            onChange={(e) => setSearchQuery(e.target.value)}
-            className="mb-0"
-          />
+        {/* Search Bar and Sort */}
+        <div className="flex items-center space-x-4">
+          <div className="max-w-md flex-1">
+            <Input
+              type="text"
+              placeholder="Search courses..."
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              className="mb-0"
+            />
+          </div>
+          <select
+            value={ordering}
+            onChange={(e) => {
+              setOrdering(e.target.value);
+              setPage(1);
+            }}
+            className="px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+          >
+            <option value="newest">Newest</option>
+            <option value="popular">Most popular</option>
+            <option value="trending">Trending</option>
+          </select>
         </div>
       </div>
 
@@ -22,12 +22,23 @@ function DashboardPage() {
     enabled: !!user,
   });
 
+  // Precomputed totals across all of the instructor's courses
+  const { data: stats } = useQuery({
+    queryKey: ['dashboard-stats', user?.id],
+    queryFn: async () => {
+      const response = await api.get('/dashboard/stats/');
+      return response.data;
+    },
+    enabled: !!user,
+  });
+
   const deleteMutation = useMutation({
     mutationFn: async (courseId) => {
       await api.delete(`/courses/${courseId}/`);
     },
     onSuccess: () => {
       queryClient.invalidateQueries(['courses', 'instructor']);
+      queryClient.invalidateQueries(['dashboard-stats']);
     },
   });
 
@@ -37,8 +48,13 @@ function DashboardPage() {
     }
   };
 
-  const totalStudents = courses.reduce((sum, course) => sum + (course.student_count || 0), 0);
-  const totalChapters = courses.reduce((sum, course) => sum + (course.chapter_count || 0), 0);
+  const totalCourses = stats?.course_count ?? courses.length;
+  const totalStudents =
+    stats?.student_count ??
+    courses.reduce((sum, course) => sum + (course.student_count || 0), 0);
+  const totalChapters =
+    stats?.chapter_count ??
+    courses.reduce((sum, course) => sum + (course.chapter_count || 0), 0);
 
   if (isLoading) {
     return (
@@ -65,7 +81,7 @@ function DashboardPage() {
           <div className="flex items-center justify-between">
             <div>
               <p className="text-gray-500 text-sm">Total Courses</p>
-              <p className="text-3xl font-bold text-blue-600">{courses.length}</p>
+              <p className="text-3xl font-bold text-blue-600">{totalCourses}</p>
             </div>
             <svg
               className="w-12 h-12 text-blue-600"
@@ -55,6 +55,25 @@ export default function CourseCard({ course }) {
           </div>
         </div>
 
+        {course.progress && course.chapter_count > 0 && (
+          <div className="mb-4">
+            <div className="flex justify-between text-xs text-gray-500 mb-1">
+              <span>Progress</span>
+              <span>
+                {course.progress.completed}/{course.chapter_count} chapters completed
+              </span>
+            </div>
+            <div className="w-full bg-gray-200 rounded-full h-2">
+              <div
+                className="bg-green-500 h-2 rounded-full"
+                style={{
+                  width: `${Math.min(100, (100 * course.progress.completed) / course.chapter_count)}%`,
+                }}
+              />
+            </div>
+          </div>
+        )}
+
         <Link
           href={`/courses/${course.id}`}
           className="block w-full text-center bg-blue-600 text-white py-2 rounded hover:bg-blue-700 transition-colors"
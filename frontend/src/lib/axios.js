@@ -7,6 +7,25 @@ const api = axios.create({
   },
 });
 
+// crypto.randomUUID() only exists in secure contexts (HTTPS or localhost);
+// plain-HTTP deployments build a v4 UUID from getRandomValues instead.
+const newIdempotencyKey = () => {
+  if (typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (byte) => byte.toString(16).padStart(2, '0'));
+  return [
+    hex.slice(0, 4).join(''),
+    hex.slice(4, 6).join(''),
+    hex.slice(6, 8).join(''),
+    hex.slice(8, 10).join(''),
+    hex.slice(10).join(''),
+  ].join('-');
+};
+
 // Request interceptor to add JWT token
 api.interceptors.request.use(
   (config) => {
@@ -16,6 +35,11 @@ api.interceptors.request.use(
         config.headers.Authorization = `Bearer ${token}`;
       }
     }
+    // Retries of this request (including after a token refresh) reuse the
+    // key, so the API replays the first response instead of repeating it.
+    if (config.method === 'post' && !config.headers['Idempotency-Key']) {
+      config.headers['Idempotency-Key'] = newIdempotencyKey();
+    }
     return config;
   },
   (error) => {
@@ -23,6 +47,28 @@ api.interceptors.request.use(
   }
 );
 
+// Exchange the refresh token for a new access token and store it
+export async function refreshAccessToken(refreshToken) {
+  const response = await axios.post(
+    `${process.env.NEXT_PUBLIC_API_URL}/auth/token/refresh/`,
+    { refresh: refreshToken }
+  );
+
+  const { access } = response.data;
+  localStorage.setItem('accessToken', access);
+  return access;
+}
+
+// Whether a JWT has expired (or can't be read), judged by its exp claim
+export function tokenExpired(token) {
+  try {
+    const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+    return JSON.parse(atob(payload)).exp * 1000 <= Date.now();
+  } catch {
+    return true;
+  }
+}
+
 // Response interceptor to handle token refresh
 api.interceptors.response.use(
   (response) => response,
@@ -38,13 +84,7 @@ api.interceptors.response.use(
 
         if (refreshToken) {
           try {
-            const response = await axios.post(
-              `${process.env.NEXT_PUBLIC_API_URL}/auth/token/refresh/`,
-              { refresh: refreshToken }
-            );
-
-            const { access } = response.data;
-            localStorage.setItem('accessToken', access);
+            const access = await refreshAccessToken(refreshToken);
 
             // Retry the original request with new token
             originalRequest.headers.Authorization = `Bearer ${access}`;